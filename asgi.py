@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+CheckwiseAI - ASGI Entry Point
+Async alternative to main.py's WSGI application, for uvicorn:
+
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT
+
+Serves the same Flask routes. Request and response I/O stays on the event
+loop; validation and inference run on a bounded thread pool
+(ASGI_WORKER_THREADS), so slow clients cannot tie up the workers.
+"""
+import os
+
+# Same setup as the WSGI entry point: backend on sys.path, chdir, model preload
+from main import application as wsgi_application, logger
+from api import ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE
+from asgi_adapter import WSGIToASGI
+
+# Threads running the Flask app (validation + inference); more requests queue on the event loop.
+# The default leaves room for every admission slot and queue place plus a few threads that answer
+# /api/health and shed excess predict requests straight away instead of queueing them here
+ASGI_WORKER_THREADS = int(os.environ.get('ASGI_WORKER_THREADS', ADMISSION_MAX_CONCURRENT + ADMISSION_MAX_QUEUE + 4))
+# Largest request body accepted, read asynchronously before the app runs
+ASGI_MAX_BODY_MB = float(os.environ.get('ASGI_MAX_BODY_MB', 16))
+
+application = WSGIToASGI(wsgi_application, max_workers=ASGI_WORKER_THREADS,
+                         max_body_bytes=int(ASGI_MAX_BODY_MB * 2 ** 20))
+logger.info(f"ASGI application ready with {ASGI_WORKER_THREADS} worker threads")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    logger.info(f"Starting ASGI application on port {port}")
+    uvicorn.run(application, host='0.0.0.0', port=port)
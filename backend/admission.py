@@ -0,0 +1,172 @@
+"""
+Admission control for the inference routes: a concurrency limiter with a
+bounded wait queue, and per-client token-bucket rate limits.
+
+ConcurrencyLimiter lets ``max_concurrent`` requests run at once. Up to
+``max_queue`` more wait in FIFO order, each until its own deadline; a
+request arriving to a full queue, or still queued at its deadline, is shed
+straight away with an estimate of when to retry, rather than piling up until
+the server's own timeout kills it. The limiter counts as saturated while its
+queue is full or for ``saturation_hold`` seconds after it last shed a
+request, which is what /api/health reports to the load balancer.
+
+Only requests handled concurrently in one process can queue here, so the
+deployed start command (Procfile, render.yaml) runs gunicorn's gthread
+worker with 24 threads: the default 4 running plus 16 queued, and a few
+spare for /api/health and the metrics scrape while the queue is full. A
+sync worker takes one request at a time; its backlog would sit in the
+listen socket and only the rate limits would apply. Keep --threads at least
+ADMISSION_MAX_CONCURRENT + ADMISSION_MAX_QUEUE when changing either.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; ``reason`` is 'queue_full' or 'queue_timeout'"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """At most ``max_concurrent`` holders, ``max_queue`` FIFO waiters, the rest shed"""
+
+    def __init__(self, max_concurrent, max_queue, saturation_hold=1.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.saturation_hold = saturation_hold
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._shed_at = None
+        # Smoothed seconds a slot is held, for Retry-After estimates
+        self._service_seconds = 0.05
+        self.active = 0
+        self.admitted = 0
+        self.queued = 0
+        self.queue_wait_total = 0.0
+        self.shed = {'queue_full': 0, 'queue_timeout': 0}
+
+    def acquire(self, timeout):
+        """Take a slot, waiting in the queue for at most ``timeout`` seconds; raises Overloaded"""
+        started = time.monotonic()
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise self._shed('queue_full')
+            if timeout <= 0:
+                raise self._shed('queue_timeout')
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+
+        granted = waiter.wait(timeout)
+        with self._lock:
+            # A slot handed over just as the wait timed out is still taken
+            if not granted and not waiter.is_set():
+                self._waiters.remove(waiter)
+                raise self._shed('queue_timeout')
+            self.admitted += 1
+            self.queued += 1
+            self.queue_wait_total += time.monotonic() - started
+
+    def release(self, held_seconds=None):
+        with self._lock:
+            if held_seconds is not None:
+                self._service_seconds += 0.2 * (held_seconds - self._service_seconds)
+            if self._waiters:
+                # The slot passes straight to the oldest waiter; active stays the same
+                self._waiters.popleft().set()
+            else:
+                self.active -= 1
+
+    def _shed(self, reason):
+        # Called with the lock held
+        self.shed[reason] += 1
+        self._shed_at = time.monotonic()
+        return Overloaded(reason, self._retry_after())
+
+    def _retry_after(self):
+        # Time for everything queued now to get through the slots, whole seconds
+        drain = (len(self._waiters) + 1) * self._service_seconds / max(1, self.max_concurrent)
+        return max(1, math.ceil(drain))
+
+    @property
+    def saturated(self):
+        with self._lock:
+            return self._saturated()
+
+    def _saturated(self):
+        if len(self._waiters) >= self.max_queue:
+            return True
+        return self._shed_at is not None and time.monotonic() - self._shed_at < self.saturation_hold
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'saturated': self._saturated(),
+                'active': self.active,
+                'queue_depth': len(self._waiters),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'average_queue_wait_ms': round(self.queue_wait_total / self.queued * 1000, 3) if self.queued else 0.0,
+                'average_service_ms': round(self._service_seconds * 1000, 3),
+                'shed': dict(self.shed)
+            }
+
+
+class RateLimiter:
+    """Token bucket per client: ``rate`` requests per second, bursts of up to ``burst``
+
+    Buckets of the ``max_clients`` most recently seen clients are kept; a
+    client dropped from the table starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, client, cost=1.0):
+        """0.0 if ``client`` may proceed, else the seconds until it has enough tokens"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                tokens = self.burst
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(client)
+            if tokens >= cost:
+                self._buckets[client] = [tokens - cost, now]
+                self.allowed += 1
+                return 0.0
+            self._buckets[client] = [tokens, now]
+            self.limited += 1
+            return (cost - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'rate_per_second': self.rate,
+                'burst': self.burst,
+                'clients': len(self._buckets),
+                'allowed': self.allowed,
+                'limited': self.limited
+            }
@@ -1,120 +1,283 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import sys
 import logging
 import traceback
+import json
+import functools
+import gc
+import hashlib
+import hmac
+import io
+import math
+import random
+import time
 from datetime import datetime
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Import ML libraries with error handling
+# Import ML libraries with error handling. joblib (and with it scikit-learn) is
+# only imported when a model is loaded, keeping cold starts short.
 try:
-    import joblib
     import numpy as np
-    import pandas as pd
+    from attribution import BudgetTooSmall, ExplainerCache
+    from binary_format import (FLOAT32_MIMETYPE, MSGPACK_MIMETYPES, RESULT_MIMETYPE, BinaryFormatError,
+                               decode_float32, decode_msgpack, describe as describe_binary_formats, encode_msgpack,
+                               encode_results, msgpack_available)
+    from compiled_model import load_compiled_model
+    from drift import DriftMonitor, drift_scores, load_baseline, save_baseline
+    from inference import build_class_names, predict_probabilities, top_k_indices
+    from microbatch import BATCH_SIZE_BUCKETS, QUEUE_WAIT_BUCKETS_MS, MicroBatcher
+    from prediction_store import MAX_ID_LENGTH, PredictionStore
+    from result_cache import PredictionCache
+    from shadow import ShadowScorer
     ML_LIBRARIES_AVAILABLE = True
     logger.info("ML libraries imported successfully")
 except ImportError as e:
     ML_LIBRARIES_AVAILABLE = False
     logger.error(f"Failed to import ML libraries: {e}")
-    joblib = None
     np = None
-    pd = None
+
+from admission import ConcurrencyLimiter, Overloaded, RateLimiter
+from idempotency import IdempotencyStore, SingleFlight, StoredResponse
+from json_provider import select_provider
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from model_registry import ModelBundle, ModelPool, ModelRegistry
+from report_parser import iter_reports
+from schema import CBCSchema
+from static_responses import StaticPayload
+from units import (PARAMETER_UNITS, UnitConversionError, check_unit_map, convert_panels, convert_to_default_unit,
+                   convert_value)
 
 app = Flask(__name__)
 CORS(app)
+# orjson-backed JSON (with NumPy support) when installed; JSON_PROVIDER=stdlib forces the default encoder
+app.json = select_provider(os.environ.get('JSON_PROVIDER', 'auto'))(app)
 
-# Global variables for model and encoder
-model = None
-label_encoder = None
-model_load_status = {}
-
-# Unit conversion functions
-def convert_to_default_unit(parameter, value, from_unit):
-    """Convert parameter value from given unit to default unit"""
-    conversion_factors = {
-        'HGB': {
-            'g/L': 0.1,  # g/L to g/dL
-            'mmol/L': 1.61  # mmol/L to g/dL (approximate)
-        },
-        'MCHC': {
-            'g/L': 0.1,  # g/L to g/dL
-            'mmol/L': 1.61  # mmol/L to g/dL (approximate)
-        },
-        'WBC': {
-            'K/μL': 1.0,  # K/μL is same as 10³/μL
-            'cells/μL': 0.001,  # cells/μL to 10³/μL
-            '10⁹/L': 1.0  # 10⁹/L is same as 10³/μL
-        },
-        'RBC': {
-            'M/μL': 1.0,  # M/μL is same as 10⁶/μL
-            'cells/μL': 0.000001,  # cells/μL to 10⁶/μL
-            '10¹²/L': 1.0  # 10¹²/L is same as 10⁶/μL
-        },
-        'PLT': {
-            'K/μL': 1.0,  # K/μL is same as 10³/μL
-            'cells/μL': 0.001,  # cells/μL to 10³/μL
-            '10⁹/L': 1.0  # 10⁹/L is same as 10³/μL
-        },
-        'LY#': {
-            'K/μL': 1.0,
-            'cells/μL': 0.001,
-            '10⁹/L': 1.0
-        },
-        'MO#': {
-            'K/μL': 1.0,
-            'cells/μL': 0.001,
-            '10⁹/L': 1.0
-        },
-        'NE#': {
-            'K/μL': 1.0,
-            'cells/μL': 0.001,
-            '10⁹/L': 1.0
-        },
-        'EO#': {
-            'K/μL': 1.0,
-            'cells/μL': 0.001,
-            '10⁹/L': 1.0
-        },
-        'BA#': {
-            'K/μL': 1.0,
-            'cells/μL': 0.001,
-            '10⁹/L': 1.0
-        },
-        'HCT': {
-            'L/L': 100.0,  # L/L to %
-            'fraction': 100.0  # fraction to %
-        },
-        'Age': {
-            'months': 1/12,  # months to years
-            'days': 1/365.25  # days to years
-        },
-        # Percentage conversions
-        'LY%': {'fraction': 100.0},
-        'MO%': {'fraction': 100.0},
-        'NE%': {'fraction': 100.0},
-        'EO%': {'fraction': 100.0},
-        'BA%': {'fraction': 100.0}
-    }
-    
-    if parameter in conversion_factors and from_unit in conversion_factors[parameter]:
-        return value * conversion_factors[parameter][from_unit]
-    return value
+# Request and per-stage latency metrics, exposed at /api/metrics
+metrics = MetricsRegistry()
+REQUESTS_TOTAL = metrics.counter(
+    'checkwise_http_requests_total', 'HTTP requests by endpoint, method and status code',
+    ['endpoint', 'method', 'status'])
+REQUEST_SECONDS = metrics.histogram(
+    'checkwise_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint'])
+STAGE_SECONDS = metrics.histogram(
+    'checkwise_stage_duration_seconds', 'Time spent in each prediction processing stage', ['stage'])
+SCORED_BY_MODEL = metrics.counter(
+    'checkwise_model_requests_total', 'Prediction requests by the model variant that answered them', ['model'])
+
+# Model files are resolved once; the loaded model lives in model_registry
+model_location = None
+
+MODEL_FILENAME = 'cbc_disease_model.joblib'
+ENCODER_FILENAME = 'disease_label_encoder.joblib'
+# NumPy-only export of the model, written by `python backend/compiled_model.py`
+COMPILED_MODEL_FILENAME = 'cbc_disease_model.npz'
+# Optional {"version": ...} file next to the model; otherwise the version is derived from the files
+MODEL_METADATA_FILENAME = 'model_metadata.json'
+DEFAULT_MODEL_VERSION = '2.1.0'
+# Optional explicit model directory; skips probing the default locations
+MODEL_DIR = os.environ.get('MODEL_DIR')
+# 'sklearn' serves the joblib estimator; 'numpy' serves the compiled .npz engine instead
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'sklearn').lower()
+# joblib mmap mode used by preload_models(); empty string disables memory mapping. Only plain
+# NumPy arrays stay mapped: scikit-learn trees copy their node arrays while unpickling
+MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE', 'r') or None
+# Seconds between checks of the model files for changes (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+# Shared secret for the admin endpoints and /api/history; they are disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def parse_model_variants(spec):
+    """"candidate=/models/v3,challenger=/models/v4" -> {'candidate': '/models/v3', ...}"""
+    variants = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, location = item.partition('=')
+        if not name.strip() or not location.strip() or name.strip() == 'primary':
+            raise ValueError(f'Invalid MODEL_VARIANTS entry {item!r}; expected name=/path/to/model/dir')
+        variants[name.strip()] = location.strip()
+    return variants
+
+# Extra named models served next to the primary one, loaded on first use
+MODEL_VARIANTS = parse_model_variants(os.environ.get('MODEL_VARIANTS', ''))
+# Variant answering AB_CANDIDATE_FRACTION (0-1) of prediction requests
+AB_CANDIDATE_MODEL = os.environ.get('AB_CANDIDATE_MODEL') or None
+AB_CANDIDATE_FRACTION = float(os.environ.get('AB_CANDIDATE_FRACTION', 0))
+# Variant that re-scores served requests in the background and logs disagreements
+SHADOW_MODEL = os.environ.get('SHADOW_MODEL') or None
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+# Estimated memory allowed for resident models; variants are unloaded LRU to stay under it (0 = no limit)
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 0))
+
+# Repeated panels are answered from this cache (RESULT_CACHE_SIZE=0 disables it)
+result_cache = PredictionCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 2048)),
+    ttl_seconds=float(os.environ.get('RESULT_CACHE_TTL', 600))
+) if ML_LIBRARIES_AVAILABLE else None
+
+# Concurrent identical single-panel predictions wait for one model call (SINGLE_FLIGHT_ENABLED=false disables)
+SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 30))
+single_flight = SingleFlight() if SINGLE_FLIGHT_ENABLED else None
+
+# Responses kept for retries that send the same Idempotency-Key header (IDEMPOTENCY_MAX_ENTRIES=0 disables),
+# per client as identified for rate limiting; the oldest half is dropped when available memory falls below
+# IDEMPOTENCY_MIN_AVAILABLE_MB
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+idempotency_store = IdempotencyStore(
+    max_entries=int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10000)),
+    max_bytes=int(float(os.environ.get('IDEMPOTENCY_MAX_MB', 32)) * 2 ** 20),
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL', 3600)),
+    min_available_bytes=int(float(os.environ.get('IDEMPOTENCY_MIN_AVAILABLE_MB', 128)) * 2 ** 20)
+)
+
+# Admission control for the predict routes: ADMISSION_MAX_CONCURRENT requests run at once (0 disables),
+# up to ADMISSION_MAX_QUEUE more wait at most ADMISSION_QUEUE_TIMEOUT seconds, the rest get 503. Requests
+# only queue here under a threaded server: the start command runs gthread with --threads above their sum
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', 4))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 16))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 5))
+# Seconds /api/health keeps reporting "saturated" (HTTP 503) after a request was shed
+ADMISSION_SATURATION_HOLD = float(os.environ.get('ADMISSION_SATURATION_HOLD', 2))
+admission_limiter = ConcurrencyLimiter(
+    ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, saturation_hold=ADMISSION_SATURATION_HOLD
+) if ADMISSION_MAX_CONCURRENT > 0 else None
+# Per-client token buckets for the predict routes (RATE_LIMIT_PER_SECOND=0 disables). Clients are told apart
+# by remote address, or by the last value of RATE_LIMIT_CLIENT_HEADER, a header the proxy in front sets itself
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 0))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 20))
+RATE_LIMIT_CLIENT_HEADER = os.environ.get('RATE_LIMIT_CLIENT_HEADER') or None
+# Proxies in front of the app that append to X-Forwarded-For (1 behind Render or Heroku's router). The remote
+# address becomes the entry the outermost of them appended; anything further left is client-supplied and ignored
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+proxy_warning_logged = False
+rate_limiter = RateLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST) if RATE_LIMIT_PER_SECOND > 0 else None
 
-def load_models():
-    """Load ML models with proper error handling and flexible path detection"""
-    global model, label_encoder, model_load_status
+# CBC feature schema shared by single-panel and batch validation
+FEATURES = [
+    'WBC', 'LY%', 'MO%', 'NE%', 'EO%', 'BA%', 'LY#', 'MO#', 'NE#', 'EO#', 'BA#',
+    'RBC', 'HGB', 'HCT', 'MCV', 'MCHC', 'MCH', 'RDW', 'PLT', 'MPV', 'Age', 'Gender'
+]
+CRITICAL_PARAMS = ['WBC', 'RBC', 'HGB', 'HCT', 'PLT', 'Age', 'Gender']
+CRITICAL_DEFAULTS = {
+    'WBC': 7.5, 'RBC': 4.8, 'HGB': 14, 'HCT': 42, 'PLT': 250, 'Age': 35, 'Gender': 1
+}
+PARAMETER_RANGES = {
+    'WBC': (0.1, 200.0), 'RBC': (0.5, 15.0), 'HGB': (1.0, 30.0), 'HCT': (5.0, 80.0),
+    'MCV': (30.0, 200.0), 'MCH': (10.0, 60.0), 'MCHC': (15.0, 50.0), 'RDW': (5.0, 40.0),
+    'PLT': (1.0, 3000.0), 'MPV': (1.0, 30.0), 'LY%': (0.0, 100.0), 'MO%': (0.0, 100.0),
+    'NE%': (0.0, 100.0), 'EO%': (0.0, 100.0), 'BA%': (0.0, 100.0), 'LY#': (0.0, 50.0),
+    'MO#': (0.0, 20.0), 'NE#': (0.0, 100.0), 'EO#': (0.0, 20.0), 'BA#': (0.0, 10.0),
+    'Age': (0.0, 120.0), 'Gender': (0, 1)
+}
+
+# Compiled once; validates single panels and batches identically
+cbc_schema = CBCSchema(FEATURES, CRITICAL_PARAMS, CRITICAL_DEFAULTS, PARAMETER_RANGES)
+
+# Append-only prediction log (SQLite, WAL) behind /api/history; unset PREDICTION_STORE_PATH disables it.
+# Reading it back also needs ADMIN_TOKEN: without one the log is written but /api/history answers 403
+PREDICTION_STORE_PATH = os.environ.get('PREDICTION_STORE_PATH') or None
+# Rows per write transaction (one fsync each), and the longest a queued row waits for its batch
+PREDICTION_STORE_BATCH_SIZE = int(os.environ.get('PREDICTION_STORE_BATCH_SIZE', 256))
+PREDICTION_STORE_FLUSH_MS = float(os.environ.get('PREDICTION_STORE_FLUSH_MS', 500))
+HISTORY_MAX_LIMIT = 500
+prediction_store = PredictionStore(
+    PREDICTION_STORE_PATH, FEATURES,
+    batch_size=PREDICTION_STORE_BATCH_SIZE,
+    flush_interval=PREDICTION_STORE_FLUSH_MS / 1000
+) if PREDICTION_STORE_PATH and ML_LIBRARIES_AVAILABLE else None
+if prediction_store is not None and not ADMIN_TOKEN:
+    logger.warning("PREDICTION_STORE_PATH is set without ADMIN_TOKEN; /api/history will refuse every request")
+
+# Streaming statistics of served panels and predictions behind /api/drift (DRIFT_MONITOR_ENABLED=false
+# disables); drift scores compare them with the baseline at DRIFT_BASELINE_PATH (built by backend/drift.py)
+DRIFT_MONITOR_ENABLED = os.environ.get('DRIFT_MONITOR_ENABLED', 'true').lower() == 'true'
+DRIFT_BASELINE_PATH = os.environ.get('DRIFT_BASELINE_PATH') or None
+# Panels per drift window; the current statistics cover the last one to two windows of traffic
+DRIFT_WINDOW_ROWS = int(os.environ.get('DRIFT_WINDOW_ROWS', '10000'))
+drift_monitor = DriftMonitor(
+    FEATURES, PARAMETER_RANGES, window_rows=DRIFT_WINDOW_ROWS
+) if DRIFT_MONITOR_ENABLED and ML_LIBRARIES_AVAILABLE else None
+drift_baseline = None
+if drift_monitor is not None and DRIFT_BASELINE_PATH and os.path.exists(DRIFT_BASELINE_PATH):
+    try:
+        drift_baseline = load_baseline(DRIFT_BASELINE_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read drift baseline {DRIFT_BASELINE_PATH}: {str(e)}")
+
+# Occlusion feature attributions (/api/explain, /api/predict?explain=true). With a drift baseline loaded,
+# features are compared with ATTRIBUTION_BACKGROUND_SIZE quantiles of it, otherwise with the missing-value
+# defaults. ATTRIBUTION_BUDGET_MS is the default scoring time per request; clients may ask up to the max
+ATTRIBUTION_BACKGROUND_SIZE = int(os.environ.get('ATTRIBUTION_BACKGROUND_SIZE', 8))
+ATTRIBUTION_BUDGET_MS = float(os.environ.get('ATTRIBUTION_BUDGET_MS', 50))
+ATTRIBUTION_MAX_BUDGET_MS = float(os.environ.get('ATTRIBUTION_MAX_BUDGET_MS', 500))
+ATTRIBUTION_TOP_CLASSES = 3
+explainer_cache = ExplainerCache(
+    FEATURES, cbc_schema.fill_values, background_size=ATTRIBUTION_BACKGROUND_SIZE
+) if ML_LIBRARIES_AVAILABLE else None
+
+# Maximum number of panels accepted by /api/predict/batch in one request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+
+# Opt-in micro-batching of concurrent single-panel predictions (needs a threaded server)
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH_ENABLED', 'false').lower() == 'true'
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 32))
+MICROBATCH_WINDOW_MS = float(os.environ.get('MICROBATCH_WINDOW_MS', 3))
+MICROBATCH_TIMEOUT = float(os.environ.get('MICROBATCH_TIMEOUT', 30))
+
+def score_probabilities(bundle, input_matrix):
+    """predict_proba on the bundle the queued requests started with"""
+    return bundle.model.predict_proba(input_matrix)
+
+def observe_micro_batch(size, waits):
+    """Record one scored micro-batch in the batch size and queue wait histograms"""
+    MICROBATCH_BATCH_SIZE.observe(size)
+    for wait in waits:
+        MICROBATCH_QUEUE_WAIT_SECONDS.observe(wait)
+
+if ML_LIBRARIES_AVAILABLE and MICROBATCH_ENABLED:
+    MICROBATCH_BATCH_SIZE = metrics.histogram(
+        'checkwise_microbatch_batch_size', 'Rows per scored micro-batch', buckets=BATCH_SIZE_BUCKETS)
+    MICROBATCH_QUEUE_WAIT_SECONDS = metrics.histogram(
+        'checkwise_microbatch_queue_wait_seconds', 'Time rows waited in the micro-batching queue',
+        buckets=[bucket / 1000 for bucket in QUEUE_WAIT_BUCKETS_MS])
+    micro_batcher = MicroBatcher(
+        score_probabilities,
+        max_batch_size=MICROBATCH_MAX_SIZE,
+        max_wait_ms=MICROBATCH_WINDOW_MS,
+        on_batch=observe_micro_batch
+    )
+else:
+    micro_batcher = None
+
+# Cache-Control max-age for the pre-serialized /api/parameters and /api/diseases payloads
+STATIC_CACHE_MAX_AGE = int(os.environ.get('STATIC_CACHE_MAX_AGE', 300))
+parameters_payload = None  # built on first request
+
+def model_filenames():
+    """Files a model directory must contain for the configured MODEL_ENGINE"""
+    if MODEL_ENGINE == 'numpy':
+        return (COMPILED_MODEL_FILENAME,)
+    return (MODEL_FILENAME, ENCODER_FILENAME)
+
+def resolve_model_location():
+    """Find the directory holding both model files (probed once, then remembered)"""
+    global model_location
     
-    # Check if ML libraries are available
-    if not ML_LIBRARIES_AVAILABLE:
-        model_load_status = {'status': 'error', 'message': 'ML libraries (numpy, pandas, scikit-learn) not available'}
-        logger.error("ML libraries not available")
-        return False
+    if model_location is not None:
+        return model_location
     
-    try:
+    if MODEL_DIR:
+        # Explicit configuration - no probing
+        possible_locations = [MODEL_DIR]
+    else:
         # Try multiple possible locations for model files
         possible_locations = [
             # Same directory as api.py (backend/)
@@ -124,88 +287,460 @@ def load_models():
             # Current working directory
             os.getcwd()
         ]
+    
+    for location in possible_locations:
+        logger.info(f"Checking models at: {location}")
+        if all(os.path.exists(os.path.join(location, filename)) for filename in model_filenames()):
+            logger.info(f"Found models at: {location}")
+            model_location = location
+            return location
+    return None
+
+def warm_up_model(candidate_model, candidate_class_names):
+    """Run one inference on a default panel so the model is proven usable before serving"""
+    warm_up_row = np.array([[CRITICAL_DEFAULTS.get(feature, 0) for feature in FEATURES]], dtype=float)
+    probabilities, predicted_indices = predict_probabilities(candidate_model, warm_up_row)
+    if probabilities.shape != (1, len(candidate_class_names)):
+        raise ValueError(f'Warm-up produced probabilities of shape {probabilities.shape}, '
+                         f'expected (1, {len(candidate_class_names)})')
+    return str(candidate_class_names[predicted_indices[0]])
+
+def model_files_fingerprint(location=None):
+    """Cheap change detector for the model files: (size, mtime) of each, or None if missing"""
+    location = location or resolve_model_location()
+    if location is None:
+        return None
+    fingerprint = []
+    for filename in model_filenames() + (MODEL_METADATA_FILENAME,):
+        try:
+            stat = os.stat(os.path.join(location, filename))
+        except FileNotFoundError:
+            if filename == MODEL_METADATA_FILENAME:
+                continue
+            return None
+        fingerprint.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+def read_model_metadata(location):
+    """Optional model_metadata.json next to the model files"""
+    metadata_path = os.path.join(location, MODEL_METADATA_FILENAME)
+    if not os.path.exists(metadata_path):
+        return {}
+    with open(metadata_path, encoding='utf-8') as metadata_file:
+        return json.load(metadata_file)
+
+def model_size_estimate(location=None):
+    """Bytes of the model files, used as the in-memory footprint for the memory budget"""
+    location = location or resolve_model_location()
+    if location is None:
+        return 0
+    total = 0
+    for filename in model_filenames():
+        try:
+            total += os.path.getsize(os.path.join(location, filename))
+        except OSError:
+            pass
+    return total
+
+def build_model_bundle(mmap_mode=None, location=None):
+    """Load, warm up and package a model/encoder pair into an immutable ModelBundle
+
+    With mmap_mode='r' joblib memory-maps the plain NumPy arrays in the file
+    (which must be saved uncompressed). scikit-learn's trees copy their node
+    arrays into private memory while unpickling, so a forest is not shared
+    through the mapping; forked workers share it only copy-on-write, via
+    ``--preload`` and preload_models(). Replace model files by atomic rename,
+    never in place, while they are mapped.
+    With MODEL_ENGINE=numpy the compiled .npz engine is loaded instead and
+    neither joblib nor scikit-learn is used. ``location`` defaults to the
+    probed primary model directory.
+    """
+    location = location or resolve_model_location()
+    if location is None:
+        raise FileNotFoundError('Model files not found in any expected location')
+    for filename in model_filenames():
+        if not os.path.exists(os.path.join(location, filename)):
+            raise FileNotFoundError(f'{filename} not found in {location}')
+    
+    load_started = time.perf_counter()
+    fingerprint = model_files_fingerprint(location)
+    if MODEL_ENGINE == 'numpy':
+        loaded_model, loaded_encoder = load_compiled_model(os.path.join(location, COMPILED_MODEL_FILENAME))
+    else:
+        import joblib
+        loaded_model = joblib.load(os.path.join(location, MODEL_FILENAME), mmap_mode=mmap_mode)
+        loaded_encoder = joblib.load(os.path.join(location, ENCODER_FILENAME))
+    loaded_class_names = build_class_names(loaded_model, loaded_encoder)
+    warm_up_prediction = warm_up_model(loaded_model, loaded_class_names)
+    load_seconds = time.perf_counter() - load_started
+    
+    file_metadata = read_model_metadata(location)
+    version = file_metadata.get('version')
+    if not version:
+        version = f"{DEFAULT_MODEL_VERSION}+{hashlib.sha1(repr(fingerprint).encode()).hexdigest()[:8]}"
+    
+    diseases = loaded_encoder.classes_.tolist()
+    return ModelBundle(
+        name='primary',  # replaced by the registry's name on publish
+        model=loaded_model,
+        label_encoder=loaded_encoder,
+        class_names=loaded_class_names,
+        version=str(version),
+        generation=0,
+        metadata={
+            'message': f'Models loaded from {location}',
+            'load_seconds': round(load_seconds, 3),
+            'engine': MODEL_ENGINE,
+            'mmap_mode': mmap_mode if MODEL_ENGINE != 'numpy' else None,
+            'warm_up_prediction': warm_up_prediction,
+            'model_metadata': file_metadata
+        },
+        artifacts={
+            'diseases_payload': StaticPayload({
+                'diseases': sorted(diseases),
+                'total_diseases': len(diseases),
+                'success': True
+            })
+        }
+    )
+
+model_registry = ModelRegistry(build_model_bundle, fingerprint=model_files_fingerprint)
+
+@model_registry.on_publish
+def invalidate_result_cache(bundle):
+    # Results computed by the previous model must not be served again
+    if result_cache is not None:
+        result_cache.clear()
+
+# All resident models by name; the primary model is pinned and never unloaded
+model_pool = ModelPool(memory_budget_bytes=MODEL_MEMORY_BUDGET_MB * 2 ** 20 if MODEL_MEMORY_BUDGET_MB > 0 else None)
+model_pool.add(model_registry, size_estimate=model_size_estimate, pinned=True)
+for variant_name, variant_location in MODEL_VARIANTS.items():
+    model_pool.add(
+        ModelRegistry(
+            lambda mmap_mode, location=variant_location: build_model_bundle(mmap_mode, location),
+            fingerprint=lambda location=variant_location: model_files_fingerprint(location),
+            name=variant_name
+        ),
+        size_estimate=lambda location=variant_location: model_size_estimate(location)
+    )
+
+for configured_variant in (AB_CANDIDATE_MODEL, SHADOW_MODEL):
+    if configured_variant is not None and configured_variant not in model_pool:
+        raise ValueError(f'Model variant {configured_variant!r} is not defined in MODEL_VARIANTS')
+
+shadow_scorer = ShadowScorer(
+    lambda: model_pool.get(SHADOW_MODEL, MODEL_MMAP_MODE),
+    max_queue=SHADOW_QUEUE_SIZE
+) if ML_LIBRARIES_AVAILABLE and SHADOW_MODEL else None
+
+def load_models(mmap_mode=None):
+    """Load ML models with proper error handling and flexible path detection
+
+    Builds a new bundle on the calling thread and swaps it in atomically;
+    requests already running keep using the bundle they started with.
+    """
+    # Check if ML libraries are available
+    if not ML_LIBRARIES_AVAILABLE:
+        model_registry.status = {'status': 'error', 'message': 'ML libraries (numpy) not available'}
+        logger.error("ML libraries not available")
+        return False
+    
+    return model_registry.load(mmap_mode)
+
+def get_model_bundle():
+    """The live model bundle, loading it on first use; None if models are unavailable"""
+    bundle = model_registry.current
+    if bundle is None and ML_LIBRARIES_AVAILABLE and model_registry.ensure_loaded():
+        bundle = model_registry.current
+    return bundle
+
+def choose_serving_bundle(primary_bundle):
+    """Route AB_CANDIDATE_FRACTION of requests to the A/B candidate model
+
+    The candidate is loaded in the background on first selection; until it is
+    live (or if it does not fit the memory budget) the primary model answers.
+    """
+    if AB_CANDIDATE_MODEL is None or AB_CANDIDATE_FRACTION <= 0 or random.random() >= AB_CANDIDATE_FRACTION:
+        return primary_bundle
+    return model_pool.get(AB_CANDIDATE_MODEL, MODEL_MMAP_MODE, wait=False) or primary_bundle
+
+def shadow_score(bundle, input_matrix, scored_rows):
+    """Hand answered rows to the shadow model without delaying the response"""
+    if shadow_scorer is not None and bundle.name != SHADOW_MODEL:
+        shadow_scorer.submit(input_matrix, [row['prediction'] for row in scored_rows],
+                             f'{bundle.name} {bundle.version}')
+
+def panel_identifier(panel, field):
+    """A panel's patient_id/panel_id as a string, or None when absent"""
+    value = panel.get(field) if isinstance(panel, dict) else None
+    return None if value is None or value == '' else str(value)
+
+def identifier_error(panels):
+    """Error message if any panel carries a patient/panel ID that is too long to store"""
+    for panel in panels:
+        for field in ('patient_id', 'panel_id'):
+            value = panel_identifier(panel, field)
+            if value is not None and len(value) > MAX_ID_LENGTH:
+                return f'{field} must be at most {MAX_ID_LENGTH} characters.'
+    return None
+
+def record_predictions(bundle, panels, input_matrix, scored_rows, data_qualities):
+    """Queue answered panels for the prediction log without delaying the response"""
+    if prediction_store is None:
+        return
+    created_at = time.time()
+    prediction_store.record([
+        (created_at, panel_identifier(panel, 'patient_id'), panel_identifier(panel, 'panel_id'), bundle.version,
+         bundle.name, scored['prediction'], input_matrix[row], scored['top_predictions'], data_quality)
+        for row, (panel, scored, data_quality) in enumerate(zip(panels, scored_rows, data_qualities))
+    ])
+
+def observe_drift(input_matrix, scored_rows, data_qualities):
+    """Add answered panels to the streaming drift statistics"""
+    if drift_monitor is None:
+        return
+    drift_monitor.observe(
+        input_matrix,
+        drift_monitor.missing_mask([data_quality['missing_parameters'] for data_quality in data_qualities]),
+        [scored['prediction'] for scored in scored_rows],
+        [scored['top_predictions'][0]['probability'] if scored['top_predictions'] else 0.0 for scored in scored_rows])
+
+def preload_models():
+    """Eagerly load and warm up the model before the server forks its workers
+
+    Meant to run at import time of the WSGI entry point under
+    ``gunicorn --preload``: the master pays the deserialization cost once and
+    every forked worker inherits a ready model through copy-on-write pages.
+    The surviving objects are moved out of the garbage collector's reach so
+    workers don't dirty (and so copy) those pages.
+    """
+    loaded = load_models(mmap_mode=MODEL_MMAP_MODE)
+    if loaded:
+        gc.collect()
+        gc.freeze()
+    return loaded
+
+def client_identity():
+    """Key for the client's rate-limit bucket and Idempotency-Key scope
+
+    The leftmost values of a forwarding header are whatever the client sent,
+    so only the last one, added by the proxy, is trusted. Without the header
+    this is the remote address, which TRUSTED_PROXY_HOPS resolves through
+    X-Forwarded-For.
+    """
+    if RATE_LIMIT_CLIENT_HEADER:
+        value = request.headers.get(RATE_LIMIT_CLIENT_HEADER, '').split(',')[-1].strip()
+        if value:
+            return value
+    warn_if_proxy_hides_clients()
+    return request.remote_addr or 'unknown'
+
+def warn_if_proxy_hides_clients():
+    """Log once when requests arrive through a proxy that client_identity() is not configured to see past"""
+    global proxy_warning_logged
+    if proxy_warning_logged or TRUSTED_PROXY_HOPS or RATE_LIMIT_CLIENT_HEADER:
+        return
+    if 'X-Forwarded-For' in request.headers:
+        proxy_warning_logged = True
+        logger.warning("Requests arrive through a proxy (X-Forwarded-For) but TRUSTED_PROXY_HOPS is not set; "
+                       "all clients share the proxy's rate-limit bucket and Idempotency-Key scope")
+
+def request_deadline():
+    """Seconds this request may wait for a slot: ADMISSION_QUEUE_TIMEOUT, or less if X-Request-Timeout asks"""
+    try:
+        requested = float(request.headers.get('X-Request-Timeout', ADMISSION_QUEUE_TIMEOUT))
+    except ValueError:
+        requested = ADMISSION_QUEUE_TIMEOUT
+    return min(ADMISSION_QUEUE_TIMEOUT, requested)
+
+def admission_controlled(view):
+    """Rate-limit per client, then hold a concurrency slot for the whole request
+
+    Over its rate a client gets 429; when every slot is busy and the queue
+    is full, or the request's deadline passes while it waits, 503. Both
+    carry Retry-After (seconds).
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if rate_limiter is not None:
+            wait = rate_limiter.take(client_identity())
+            if wait > 0:
+                retry_after = max(1, math.ceil(wait))
+                response = jsonify({
+                    'error': 'Rate limit exceeded. Please slow down and retry later.',
+                    'success': False,
+                    'retry_after': retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+        if admission_limiter is None:
+            return view(*args, **kwargs)
         
-        model_found = False
-        for location in possible_locations:
-            model_path = os.path.join(location, 'cbc_disease_model.joblib')
-            encoder_path = os.path.join(location, 'disease_label_encoder.joblib')
-            
-            logger.info(f"Checking models at: {location}")
-            
-            if os.path.exists(model_path) and os.path.exists(encoder_path):
-                logger.info(f"Found models at: {location}")
-                model = joblib.load(model_path)
-                label_encoder = joblib.load(encoder_path)
-                model_load_status = {'status': 'success', 'message': f'Models loaded from {location}'}
-                logger.info("Models loaded successfully")
-                model_found = True
-                break
-        
-        if not model_found:
-            model_load_status = {'status': 'error', 'message': 'Model files not found in any expected location'}
-            logger.error("Model files not found")
-            return False
+        try:
+            with STAGE_SECONDS.time(stage='admission_wait'):
+                admission_limiter.acquire(request_deadline())
+        except Overloaded as e:
+            response = jsonify({
+                'error': 'Server is overloaded. Please retry later.',
+                'success': False,
+                'reason': e.reason,
+                'retry_after': e.retry_after
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        admitted_at = time.perf_counter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission_limiter.release(time.perf_counter() - admitted_at)
+    return wrapper
+
+def idempotent(view):
+    """Replay the stored response when a request repeats an earlier Idempotency-Key
+
+    Keys are scoped to the client (client_identity()), so one client cannot
+    replay or block another's key. Behind a reverse proxy that needs
+    TRUSTED_PROXY_HOPS: without it every client has the proxy's address and
+    they all share one scope. The key is bound to a digest of the method,
+    path, query string, negotiated response format and body: reusing it for
+    a different request is rejected with 422. Server errors and streamed
+    responses are not stored, so those are recomputed on retry.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        # Without the ML libraries the predict routes only return 500s, which are never stored
+        if not key or not idempotency_store.enabled or not ML_LIBRARIES_AVAILABLE:
+            return view(*args, **kwargs)
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({
+                'error': f'Idempotency-Key must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters.',
+                'success': False
+            }), 400
         
-        return True
-            
-    except Exception as e:
-        error_msg = f"Error loading models: {str(e)}"
-        model_load_status = {'status': 'error', 'message': error_msg}
-        logger.error(error_msg)
-        return False
+        # Reading the body here consumes request.stream; request_body_stream() serves it again
+        g.request_body = request.get_data()
+        # A stored JSON response must not answer a retry that asks for binary records or NDJSON
+        response_format = negotiated_binary_format(default='any') or ('ndjson' if wants_ndjson_response() else 'json')
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (request.method, request.path, request.query_string, response_format, g.request_body):
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b'\0')
+        fingerprint = digest.digest()
+        
+        key = (client_identity(), key)
+        stored = idempotency_store.get(key, fingerprint)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return jsonify({
+                    'error': 'Idempotency-Key was already used for a different request.',
+                    'success': False
+                }), 422
+            response = app.response_class(stored.body, status=stored.status, mimetype=stored.mimetype,
+                                          headers=stored.headers)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code < 500 and not response.is_streamed:
+            headers = [(name, value) for name, value in response.headers
+                       if name.lower() not in ('content-length', 'content-type', 'set-cookie')]
+            idempotency_store.put(key, StoredResponse(fingerprint, response.status_code, response.mimetype,
+                                                      headers, response.get_data()))
+        return response
+    return wrapper
 
 @app.route('/api/predict', methods=['POST'])
+@admission_controlled
+@idempotent
 def predict():
     """Enhanced prediction endpoint with comprehensive validation and improved error handling"""
-    if model is None or label_encoder is None:
-        if not load_models():
-            return jsonify({
-                'error': 'ML models not available. Please check server configuration.',
-                'success': False,
-                'model_status': model_load_status
-            }), 500
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({
+            'error': 'ML models not available. Please check server configuration.',
+            'success': False,
+            'model_status': model_registry.status
+        }), 500
     
     try:
-        data = request.json
+        if is_binary_request():
+            return predict_binary(bundle, single=True)
+        
+        with STAGE_SECONDS.time(stage='parse_json'):
+            data = request.json
         if not data:
             return jsonify({
                 'error': 'No data provided. Please send CBC parameters in JSON format.',
                 'success': False
             }), 400
         
+        # Convert values reported in non-default units before validation
+        if isinstance(data, dict) and data.get('units'):
+            try:
+                with STAGE_SECONDS.time(stage='unit_conversion'):
+                    data = apply_unit_maps([data])[0]
+            except UnitConversionError as unit_error:
+                return jsonify({'error': str(unit_error), 'success': False}), 400
+        
+        id_error = identifier_error([data])
+        if id_error:
+            return jsonify({'error': id_error, 'success': False}), 400
+        
         # Validate and process input data
-        validation_result = validate_and_process_input(data)
+        with STAGE_SECONDS.time(stage='validate'):
+            validation_result = validate_and_process_input(data)
         if validation_result.get('error'):
             return jsonify(validation_result), 400
         
         input_data = validation_result['input_data']
         data_quality = validation_result['data_quality']
         
+        explain = request.args.get('explain', '').lower() in ('1', 'true')
+        if explain:
+            try:
+                explain_options = explanation_options()
+            except ValueError as option_error:
+                return jsonify({'error': str(option_error), 'success': False}), 400
+        
         # Make prediction with error handling
         try:
-            input_array = np.array([input_data])
-            prediction_encoded = model.predict(input_array)[0]
-            prediction = label_encoder.inverse_transform([prediction_encoded])[0]
-            
-            # Get prediction probabilities
-            probabilities = model.predict_proba(input_array)[0]
-            
-            # Get top predictions with probabilities
-            top_predictions = get_top_predictions(probabilities, label_encoder, min_probability=0.01)
+            bundle = choose_serving_bundle(bundle)
+            if explain:
+                # Refuse an unusable budget before the prediction is scored, logged and counted
+                explainer_cache.get(bundle, drift_baseline).check_budget(explain_options[1])
+            input_matrix = np.array([input_data])
+            scored = score_panels(bundle, input_matrix, [data_quality])[0]
+            SCORED_BY_MODEL.inc(model=bundle.name)
+            shadow_score(bundle, input_matrix, [scored])
+            record_predictions(bundle, [data], input_matrix, [scored], [data_quality])
+            observe_drift(input_matrix, [scored], [data_quality])
             
-            # Generate comprehensive analysis
-            analysis = generate_comprehensive_analysis(data_quality, top_predictions[0]['probability'] if top_predictions else 0)
+            binary_format = negotiated_binary_format()
+            if binary_format is not None:
+                return binary_response(binary_format, bundle, 1, [0], [scored], [data_quality], [])
             
-            return jsonify({
-                'prediction': prediction,
-                'top_predictions': top_predictions,
+            response = {
+                'prediction': scored['prediction'],
+                'top_predictions': scored['top_predictions'],
                 'data_quality': data_quality,
-                'analysis': analysis,
+                'analysis': scored['analysis'],
                 'success': True,
                 'timestamp': datetime.now().isoformat(),
-                'model_version': '2.1.0'
-            })
+                'model_version': bundle.version,
+                'model_variant': bundle.name
+            }
+            if explain:
+                response['explanation'] = explain_panel(bundle, input_data, data_quality, *explain_options)
+            
+            with STAGE_SECONDS.time(stage='serialize'):
+                return jsonify(response)
             
+        except BudgetTooSmall as budget_error:
+            return budget_too_small(budget_error)
         except Exception as pred_error:
             logger.error(f"Model prediction failed: {str(pred_error)}")
             return jsonify({
@@ -222,21 +757,501 @@ def predict():
             'success': False
         }), 500
 
-def validate_parameter_range(param, value):
-    ranges = {
-        'WBC': (0.1, 200.0), 'RBC': (0.5, 15.0), 'HGB': (1.0, 30.0), 'HCT': (5.0, 80.0),
-        'MCV': (30.0, 200.0), 'MCH': (10.0, 60.0), 'MCHC': (15.0, 50.0), 'RDW': (5.0, 40.0),
-        'PLT': (1.0, 3000.0), 'MPV': (1.0, 30.0), 'LY%': (0.0, 100.0), 'MO%': (0.0, 100.0),
-        'NE%': (0.0, 100.0), 'EO%': (0.0, 100.0), 'BA%': (0.0, 100.0), 'LY#': (0.0, 50.0),
-        'MO#': (0.0, 20.0), 'NE#': (0.0, 100.0), 'EO#': (0.0, 20.0), 'BA#': (0.0, 10.0),
-        'Age': (0.0, 120.0), 'Gender': (0, 1)
-    }
+@app.route('/api/explain', methods=['POST'])
+@admission_controlled
+def explain_prediction():
+    """Per-feature contributions to the top predicted classes for one panel
+
+    Query parameters: top_classes (1-5, default 3) and budget_ms, the time
+    allowed for scoring the perturbed panels (default ATTRIBUTION_BUDGET_MS).
+    """
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({
+            'error': 'ML models not available. Please check server configuration.',
+            'success': False,
+            'model_status': model_registry.status
+        }), 500
+    
+    try:
+        data = request.json
+        if not data:
+            return jsonify({
+                'error': 'No data provided. Please send CBC parameters in JSON format.',
+                'success': False
+            }), 400
+        try:
+            top_classes, budget_seconds = explanation_options()
+        except ValueError as option_error:
+            return jsonify({'error': str(option_error), 'success': False}), 400
+        
+        if isinstance(data, dict) and data.get('units'):
+            try:
+                data = apply_unit_maps([data])[0]
+            except UnitConversionError as unit_error:
+                return jsonify({'error': str(unit_error), 'success': False}), 400
+        validation_result = validate_and_process_input(data)
+        if validation_result.get('error'):
+            return jsonify(validation_result), 400
+        
+        data_quality = validation_result['data_quality']
+        try:
+            explanation = explain_panel(bundle, validation_result['input_data'], data_quality, top_classes,
+                                        budget_seconds)
+        except BudgetTooSmall as budget_error:
+            return budget_too_small(budget_error)
+        return jsonify({
+            'prediction': explanation['classes'][0]['disease'],
+            'explanation': explanation,
+            'data_quality': data_quality,
+            'success': True,
+            'timestamp': datetime.now().isoformat(),
+            'model_version': bundle.version,
+            'model_variant': bundle.name
+        })
+        
+    except Exception as e:
+        error_msg = f"Explain endpoint error: {str(e)}"
+        logger.error(error_msg)
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Internal server error occurred during explanation.',
+            'success': False
+        }), 500
+
+def explanation_options():
+    """(top_classes, budget in seconds) from the query string; raises ValueError with a client message"""
+    try:
+        top_classes = int(request.args.get('top_classes', ATTRIBUTION_TOP_CLASSES))
+        budget_ms = float(request.args.get('budget_ms', ATTRIBUTION_BUDGET_MS))
+    except ValueError:
+        raise ValueError('top_classes must be an integer and budget_ms a number.') from None
+    if not 1 <= top_classes <= 5:
+        raise ValueError('top_classes must be between 1 and 5.')
+    if not budget_ms > 0:
+        raise ValueError('budget_ms must be positive.')
+    return top_classes, min(budget_ms, ATTRIBUTION_MAX_BUDGET_MS) / 1000
+
+def budget_too_small(error):
+    """400 response for a budget_ms that cannot explain a single feature, with the least one that can"""
+    return jsonify({
+        'error': str(error),
+        'minimum_budget_ms': math.ceil(error.minimum_seconds * 1e6) / 1000,
+        'max_budget_ms': ATTRIBUTION_MAX_BUDGET_MS,
+        'success': False
+    }), 400
+
+def explain_panel(bundle, input_data, data_quality, top_classes, budget_seconds):
+    """Occlusion attributions for one validated panel, scored in a single predict_proba call"""
+    explainer = explainer_cache.get(bundle, drift_baseline)
+    missing = set(data_quality['missing_parameters'])
+    with STAGE_SECONDS.time(stage='attribution'):
+        return explainer.explain(input_data, [feature in missing for feature in FEATURES], top_classes,
+                                 budget_seconds)
+
+@app.route('/api/predict/batch', methods=['POST'])
+@admission_controlled
+@idempotent
+def predict_batch():
+    """Batch prediction endpoint - validates many panels and scores them with one model call"""
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({
+            'error': 'ML models not available. Please check server configuration.',
+            'success': False,
+            'model_status': model_registry.status
+        }), 500
+    
+    try:
+        if is_binary_request():
+            return predict_binary(bundle)
+        
+        with STAGE_SECONDS.time(stage='parse_batch'):
+            panels, batch_units, parse_error = read_batch_panels()
+        if parse_error:
+            return jsonify({'error': parse_error, 'success': False}), 400
+        
+        if not panels:
+            return jsonify({
+                'error': 'No panels provided. Send a JSON array of CBC panels or NDJSON (one panel per line).',
+                'success': False
+            }), 400
+        
+        if len(panels) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Batch too large: {len(panels)} panels (maximum {MAX_BATCH_SIZE}).',
+                'success': False
+            }), 413
+        
+        return predict_panels(bundle, panels, batch_units)
+        
+    except Exception as e:
+        error_msg = f"Batch prediction endpoint error: {str(e)}"
+        logger.error(error_msg)
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Internal server error occurred during batch prediction.',
+            'success': False
+        }), 500
+
+@app.route('/api/predict/report', methods=['POST'])
+@admission_controlled
+@idempotent
+def predict_report():
+    """Predict from plain-text lab reports - one or many per body, parsed line by line"""
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({
+            'error': 'ML models not available. Please check server configuration.',
+            'success': False,
+            'model_status': model_registry.status
+        }), 500
+    
+    try:
+        with STAGE_SECONDS.time(stage='parse_report'):
+            panels, annotations, parse_error = read_report_panels()
+        if parse_error:
+            return jsonify({'error': parse_error, 'success': False}), 413
+        
+        if not panels:
+            return jsonify({
+                'error': 'No CBC results found. Send the report as text/plain (or as a "file" upload) '
+                         'with one "Name: value [unit]" line per result.',
+                'success': False
+            }), 400
+        
+        return predict_panels(bundle, panels, annotations=annotations)
+        
+    except Exception as e:
+        error_msg = f"Report prediction endpoint error: {str(e)}"
+        logger.error(error_msg)
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Internal server error occurred during report prediction.',
+            'success': False
+        }), 500
+
+def read_report_panels():
+    """Parse the request body (or its "file" upload) into panels, streaming it line by line
+
+    Returns (panels, per-panel {'report': {'line', 'notes'}} annotations, error message or None).
+    """
+    source = request.files['file'].stream if 'file' in request.files else request_body_stream()
+    panels, annotations = [], []
+    for report in iter_reports(source):
+        if len(panels) >= MAX_BATCH_SIZE:
+            return None, None, f'Too many reports: more than {MAX_BATCH_SIZE} in one request.'
+        panels.append(report.panel)
+        annotations.append({'report': {'line': report.line, 'notes': report.notes}})
+    return panels, annotations, None
+
+def predict_panels(bundle, panels, batch_units=None, annotations=None):
+    """Validate, score and answer a list of panels as a batch response (JSON, NDJSON or binary)
+
+    ``annotations`` optionally holds one dict per panel merged into its result.
+    """
+    id_error = identifier_error(panels)
+    if id_error:
+        return jsonify({'error': id_error, 'success': False}), 400
+    
+    try:
+        with STAGE_SECONDS.time(stage='unit_conversion'):
+            panels = apply_unit_maps(panels, batch_units)
+    except UnitConversionError as unit_error:
+        return jsonify({'error': str(unit_error), 'success': False}), 400
+    
+    with STAGE_SECONDS.time(stage='validate_batch'):
+        batch = validate_and_process_batch(panels)
+    return answer_batch(bundle, panels, batch, annotations)
+
+def answer_batch(bundle, panels, batch, annotations=None):
+    """Score a validated batch and build the response in the negotiated format (JSON, NDJSON or binary)"""
+    row_indices = batch['row_indices']
+    scored_rows = []
+    bundle = choose_serving_bundle(bundle)
+    if row_indices:
+        try:
+            # Cache misses are scored together in one probability pass
+            scored_rows = score_panels(bundle, batch['input_matrix'], batch['data_quality'])
+            SCORED_BY_MODEL.inc(model=bundle.name)
+            shadow_score(bundle, batch['input_matrix'], scored_rows)
+            record_predictions(bundle, [panels[index] for index in row_indices], batch['input_matrix'],
+                               scored_rows, batch['data_quality'])
+            observe_drift(batch['input_matrix'], scored_rows, batch['data_quality'])
+        except Exception as pred_error:
+            logger.error(f"Batch model prediction failed: {str(pred_error)}")
+            return jsonify({
+                'error': 'Prediction model encountered an error. Please check your input data.',
+                'success': False
+            }), 500
+    
+    binary_format = negotiated_binary_format(default=binary_request_format())
+    if binary_format is not None:
+        return binary_response(binary_format, bundle, len(panels), row_indices, scored_rows, batch['data_quality'],
+                               batch['errors'])
+    
+    results = iter_batch_results(len(panels), batch, scored_rows, annotations)
+    if wants_ndjson_response():
+        # One result per line, encoded as the client reads; the body is never built in memory
+        return Response(stream_ndjson(results), mimetype='application/x-ndjson', headers={
+            'X-Total-Panels': str(len(panels)),
+            'X-Successful-Predictions': str(len(row_indices)),
+            'X-Failed-Predictions': str(len(batch['errors'])),
+            'X-Model-Version': bundle.version,
+            'X-Model-Variant': bundle.name
+        })
     
-    if param in ranges:
-        min_val, max_val = ranges[param]
-        if value < min_val or value > max_val:
-            return False
-    return True
+    with STAGE_SECONDS.time(stage='serialize'):
+        return jsonify({
+            'results': list(results),
+            'total_panels': len(panels),
+            'successful_predictions': len(row_indices),
+            'failed_predictions': len(batch['errors']),
+            'success': True,
+            'timestamp': datetime.now().isoformat(),
+            'model_version': bundle.version,
+            'model_variant': bundle.name
+        })
+
+def is_binary_request():
+    return binary_request_format() is not None
+
+def binary_request_format():
+    """'raw' or 'msgpack' for a binary request body, None for anything else"""
+    if request.mimetype == FLOAT32_MIMETYPE:
+        return 'raw'
+    if request.mimetype in MSGPACK_MIMETYPES:
+        return 'msgpack'
+    return None
+
+def predict_binary(bundle, single=False):
+    """Score float32 panels sent raw or as MessagePack; decoded with np.frombuffer, no per-value parsing"""
+    request_format = binary_request_format()
+    if request_format == 'msgpack' and not msgpack_available():
+        return jsonify({
+            'error': f'MessagePack is not available on this server; send {FLOAT32_MIMETYPE} instead.',
+            'success': False
+        }), 415
+    
+    try:
+        with STAGE_SECONDS.time(stage='parse_binary'):
+            body = request.get_data()
+            if request_format == 'msgpack':
+                matrix, patient_ids, panel_ids = decode_msgpack(body, len(FEATURES))
+            else:
+                matrix, patient_ids, panel_ids = decode_float32(body, len(FEATURES)), None, None
+    except BinaryFormatError as format_error:
+        return jsonify({'error': str(format_error), 'success': False}), 400
+    if single and len(matrix) != 1:
+        return jsonify({
+            'error': f'/api/predict takes exactly one panel ({len(matrix)} sent); use /api/predict/batch for more.',
+            'success': False
+        }), 400
+    if len(matrix) > MAX_BATCH_SIZE:
+        return jsonify({
+            'error': f'Batch too large: {len(matrix)} panels (maximum {MAX_BATCH_SIZE}).',
+            'success': False
+        }), 413
+    
+    # Only the identifiers travel as Python objects; values stay in the matrix
+    panels = [{} for _ in range(len(matrix))]
+    for field, values in (('patient_id', patient_ids), ('panel_id', panel_ids)):
+        if values is not None:
+            for panel, value in zip(panels, values):
+                panel[field] = value
+    id_error = identifier_error(panels)
+    if id_error:
+        return jsonify({'error': id_error, 'success': False}), 400
+    
+    with STAGE_SECONDS.time(stage='validate_batch'):
+        batch = batch_from_validated(cbc_schema.validate_matrix(matrix))
+    return answer_batch(bundle, panels, batch)
+
+def negotiated_binary_format(default=None):
+    """'raw' or 'msgpack' when the Accept header prefers a binary response; ``default`` if it expresses no preference"""
+    accept = request.accept_mimetypes
+    if not accept or accept.best == '*/*':
+        return default
+    offered = ('application/json', RESULT_MIMETYPE) + (MSGPACK_MIMETYPES if msgpack_available() else ())
+    best = accept.best_match(offered)
+    if best == RESULT_MIMETYPE:
+        return 'raw'
+    if best in MSGPACK_MIMETYPES:
+        return 'msgpack'
+    return None
+
+def binary_response(binary_format, bundle, total_panels, row_indices, scored_rows, data_qualities, errors):
+    """Fixed-size result records (binary_format.RESULT_DTYPE), bare or wrapped in MessagePack"""
+    with STAGE_SECONDS.time(stage='serialize'):
+        records = encode_results(total_panels, row_indices, scored_rows, data_qualities, bundle.class_names, FEATURES)
+        class_names = [str(name) for name in bundle.class_names]
+        if binary_format == 'msgpack':
+            return app.response_class(encode_msgpack(records, {
+                'classes': class_names,
+                'model_version': bundle.version,
+                'model_variant': bundle.name,
+                'errors': {row_error['index']: row_error['error'] for row_error in errors}
+            }), mimetype=MSGPACK_MIMETYPES[0])
+        return app.response_class(records, mimetype=RESULT_MIMETYPE, headers={
+            'X-Class-Names': json.dumps(class_names, ensure_ascii=True, separators=(',', ':')),
+            'X-Model-Version': bundle.version,
+            'X-Model-Variant': bundle.name,
+            'X-Total-Panels': str(total_panels),
+            'X-Successful-Predictions': str(len(row_indices)),
+            'X-Failed-Predictions': str(len(errors))
+        })
+
+def iter_batch_results(total_panels, batch, scored_rows, annotations=None):
+    """Yield the per-panel result dicts of a batch in input order"""
+    errors = {row_error['index']: row_error for row_error in batch['errors']}
+    rows = {index: row for row, index in enumerate(batch['row_indices'])}
+    for index in range(total_panels):
+        if index in errors:
+            result = errors[index]
+        else:
+            row = rows[index]
+            result = {
+                'index': index,
+                'prediction': scored_rows[row]['prediction'],
+                'top_predictions': scored_rows[row]['top_predictions'],
+                'data_quality': batch['data_quality'][row],
+                'analysis': scored_rows[row]['analysis'],
+                'success': True
+            }
+        if annotations is not None:
+            result.update(annotations[index])
+        yield result
+
+def wants_ndjson_response():
+    """NDJSON batch output via ?format=ndjson or an Accept header preferring NDJSON over JSON"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    best = request.accept_mimetypes.best_match(('application/json',) + NDJSON_MIMETYPES)
+    return best in NDJSON_MIMETYPES
+
+def stream_ndjson(rows):
+    """Encode rows lazily, one JSON document per line"""
+    dumps_line = app.json.dumps_line
+    for row in rows:
+        yield dumps_line(row)
+
+def score_panels(bundle, input_matrix, data_qualities):
+    """Score validated feature rows, serving repeated panels from the result cache
+
+    Returns one {'prediction', 'top_predictions', 'analysis'} dict per row. Rows
+    that miss the cache are scored together in a single predict_proba call.
+    """
+    with STAGE_SECONDS.time(stage='cache_lookup'):
+        cache_keys = [
+            PredictionCache.make_key(input_matrix[row], data_quality['missing_parameters'],
+                                     f'{bundle.name}:{bundle.version}#{bundle.generation}')
+            for row, data_quality in enumerate(data_qualities)
+        ]
+        scored = [result_cache.get(key) for key in cache_keys]
+    misses = [row for row, result in enumerate(scored) if result is None]
+    if not misses:
+        return scored
+    
+    if single_flight is not None and len(misses) == 1:
+        # Concurrent identical panels (retries, one record opened twice) share one model call
+        row = misses[0]
+        scored[row], _ = single_flight.do(
+            cache_keys[row], lambda: score_cache_misses(bundle, input_matrix, data_qualities, cache_keys, misses)[0],
+            timeout=SINGLE_FLIGHT_TIMEOUT)
+        return scored
+    
+    for row, result in zip(misses, score_cache_misses(bundle, input_matrix, data_qualities, cache_keys, misses)):
+        scored[row] = result
+    return scored
+
+def score_cache_misses(bundle, input_matrix, data_qualities, cache_keys, misses):
+    """Score the ``misses`` rows in one model call and cache each result"""
+    with STAGE_SECONDS.time(stage='predict_proba'):
+        if micro_batcher is not None and len(misses) == 1:
+            # Coalesced with concurrent single-panel requests into one model call
+            probabilities = micro_batcher.score_rows(input_matrix[misses], bundle, timeout=MICROBATCH_TIMEOUT)
+            predicted_indices = np.argmax(probabilities, axis=1)
+        else:
+            # Single probability pass; each label is the argmax of its row
+            probabilities, predicted_indices = predict_probabilities(bundle.model, input_matrix[misses])
+    
+    with STAGE_SECONDS.time(stage='top_predictions'):
+        top_predictions = [get_top_predictions(probabilities[position], bundle.class_names, min_probability=0.01)
+                           for position in range(len(misses))]
+    
+    results = []
+    with STAGE_SECONDS.time(stage='analysis'):
+        for position, row in enumerate(misses):
+            top = top_predictions[position]
+            result = {
+                'prediction': str(bundle.class_names[predicted_indices[position]]),
+                'top_predictions': top,
+                'analysis': generate_comprehensive_analysis(data_qualities[row], top[0]['probability'] if top else 0)
+            }
+            result_cache.put(cache_keys[row], result)
+            results.append(result)
+    return results
+
+def request_body_stream():
+    """The request body as a line-iterable stream, even once @idempotent has read it"""
+    body = g.get('request_body')
+    return io.BytesIO(body) if body is not None else request.stream
+
+def read_batch_panels():
+    """Read CBC panels from a JSON array, a {"panels": [...]} object or an NDJSON stream
+
+    Returns (panels, batch-wide units map or None, error message or None).
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        panels = []
+        for line_number, line in enumerate(request_body_stream(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(panels) >= MAX_BATCH_SIZE:
+                return None, None, f'Batch too large: more than {MAX_BATCH_SIZE} panels.'
+            try:
+                panels.append(app.json.loads(line))
+            except ValueError:
+                return None, None, f'Invalid JSON on NDJSON line {line_number}.'
+        return panels, None, None
+    
+    data = request.get_json(silent=True)
+    batch_units = None
+    if isinstance(data, dict):
+        batch_units = data.get('units')
+        data = data.get('panels')
+    if data is None:
+        return [], None, None
+    if not isinstance(data, list):
+        return None, None, 'Batch payload must be a JSON array of CBC panels.'
+    return data, batch_units, None
+
+def apply_unit_maps(panels, batch_units=None, to_units=None):
+    """Convert panels to ``to_units`` (default units otherwise) using each panel's 'units' map (or the batch-wide one)
+
+    Panels sharing the same units map are converted together in one vectorized pass.
+    """
+    check_unit_map(batch_units, 'units')
+    check_unit_map(to_units, 'to_units')
+    groups = {}
+    for index, panel in enumerate(panels):
+        if not isinstance(panel, dict):
+            continue
+        units = panel.get('units') or batch_units or {}
+        check_unit_map(units, 'units')
+        if not units and not to_units:
+            continue
+        groups.setdefault(tuple(sorted(units.items())), []).append(index)
+    
+    if not groups:
+        return panels
+    
+    converted = list(panels)
+    for units, indices in groups.items():
+        for index, panel in zip(indices, convert_panels([panels[i] for i in indices], dict(units), to_units)):
+            converted[index] = panel
+    return converted
 
 def get_confidence_level(probability):
     """Convert probability to confidence level description"""
@@ -253,89 +1268,50 @@ def get_confidence_level(probability):
 
 def validate_and_process_input(data):
     """Validate and process input data with enhanced error handling"""
-    features = [
-        'WBC', 'LY%', 'MO%', 'NE%', 'EO%', 'BA%', 'LY#', 'MO#', 'NE#', 'EO#', 'BA#',
-        'RBC', 'HGB', 'HCT', 'MCV', 'MCHC', 'MCH', 'RDW', 'PLT', 'MPV', 'Age', 'Gender'
-    ]
-    
-    critical_params = ['WBC', 'RBC', 'HGB', 'HCT', 'PLT', 'Age', 'Gender']
-    defaults = {
-        'WBC': 7.5, 'RBC': 4.8, 'HGB': 14, 'HCT': 42, 'PLT': 250, 'Age': 35, 'Gender': 1
-    }
-    
-    input_data = []
-    missing_params = []
-    invalid_params = []
-    warnings = []
-    out_of_range_params = []
-    
-    for feature in features:
-        if feature not in data or data[feature] is None or data[feature] == '':
-            if feature in critical_params:
-                input_data.append(defaults[feature])
-                missing_params.append(feature)
-            else:
-                input_data.append(0)  # Use 0 for non-critical missing parameters
-                missing_params.append(feature)
-        else:
-            try:
-                value = float(data[feature])
-                
-                # Validate range
-                if not validate_parameter_range(feature, value):
-                    out_of_range_params.append(f"{feature}={value}")
-                    warnings.append(f"WARNING: {feature}={value} is outside normal range")
-                
-                input_data.append(value)
-                
-            except (ValueError, TypeError):
-                if feature in critical_params:
-                    input_data.append(defaults[feature])
-                    missing_params.append(feature)
-                else:
-                    input_data.append(0)
-                    missing_params.append(feature)
-                invalid_params.append(f"{feature}={data[feature]}")
-    
-    # Calculate data quality metrics
-    completeness = ((len(features) - len(missing_params)) / len(features)) * 100
-    
-    # Check if we have enough data to make a reliable prediction
-    critical_missing = [p for p in missing_params if p in critical_params]
-    if len(critical_missing) > 3:  # Too many critical parameters missing
-        return {
-            'error': f'Too many critical parameters missing: {", ".join(critical_missing)}. Please provide at least basic CBC values.',
-            'success': False
-        }
+    input_data, data_quality, error = cbc_schema.validate_panel(data)
+    if error:  # Too many critical parameters missing
+        return {'error': error, 'success': False}
     
-    data_quality = {
-        'completeness_percentage': round(completeness, 1),
-        'missing_parameters': missing_params,
-        'invalid_parameters': invalid_params,
-        'out_of_range_parameters': out_of_range_params,
-        'warnings': warnings,
-        'total_parameters': len(features),
-        'provided_parameters': len(features) - len(missing_params),
-        'critical_missing': critical_missing
+    return {
+        'input_data': input_data,
+        'data_quality': data_quality,
+        'success': True
     }
+
+def validate_and_process_batch(panels):
+    """Validate many panels into one feature matrix using column-wise range checks"""
+    return batch_from_validated(cbc_schema.validate(panels))
+
+def batch_from_validated(validated):
+    """Split ValidatedPanels into the accepted rows' matrix and data quality, and per-panel errors"""
+    row_indices = []
+    data_quality = []
+    errors = []
+    for i, (panel_quality, error) in enumerate(cbc_schema.reports(validated)):
+        if error:
+            errors.append({'index': i, 'error': error, 'success': False})
+            continue
+        row_indices.append(i)
+        data_quality.append(panel_quality)
     
     return {
-        'input_data': input_data,
+        'input_matrix': validated.values[row_indices],
+        'row_indices': row_indices,
         'data_quality': data_quality,
+        'errors': errors,
         'success': True
     }
 
-def get_top_predictions(probabilities, label_encoder, min_probability=0.01, max_predictions=5):
+def get_top_predictions(probabilities, class_names, min_probability=0.01, max_predictions=5):
     """Get top predictions with probabilities"""
-    top_indices = np.argsort(probabilities)[::-1][:max_predictions]
+    top_indices = top_k_indices(probabilities, max_predictions)
     top_predictions = []
     
     for idx in top_indices:
         prob = float(probabilities[idx])
         if prob >= min_probability:
-            disease = label_encoder.inverse_transform([idx])[0]
             top_predictions.append({
-                'disease': disease,
+                'disease': str(class_names[idx]),
                 'probability': prob,
                 'percentage': round(prob * 100, 2),
                 'confidence_level': get_confidence_level(prob)
@@ -409,21 +1385,16 @@ def generate_interpretation_note(missing_params, warnings, completeness):
 @app.route('/api/diseases', methods=['GET'])
 def get_diseases():
     """Get list of diseases the model can predict"""
-    if model is None or label_encoder is None:
-        if not load_models():
-            return jsonify({
-                'error': 'Models not available',
-                'success': False,
-                'model_status': model_load_status
-            }), 500
+    bundle = get_model_bundle()
+    if bundle is None:
+        return jsonify({
+            'error': 'Models not available',
+            'success': False,
+            'model_status': model_registry.status
+        }), 500
     
     try:
-        diseases = label_encoder.classes_.tolist()
-        return jsonify({
-            'diseases': sorted(diseases),
-            'total_diseases': len(diseases),
-            'success': True
-        })
+        return static_payload_response(bundle.artifacts['diseases_payload'])
     except Exception as e:
         logger.error(f"Error getting diseases: {str(e)}")
         return jsonify({'error': str(e), 'success': False}), 500
@@ -431,17 +1402,46 @@ def get_diseases():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Comprehensive health check endpoint with detailed system information"""
-    models_loaded = model is not None and label_encoder is not None
+    bundle = model_registry.current
+    # Bundles are only published after their warm-up inference succeeded
+    models_loaded = bundle is not None
+    
+    # Saturated: the predict routes are shedding load, so the load balancer should route elsewhere
+    saturated = admission_limiter is not None and admission_limiter.saturated
     
     health_data = {
-        'status': 'healthy' if models_loaded else 'degraded',
+        'status': 'saturated' if saturated else 'healthy' if models_loaded else 'degraded',
         'timestamp': datetime.now().isoformat(),
         'version': '2.1.0',
         'models': {
-            'disease_model_loaded': model is not None,
-            'label_encoder_loaded': label_encoder is not None,
-            'total_diseases': len(label_encoder.classes_) if label_encoder is not None else 0,
-            'model_status': model_load_status
+            'disease_model_loaded': models_loaded,
+            'label_encoder_loaded': models_loaded,
+            'model_ready': models_loaded,
+            'model_version': bundle.version if models_loaded else None,
+            'total_diseases': len(bundle.class_names) if models_loaded else 0,
+            'model_status': model_registry.status,
+            'reload': model_registry.stats()
+        },
+        'cache': result_cache.stats() if result_cache is not None else {'enabled': False},
+        'microbatching': micro_batcher.stats() if micro_batcher is not None else {'enabled': False},
+        'prediction_store': prediction_store.stats() if prediction_store is not None else {'enabled': False},
+        'drift': drift_health(),
+        'attribution': explainer_cache.stats() if explainer_cache is not None else {'enabled': False},
+        'admission': {
+            'concurrency': admission_limiter.stats() if admission_limiter is not None else {'enabled': False},
+            'queue_timeout_seconds': ADMISSION_QUEUE_TIMEOUT,
+            'rate_limit': rate_limiter.stats() if rate_limiter is not None else {'enabled': False}
+        },
+        'deduplication': {
+            'single_flight': single_flight.stats() if single_flight is not None else {'enabled': False},
+            'idempotency': idempotency_store.stats()
+        },
+        'model_pool': {
+            **model_pool.stats(),
+            'ab_candidate': AB_CANDIDATE_MODEL,
+            'ab_candidate_fraction': AB_CANDIDATE_FRACTION if AB_CANDIDATE_MODEL else 0.0,
+            'shadow_model': SHADOW_MODEL,
+            'shadow': shadow_scorer.stats() if shadow_scorer is not None else {'enabled': False}
         },
         'system': {
             'python_version': sys.version.split()[0],
@@ -461,6 +1461,9 @@ def health_check():
     # Add warnings if models not loaded
     if not models_loaded:
         health_data['warnings'] = ['ML models not loaded - predictions unavailable']
+    if saturated:
+        health_data.setdefault('warnings', []).append('Prediction capacity saturated - requests are being shed')
+        return jsonify(health_data), 503
     
     return jsonify(health_data)
 
@@ -473,45 +1476,51 @@ def index():
         'endpoints': {
             'health': '/api/health',
             'predict': '/api/predict (POST)',
+            'predict_batch': '/api/predict/batch (POST, JSON array or NDJSON)',
+            'predict_report': '/api/predict/report (POST, plain-text lab reports)',
             'diseases': '/api/diseases',
-            'parameters': '/api/parameters'
+            'parameters': '/api/parameters',
+            'history': '/api/history?patient_id=... (when PREDICTION_STORE_PATH and ADMIN_TOKEN are set)',
+            'drift': '/api/drift (GET, input and prediction drift statistics)',
+            'explain': '/api/explain (POST, per-feature contributions to the top classes)',
+            'metrics': '/api/metrics'
         },
-        'models_loaded': model is not None and label_encoder is not None,
+        'models_loaded': model_registry.current is not None,
         'description': 'Manual CBC parameter input for disease prediction'
     })
 
+def static_payload_response(payload):
+    """Serve a pre-serialized payload with ETag revalidation and pre-compressed bodies"""
+    encoding, body = payload.select_encoding(request.accept_encodings)
+    if payload.matches(request.if_none_match):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(payload.etag_for(encoding))
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_CACHE_MAX_AGE}'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/api/parameters', methods=['GET'])
 def get_parameters():
     """Get comprehensive information about CBC parameters"""
+    global parameters_payload
+    
+    if parameters_payload is None:
+        parameters_payload = StaticPayload(build_parameters_info())
+    return static_payload_response(parameters_payload)
+
+def build_parameters_info():
+    """Units, normal ranges and descriptions of every CBC parameter"""
     parameters = {
         'required': [
             'WBC', 'LY%', 'MO%', 'NE%', 'EO%', 'BA%', 'LY#', 'MO#', 'NE#', 'EO#', 'BA#',
             'RBC', 'HGB', 'HCT', 'MCV', 'MCHC', 'MCH', 'RDW', 'PLT', 'MPV', 'Age', 'Gender'
         ],
         'critical': ['WBC', 'RBC', 'HGB', 'HCT', 'PLT', 'Age', 'Gender'],
-        'units': {
-            'WBC': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'RBC': {'default': '10⁶/μL', 'alternatives': ['M/μL', 'cells/μL', '10¹²/L']},
-            'HGB': {'default': 'g/dL', 'alternatives': ['g/L', 'mmol/L']},
-            'HCT': {'default': '%', 'alternatives': ['L/L', 'fraction']},
-            'MCV': {'default': 'fL', 'alternatives': ['μm³']},
-            'MCH': {'default': 'pg', 'alternatives': ['fmol']},
-            'MCHC': {'default': 'g/dL', 'alternatives': ['g/L', 'mmol/L']},
-            'RDW': {'default': '%', 'alternatives': ['CV%']},
-            'PLT': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'MPV': {'default': 'fL', 'alternatives': ['μm³']},
-            'Age': {'default': 'years', 'alternatives': ['months', 'days']},
-            'LY%': {'default': '%', 'alternatives': ['fraction']},
-            'MO%': {'default': '%', 'alternatives': ['fraction']},
-            'NE%': {'default': '%', 'alternatives': ['fraction']},
-            'EO%': {'default': '%', 'alternatives': ['fraction']},
-            'BA%': {'default': '%', 'alternatives': ['fraction']},
-            'LY#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'MO#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'NE#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'EO#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
-            'BA#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']}
-        },
+        'units': PARAMETER_UNITS,
         'normal_ranges': {
             # Based on standard medical reference ranges
             'WBC': {'min': 4.0, 'max': 11.0, 'unit': '10³/μL', 'note': 'White Blood Cell Count'},
@@ -545,9 +1554,11 @@ def get_parameters():
             'PLT': 'Platelet Count - measures blood clotting cells',
             'Age': 'Patient age in years',
             'Gender': 'Patient gender (0=Female, 1=Male)'
-        }
+        },
     }
-    return jsonify(parameters)
+    if ML_LIBRARIES_AVAILABLE:
+        parameters['binary_formats'] = describe_binary_formats(FEATURES)
+    return parameters
 
 @app.route('/api/convert', methods=['POST'])
 def convert_units():
@@ -570,21 +1581,68 @@ def convert_units():
         except ValueError:
             return jsonify({'error': 'Value must be a number'}), 400
         
-        # Convert to default unit first
-        converted_value = convert_to_default_unit(parameter, value, from_unit)
+        if to_unit == 'default':
+            converted_value = convert_to_default_unit(parameter, value, from_unit)
+        else:
+            try:
+                converted_value = convert_value(parameter, value, from_unit, to_unit)
+            except UnitConversionError as unit_error:
+                return jsonify({'error': str(unit_error), 'success': False}), 400
         
         return jsonify({
             'parameter': parameter,
             'original_value': value,
             'original_unit': from_unit,
             'converted_value': converted_value,
-            'converted_unit': 'default',
+            'converted_unit': to_unit,
             'success': True
         })
         
     except Exception as e:
         return jsonify({'error': f'Conversion failed: {str(e)}'}), 500
 
+@app.route('/api/convert/batch', methods=['POST'])
+def convert_units_batch():
+    """Convert whole panels (or arrays of panels) between units in one pass
+
+    Body: {"panel": {...}} or {"panels": [...]}, plus "units" (parameter -> reported
+    unit) and optional "to_units" (parameter -> target unit, default unit otherwise).
+    Panels may carry their own "units" map, which overrides the shared one.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'No data provided', 'success': False}), 400
+        
+        single_panel = 'panel' in data
+        panels = [data['panel']] if single_panel else data.get('panels')
+        if not isinstance(panels, list) or not all(isinstance(panel, dict) for panel in panels):
+            return jsonify({'error': 'Provide "panel" as an object or "panels" as an array of objects', 'success': False}), 400
+        if len(panels) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Batch too large: {len(panels)} panels (maximum {MAX_BATCH_SIZE}).',
+                'success': False
+            }), 413
+        
+        to_units = data.get('to_units') or {}
+        try:
+            converted = apply_unit_maps(panels, data.get('units'), to_units)
+        except UnitConversionError as unit_error:
+            return jsonify({'error': str(unit_error), 'success': False}), 400
+        
+        # Strip the consumed units maps; values are now in the target units
+        converted = [{key: value for key, value in panel.items() if key != 'units'} for panel in converted]
+        response = {'to_units': to_units or 'default', 'success': True}
+        if single_panel:
+            response['panel'] = converted[0]
+        else:
+            response['panels'] = converted
+            response['total_panels'] = len(converted)
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'error': f'Conversion failed: {str(e)}', 'success': False}), 500
+
 @app.route('/api/validate', methods=['POST'])
 def validate_input():
     """Validate input parameters without making a prediction"""
@@ -596,6 +1654,13 @@ def validate_input():
                 'success': False
             }), 400
         
+        # Same unit conversion as /api/predict, so both judge the same values
+        if isinstance(data, dict) and data.get('units'):
+            try:
+                data = apply_unit_maps([data])[0]
+            except UnitConversionError as unit_error:
+                return jsonify({'error': str(unit_error), 'success': False}), 400
+        
         validation_result = validate_and_process_input(data)
         
         return jsonify({
@@ -613,6 +1678,289 @@ def validate_input():
 
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Starts the model file watcher once per worker process when configured
+    model_registry.ensure_watcher(MODEL_WATCH_INTERVAL, MODEL_MMAP_MODE)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+def collect_runtime_metrics():
+    """Model, cache and micro-batching state sampled at scrape time"""
+    bundle = model_registry.current
+    families = [
+        ('checkwise_model_info', 'gauge', 'Currently loaded model version and load generation',
+         [({'version': bundle.version, 'generation': bundle.generation}, 1)] if bundle is not None else []),
+        ('checkwise_model_ready', 'gauge', '1 once the model has passed its warm-up inference',
+         [({}, int(bundle is not None))]),
+        ('checkwise_model_load_seconds', 'gauge', 'Duration of the last successful model load',
+         [({}, bundle.metadata['load_seconds'])] if bundle is not None else []),
+        ('checkwise_model_reloads_total', 'counter', 'Model loads by outcome',
+         [({'outcome': 'success'}, model_registry.reloads_succeeded),
+          ({'outcome': 'failure'}, model_registry.reloads_failed)]),
+    ]
+    if result_cache is not None:
+        cache_stats = result_cache.stats()
+        families += [
+            ('checkwise_result_cache_entries', 'gauge', 'Entries in the prediction result cache',
+             [({}, cache_stats['entries'])]),
+            ('checkwise_result_cache_events_total', 'counter', 'Prediction result cache events',
+             [({'event': event}, cache_stats[event]) for event in ('hits', 'misses', 'evictions', 'expirations')]),
+        ]
+    if prediction_store is not None:
+        store_stats = prediction_store.stats()
+        families += [
+            ('checkwise_prediction_store_queue_depth', 'gauge', 'Prediction log batches waiting for the writer',
+             [({}, store_stats['queue_depth'])]),
+            ('checkwise_prediction_store_rows_total', 'counter', 'Prediction log rows by outcome',
+             [({'outcome': outcome}, store_stats[outcome]) for outcome in ('written', 'dropped')]),
+            ('checkwise_prediction_store_write_failures_total', 'counter', 'Prediction log batches that failed to commit',
+             [({}, store_stats['failures'])]),
+        ]
+    if admission_limiter is not None:
+        admission_stats = admission_limiter.stats()
+        families += [
+            ('checkwise_admission_active', 'gauge', 'Predict requests holding a concurrency slot',
+             [({}, admission_stats['active'])]),
+            ('checkwise_admission_queue_depth', 'gauge', 'Predict requests waiting for a concurrency slot',
+             [({}, admission_stats['queue_depth'])]),
+            ('checkwise_admission_saturated', 'gauge', '1 while the predict routes are shedding load',
+             [({}, int(admission_stats['saturated']))]),
+            ('checkwise_admission_shed_total', 'counter', 'Predict requests rejected with 503 by reason',
+             [({'reason': reason}, count) for reason, count in admission_stats['shed'].items()]),
+        ]
+    if rate_limiter is not None:
+        rate_stats = rate_limiter.stats()
+        families += [
+            ('checkwise_rate_limited_total', 'counter', 'Predict requests rejected with 429 by the per-client rate limit',
+             [({}, rate_stats['limited'])]),
+            ('checkwise_rate_limit_clients', 'gauge', 'Clients with a tracked rate-limit bucket',
+             [({}, rate_stats['clients'])]),
+        ]
+    if drift_monitor is not None:
+        snapshot = drift_monitor.snapshot()
+        families += [
+            ('checkwise_drift_rows_total', 'counter', 'Panels added to the streaming drift statistics',
+             [({}, drift_monitor.rows_total)]),
+            ('checkwise_drift_window_rows', 'gauge', 'Panels in the current drift window',
+             [({}, snapshot['rows'])]),
+        ]
+        if drift_baseline is not None:
+            drift = drift_scores(snapshot, drift_baseline)
+            scores = [({'statistic': feature}, entry['psi']) for feature, entry in drift['features'].items()]
+            scores += [({'statistic': name}, drift[name]['psi']) for name in ('classes', 'confidence')]
+            families += [
+                ('checkwise_drift_psi', 'gauge', 'Population stability index against the drift baseline',
+                 [(labels, value) for labels, value in scores if value is not None]),
+            ]
+    if single_flight is not None:
+        flight_stats = single_flight.stats()
+        families += [
+            ('checkwise_single_flight_requests_total', 'counter',
+             'Single-panel scorings by role: leader computed, shared waited for an identical in-flight one',
+             [({'role': 'leader'}, flight_stats['leaders']), ({'role': 'shared'}, flight_stats['shared'])]),
+        ]
+    idempotency_stats = idempotency_store.stats()
+    families += [
+        ('checkwise_idempotency_entries', 'gauge', 'Responses held for Idempotency-Key replay',
+         [({}, idempotency_stats['entries'])]),
+        ('checkwise_idempotency_bytes', 'gauge', 'Body bytes held for Idempotency-Key replay',
+         [({}, idempotency_stats['bytes'])]),
+        ('checkwise_idempotency_events_total', 'counter', 'Idempotency-Key store events',
+         [({'event': event}, idempotency_stats[event])
+          for event in ('hits', 'misses', 'mismatches', 'evictions', 'pressure_evictions', 'expirations')]),
+    ]
+    pool_stats = model_pool.stats()
+    families += [
+        ('checkwise_model_resident', 'gauge', '1 for each model variant currently loaded',
+         [({'model': name}, int(state['loaded'])) for name, state in pool_stats['models'].items()]),
+        ('checkwise_model_pool_evictions_total', 'counter', 'Model variants unloaded to fit the memory budget',
+         [({}, pool_stats['evictions'])]),
+    ]
+    if shadow_scorer is not None:
+        shadow_stats = shadow_scorer.stats()
+        families += [
+            ('checkwise_shadow_rows_total', 'counter', 'Rows re-scored by the shadow model',
+             [({'model': SHADOW_MODEL}, shadow_stats['rows'])]),
+            ('checkwise_shadow_disagreements_total', 'counter', 'Rows where the shadow model predicted a different label',
+             [({'model': SHADOW_MODEL}, shadow_stats['disagreements'])]),
+            ('checkwise_shadow_dropped_total', 'counter', 'Shadow submissions dropped because the queue was full',
+             [({'model': SHADOW_MODEL}, shadow_stats['dropped'])]),
+        ]
+    if micro_batcher is not None:
+        batch_stats = micro_batcher.stats()
+        families += [
+            ('checkwise_microbatch_queue_depth', 'gauge', 'Rows waiting in the micro-batching queue',
+             [({}, batch_stats['queue_depth'])]),
+            ('checkwise_microbatch_batches_total', 'counter', 'Micro-batches scored',
+             [({}, batch_stats['batches'])]),
+            ('checkwise_microbatch_rows_total', 'counter', 'Rows scored through micro-batching',
+             [({}, batch_stats['rows'])]),
+        ]
+    return families
+
+metrics.register_collector(collect_runtime_metrics)
+
+def admin_token_supplied():
+    """True if the request carries ADMIN_TOKEN as a Bearer token or X-Admin-Token header"""
+    supplied = request.headers.get('X-Admin-Token', '')
+    if request.authorization is not None and request.authorization.type == 'bearer':
+        supplied = request.authorization.token or ''
+    return hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """Past predictions for a patient and/or panel ID, newest first
+
+    Query parameters: patient_id, panel_id (at least one), limit (default 50)
+    and before (ISO timestamp or epoch seconds) to page further back. The
+    records are patient data, so this always needs ADMIN_TOKEN: with no token
+    configured every request is refused.
+    """
+    if prediction_store is None:
+        return jsonify({
+            'error': 'Prediction history is not enabled on this server (PREDICTION_STORE_PATH is not set).',
+            'success': False
+        }), 404
+    if not ADMIN_TOKEN:
+        return jsonify({
+            'error': 'Prediction history requires ADMIN_TOKEN to be configured on this server.',
+            'success': False
+        }), 403
+    if not admin_token_supplied():
+        return jsonify({'error': 'Unauthorized', 'success': False}), 401
+    
+    patient_id = request.args.get('patient_id') or None
+    panel_id = request.args.get('panel_id') or None
+    if patient_id is None and panel_id is None:
+        return jsonify({'error': 'Provide a patient_id or panel_id query parameter.', 'success': False}), 400
+    
+    try:
+        limit = int(request.args.get('limit', 50))
+        before = request.args.get('before') or None
+        if before is not None:
+            try:
+                before = float(before)
+            except ValueError:
+                before = datetime.fromisoformat(before).timestamp()
+    except ValueError:
+        return jsonify({
+            'error': 'limit must be an integer and before an ISO timestamp or epoch seconds.',
+            'success': False
+        }), 400
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {HISTORY_MAX_LIMIT}.', 'success': False}), 400
+    
+    with STAGE_SECONDS.time(stage='history_query'):
+        predictions = prediction_store.history(patient_id=patient_id, panel_id=panel_id, before=before, limit=limit)
+    return jsonify({
+        'patient_id': patient_id,
+        'panel_id': panel_id,
+        'predictions': predictions,
+        'count': len(predictions),
+        'success': True
+    })
+
+def drift_health():
+    """Rows observed and the overall drift level, for /api/health"""
+    if drift_monitor is None:
+        return {'enabled': False}
+    snapshot = drift_monitor.snapshot()
+    return {
+        'enabled': True,
+        'rows': snapshot['rows'],
+        'baseline_loaded': drift_baseline is not None,
+        'overall': drift_scores(snapshot, drift_baseline)['overall'] if drift_baseline is not None else None
+    }
+
+@app.route('/api/drift', methods=['GET'])
+def get_drift():
+    """Streaming statistics of the panels and predictions served by this worker, with PSI drift scores
+
+    Scores compare against the baseline from DRIFT_BASELINE_PATH (or the one
+    last set through POST /api/drift/baseline); without one only the
+    statistics are returned.
+    """
+    if drift_monitor is None:
+        return jsonify({
+            'error': 'Drift monitoring is disabled on this server (DRIFT_MONITOR_ENABLED=false).',
+            'success': False
+        }), 404
+    
+    with STAGE_SECONDS.time(stage='drift_snapshot'):
+        snapshot = drift_monitor.snapshot()
+        drift = drift_scores(snapshot, drift_baseline) if drift_baseline is not None else None
+    return jsonify({
+        'statistics': snapshot,
+        'drift': drift,
+        'baseline': {
+            'loaded': drift_baseline is not None,
+            'path': DRIFT_BASELINE_PATH,
+            'rows': drift_baseline.get('rows') if drift_baseline is not None else None
+        },
+        'success': True
+    })
+
+@app.route('/api/drift/baseline', methods=['POST'])
+def set_drift_baseline():
+    """Use the current drift window as the baseline (saved to DRIFT_BASELINE_PATH when set) and start a new window"""
+    global drift_baseline
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Endpoint not found', 'success': False}), 404
+    if not admin_token_supplied():
+        return jsonify({'error': 'Unauthorized', 'success': False}), 401
+    if drift_monitor is None:
+        return jsonify({
+            'error': 'Drift monitoring is disabled on this server (DRIFT_MONITOR_ENABLED=false).',
+            'success': False
+        }), 404
+    
+    snapshot = drift_monitor.snapshot()
+    if not snapshot['rows']:
+        return jsonify({'error': 'No predictions observed yet; nothing to use as a baseline.', 'success': False}), 409
+    if DRIFT_BASELINE_PATH:
+        try:
+            save_baseline(snapshot, DRIFT_BASELINE_PATH)
+        except OSError as e:
+            logger.error(f"Could not write drift baseline {DRIFT_BASELINE_PATH}: {str(e)}")
+            return jsonify({'error': 'Could not write the drift baseline file.', 'success': False}), 500
+    drift_baseline = snapshot
+    # Start the current window over so drift is measured against traffic after the baseline
+    drift_monitor.reset()
+    logger.info(f"Drift baseline set from {snapshot['rows']} observed panels")
+    return jsonify({'rows': snapshot['rows'], 'saved_to': DRIFT_BASELINE_PATH, 'success': True})
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_model():
+    """Load the model files again in the background and swap them in when warm"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Endpoint not found', 'success': False}), 404
+    if not admin_token_supplied():
+        return jsonify({'error': 'Unauthorized', 'success': False}), 401
+    
+    started = model_registry.request_reload(MODEL_MMAP_MODE)
+    bundle = model_registry.current
+    return jsonify({
+        'reload_started': started,
+        'message': 'Reload started' if started else 'A reload is already in progress',
+        'current_version': bundle.version if bundle is not None else None,
+        'current_generation': bundle.generation if bundle is not None else None,
+        'success': True
+    }), 202
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text-format metrics for this worker process"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found', 'success': False}), 404
@@ -0,0 +1,180 @@
+"""
+WSGI -> ASGI adapter with a bounded worker pool.
+
+Runs the Flask app under an ASGI server (e.g. uvicorn) without blocking the
+event loop. Request bodies are read asynchronously on the event loop, so a
+slow upload never ties up a worker thread. Only once the body is complete
+does the WSGI app run, on a fixed-size thread pool where the CPU-bound
+validation and inference happen. Responses are sent from the event loop,
+through a small buffer, so slow readers only hold a thread while a streamed
+response (e.g. NDJSON) is still being produced.
+"""
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Response chunks buffered between the worker thread and the event loop
+RESPONSE_BUFFER_CHUNKS = 16
+_END = object()
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+def build_environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope and its complete body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue  # the body is already complete; its real length is set above
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class WSGIToASGI:
+    """Serve a WSGI app as an ASGI app, running it on ``max_workers`` threads"""
+
+    def __init__(self, wsgi_app, max_workers=4, max_body_bytes=16 * 2 ** 20):
+        self.wsgi_app = wsgi_app
+        self.max_workers = max_workers
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-worker')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._read_body(receive)
+        except RequestTooLarge:
+            await self._send_simple(send, 413, b'{"error":"Request body too large","success":false}')
+            return
+        if body is None:
+            return  # client went away before sending the whole body
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=RESPONSE_BUFFER_CHUNKS)
+        response_start = loop.create_future()
+        worker = loop.run_in_executor(self.executor, self._run_wsgi, loop, build_environ(scope, body),
+                                      response_start, chunks)
+        try:
+            status, headers = await response_start
+        except Exception:
+            logger.exception('WSGI application failed before starting a response')
+            await worker
+            await self._send_simple(send, 500, b'{"error":"Internal server error","success":false}')
+            return
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        while True:
+            chunk = await chunks.get()
+            if chunk is _END:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        await worker
+
+    def _run_wsgi(self, loop, environ, response_start, chunks):
+        """Runs on a worker thread: call the app and hand its output to the event loop"""
+        def put(item):
+            # Blocks this thread (not the loop) while the client is slower than the app
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+        started = []
+
+        def start_response(status, response_headers, exc_info=None):
+            started[:] = [int(status.split(' ', 1)[0]),
+                          [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                           for name, value in response_headers]]
+
+        def publish_start():
+            if not response_start.done():
+                loop.call_soon_threadsafe(response_start.set_result, tuple(started))
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if not chunk:
+                        continue
+                    publish_start()
+                    put(chunk)
+                publish_start()  # empty body: headers still have to go out
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        except Exception as e:
+            if response_start.done():
+                logger.exception('WSGI application failed while streaming a response')
+            else:
+                loop.call_soon_threadsafe(response_start.set_exception, e)
+                return
+        put(_END)
+
+    @staticmethod
+    async def _send_simple(send, status, body):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,235 @@
+"""
+Per-prediction feature attribution by batched occlusion.
+
+For a panel ``x`` and each provided feature ``j``, ``x_j`` is replaced by
+every value of a background sample for that feature; the contribution of
+``j`` to class ``c`` is ``p_c(x)`` minus the mean ``p_c`` over those
+substitutions. A positive score means the patient's value pushes the class
+probability up compared with a reference value. The original row and all
+perturbed rows of a request go through one ``predict_proba`` call.
+
+The background is either the fill values validation uses for missing
+inputs (one row: "compared with the defaults") or, when a drift baseline
+is loaded, ``size`` quantiles of each feature's baseline histogram. It is
+built once per baseline and cached with the explainer of each model.
+
+A latency budget caps the rows scored per request, using a per-model cost
+model (fixed overhead plus time per row) calibrated when the explainer is
+built and updated from every call. Over budget, the background is
+subsampled first, then only the features furthest from the background are
+explained, and the response says so. A budget that cannot cover the original
+panel plus one perturbed copy raises BudgetTooSmall before anything is scored.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class BudgetTooSmall(ValueError):
+    """The latency budget cannot score even one perturbed panel; ``minimum_seconds`` is the least that can"""
+
+    def __init__(self, budget_seconds, minimum_seconds):
+        super().__init__(f'budget_ms must be at least {minimum_seconds * 1000:.3f} for this model '
+                         f'(got {budget_seconds * 1000:.3f}).')
+        self.minimum_seconds = minimum_seconds
+
+
+def background_from_defaults(fill_values):
+    return np.asarray(fill_values, dtype=float).reshape(1, -1)
+
+
+def background_from_baseline(baseline, features, fill_values, size=8):
+    """(size, features) matrix of evenly spaced quantiles of each feature's baseline histogram"""
+    background = np.tile(np.asarray(fill_values, dtype=float), (size, 1))
+    quantiles = (np.arange(size) + 0.5) / size
+    for column, feature in enumerate(features):
+        entry = baseline.get('features', {}).get(feature)
+        if not entry or not entry.get('count'):
+            continue
+        counts = np.asarray(entry['histogram'], dtype=float)
+        lower, upper = entry['range']
+        bins = len(counts) - 2
+        width = (upper - lower) / bins
+        # Underflow and overflow bins stand for the range bounds, the others for their centres
+        values = np.concatenate(([lower], lower + (np.arange(bins) + 0.5) * width, [upper]))
+        cumulative = np.cumsum(counts) / counts.sum()
+        background[:, column] = values[np.minimum(np.searchsorted(cumulative, quantiles), len(values) - 1)]
+    return background
+
+
+class OcclusionExplainer:
+    """Occlusion attributions for one model against one background"""
+
+    def __init__(self, model, class_names, features, background, background_source):
+        self.model = model
+        self.class_names = class_names
+        self.features = tuple(features)
+        self.background = background
+        self.background_source = background_source
+        self._center = background.mean(axis=0)
+        self._scale = np.where(background.std(axis=0) > 0, background.std(axis=0), 1.0)
+        self._lock = threading.Lock()
+        self.overhead_seconds, self.row_seconds = self._calibrate()
+
+    def _calibrate(self):
+        # Two warm calls give the fixed per-call cost and the marginal cost per row
+        timings = []
+        for rows in (1, 256):
+            sample = np.tile(self.background[:1], (rows, 1))
+            self.model.predict_proba(sample)
+            started = time.perf_counter()
+            self.model.predict_proba(sample)
+            timings.append(time.perf_counter() - started)
+        row_seconds = max((timings[1] - timings[0]) / 255, 1e-7)
+        return max(timings[0] - row_seconds, 0.0), row_seconds
+
+    def _observe_cost(self, rows, seconds):
+        with self._lock:
+            estimate = max((seconds - self.overhead_seconds) / rows, 1e-7)
+            self.row_seconds += 0.2 * (estimate - self.row_seconds)
+
+    def minimum_budget_seconds(self):
+        """Least budget that scores the original panel and one perturbed copy"""
+        return self.overhead_seconds + 2 * self.row_seconds
+
+    def check_budget(self, budget_seconds):
+        """Raise BudgetTooSmall unless ``budget_seconds`` (None: unlimited) can explain at least one feature"""
+        minimum = self.minimum_budget_seconds()
+        if budget_seconds is not None and budget_seconds < minimum:
+            raise BudgetTooSmall(budget_seconds, minimum)
+
+    def plan(self, row, provided, budget_seconds=None):
+        """(features to explain, background rows per feature, truncated) within ``budget_seconds``"""
+        background_size = len(self.background)
+        if budget_seconds is None or not provided:
+            return provided, background_size, False
+        self.check_budget(budget_seconds)
+        affordable = int((budget_seconds - self.overhead_seconds) / self.row_seconds) - 1
+        if affordable >= len(provided) * background_size:
+            return provided, background_size, False
+        if affordable >= len(provided):
+            return provided, affordable // len(provided), True
+        # Features furthest from the background carry most of the signal; explain those
+        distance = np.abs(row[provided] - self._center[provided]) / self._scale[provided]
+        keep = np.sort(np.asarray(provided)[np.argsort(-distance, kind='stable')[:affordable]])
+        return keep.tolist(), 1, True
+
+    def explain(self, row, missing, top_classes=3, budget_seconds=None):
+        """Attributions for one validated feature row; ``missing`` marks imputed features (not explained)
+
+        Raises BudgetTooSmall, without scoring anything, when ``budget_seconds`` cannot cover one feature.
+        """
+        started = time.perf_counter()
+        row = np.asarray(row, dtype=float)
+        provided = [column for column in range(len(self.features)) if not missing[column]]
+        columns, background_size, truncated = self.plan(row, provided, budget_seconds)
+
+        # Perturbed rows: for each explained feature, one copy per background value
+        background = self.background
+        if background_size < len(background):
+            background = background[np.linspace(0, len(background) - 1, background_size).round().astype(int)]
+        columns = np.asarray(columns, dtype=np.intp)
+        perturbed = np.tile(row, (1 + len(columns) * background_size, 1))
+        if len(columns):
+            target = np.arange(1, len(perturbed))
+            substituted = np.repeat(columns, background_size)
+            perturbed[target, substituted] = background[np.tile(np.arange(background_size), len(columns)),
+                                                        substituted]
+
+        scoring_started = time.perf_counter()
+        probabilities = self.model.predict_proba(perturbed)
+        self._observe_cost(len(perturbed), time.perf_counter() - scoring_started)
+
+        original = probabilities[0]
+        classes = np.argsort(-original, kind='stable')[:top_classes]
+        # (features, classes): original probability minus the mean over that feature's substitutions
+        occluded = probabilities[1:, classes].reshape(len(columns), background_size, len(classes)).mean(axis=1)
+        contributions = original[classes] - occluded
+        explained = []
+        for position, class_index in enumerate(classes.tolist()):
+            order = np.argsort(-np.abs(contributions[:, position]), kind='stable')
+            explained.append({
+                'disease': str(self.class_names[class_index]),
+                'probability': round(float(original[class_index]), 4),
+                'contributions': [{
+                    'feature': self.features[columns[i]],
+                    'value': float(row[columns[i]]),
+                    'contribution': round(float(contributions[i, position]), 4)
+                } for i in order.tolist()]
+            })
+        return {
+            'method': 'occlusion',
+            'background': self.background_source,
+            'background_size': int(background_size),
+            'classes': explained,
+            'features_explained': len(columns),
+            'missing_features': [self.features[column] for column in range(len(self.features)) if missing[column]],
+            'truncated': truncated,
+            'rows_scored': len(perturbed),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+        }
+
+
+class ExplainerCache:
+    """One explainer per model bundle, rebuilt when the model or the background source changes
+
+    Entries hold the baseline they were built from and are only reused for
+    that same object, so a new baseline that happens to get a freed object's
+    id never picks up an explainer built for the old one.
+    """
+
+    def __init__(self, features, fill_values, background_size=8, max_entries=4):
+        self.features = tuple(features)
+        self.fill_values = fill_values
+        self.background_size = background_size
+        self.max_entries = max_entries
+        self._explainers = {}
+        self._backgrounds = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _background(self, baseline):
+        # Keyed by the baseline object: replacing the baseline rebuilds the background once
+        key = id(baseline) if baseline is not None else None
+        cached = self._backgrounds.get(key)
+        if cached is None or cached[0] is not baseline:
+            if baseline is None:
+                cached = (None, background_from_defaults(self.fill_values), 'defaults')
+            else:
+                cached = (baseline, background_from_baseline(baseline, self.features, self.fill_values,
+                                                             self.background_size), 'baseline')
+            self._backgrounds = {key: cached}
+        return cached[1], cached[2]
+
+    def get(self, bundle, baseline=None):
+        key = (bundle.name, bundle.generation, id(baseline) if baseline is not None else None)
+        cached = self._explainers.get(key)
+        if cached is not None and cached[0] is baseline:
+            return cached[1]
+        with self._lock:
+            cached = self._explainers.get(key)
+            if cached is None or cached[0] is not baseline:
+                background, source = self._background(baseline)
+                explainer = OcclusionExplainer(bundle.model, bundle.class_names, self.features, background, source)
+                self._explainers.pop(key, None)
+                if len(self._explainers) >= self.max_entries:
+                    self._explainers.pop(next(iter(self._explainers)))
+                cached = self._explainers[key] = (baseline, explainer)
+                self.builds += 1
+        return cached[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'explainers': len(self._explainers),
+                'builds': self.builds,
+                'cost_model': [{
+                    'model': name,
+                    'generation': generation,
+                    'background': explainer.background_source,
+                    'overhead_ms': round(explainer.overhead_seconds * 1000, 3),
+                    'per_row_us': round(explainer.row_seconds * 1e6, 3)
+                } for (name, generation, _), (_, explainer) in self._explainers.items()]
+            }
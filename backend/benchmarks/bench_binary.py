@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+JSON vs binary wire formats on /api/predict/batch: request bytes, response
+bytes and panels/second end to end through the Flask test client.
+
+Formats:
+  json      JSON request and JSON response
+  json->bin JSON request, ``Accept: application/x-cbc-result``
+  float32   raw float32 request, binary result records back
+  msgpack   MessagePack request and response (skipped without msgpack)
+
+The same panels go through every format, with the result cache disabled, so
+the difference is parsing, validation setup and serialization. The float32
+body is built from the JSON panels as a client would: numeric strings and
+invalid values become numbers or NaN.
+
+Usage: python backend/benchmarks/bench_binary.py [--per-request 100] [--requests 100]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from standin import standin_model_dir, synthetic_panels
+
+
+def float32_body(panels, features):
+    matrix = np.full((len(panels), len(features)), np.nan, dtype='<f4')
+    for row, panel in enumerate(panels):
+        for column, feature in enumerate(features):
+            try:
+                matrix[row, column] = float(panel.get(feature))
+            except (TypeError, ValueError):
+                pass  # missing or invalid stays NaN
+    return matrix.tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--per-request', type=int, default=100, help='Panels per POST')
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MODEL_DIR', standin_model_dir())
+    os.environ.setdefault('MICROBATCH_ENABLED', 'false')
+    os.environ.setdefault('RESULT_CACHE_SIZE', '0')
+    os.environ.setdefault('ADMISSION_MAX_CONCURRENT', '0')
+    logging.disable(logging.WARNING)
+    import api
+    from binary_format import FLOAT32_MIMETYPE, RESULT_MIMETYPE, msgpack_available
+
+    if not api.load_models():
+        raise SystemExit(f"Model load failed: {api.model_registry.status}")
+    client = api.app.test_client()
+    batches = [synthetic_panels(args.per_request, seed=200 + i) for i in range(min(args.requests, 20))]
+
+    formats = {
+        'json': [(json.dumps({'panels': panels}).encode(), 'application/json', {}) for panels in batches],
+        'json->bin': [(json.dumps({'panels': panels}).encode(), 'application/json', {'Accept': RESULT_MIMETYPE})
+                      for panels in batches],
+        'float32': [(float32_body(panels, api.FEATURES), FLOAT32_MIMETYPE, {}) for panels in batches],
+    }
+    if msgpack_available():
+        import msgpack
+        formats['msgpack'] = [(msgpack.packb({'features': float32_body(panels, api.FEATURES)}),
+                               'application/msgpack', {}) for panels in batches]
+    else:
+        print("msgpack    skipped: msgpack is not installed (pip install msgpack)")
+
+    print(f"{args.requests} requests of {args.per_request} panels")
+    print(f"{'format':10s} {'req B/panel':>11s} {'resp B/panel':>12s} {'panels/s':>10s} {'ms/request':>10s}")
+    for name, requests in formats.items():
+        body, content_type, headers = requests[0]
+        response = client.post('/api/predict/batch', data=body, content_type=content_type, headers=headers)  # warm up
+        if response.status_code != 200:
+            raise SystemExit(f"{name}: /api/predict/batch returned {response.status_code}: "
+                             f"{response.get_data(as_text=True)[:200]}")
+        request_bytes = response_bytes = 0
+        started = time.perf_counter()
+        for i in range(args.requests):
+            body, content_type, headers = requests[i % len(requests)]
+            response = client.post('/api/predict/batch', data=body, content_type=content_type, headers=headers)
+            request_bytes += len(body)
+            response_bytes += len(response.get_data())
+        elapsed = time.perf_counter() - started
+        panels = args.requests * args.per_request
+        print(f"{name:10s} {request_bytes / panels:11.1f} {response_bytes / panels:12.1f} "
+              f"{panels / elapsed:10.0f} {elapsed / args.requests * 1000:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+NumPy-only compiled engine vs the joblib/scikit-learn model.
+
+Exports the model to .npz (if not already there) and, for each engine in a
+fresh interpreter, measures the import + load time, the peak RSS after a warm
+prediction, single-row predict_proba latency and batch throughput.
+
+Usage: python backend/benchmarks/bench_compiled.py [--rows 2000] [--batch 1000] [--model-dir DIR]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from standin import BACKEND_DIR, ensure_model_dir
+
+# Runs in a clean interpreter so imports and memory are measured from scratch
+PROBE = r'''
+import json, os, resource, sys, time
+started = time.perf_counter()
+sys.path.insert(0, BACKEND_DIR)
+import numpy as np
+if ENGINE == 'numpy':
+    from compiled_model import load_compiled_model
+    model, _ = load_compiled_model(os.path.join(MODEL_DIR, 'cbc_disease_model.npz'))
+else:
+    import joblib
+    model = joblib.load(os.path.join(MODEL_DIR, 'cbc_disease_model.joblib'))
+    joblib.load(os.path.join(MODEL_DIR, 'disease_label_encoder.joblib'))
+load_seconds = time.perf_counter() - started
+
+
+def peak_rss_mb():
+    # VmHWM starts fresh at exec; ru_maxrss would include the parent benchmark process
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+rng = np.random.default_rng(0)
+X = rng.uniform(0, 100, size=(max(ROWS, BATCH), model.n_features_in_))
+model.predict_proba(X[:1])
+row_seconds = []
+for row in range(ROWS):
+    t0 = time.perf_counter()
+    model.predict_proba(X[row:row + 1])
+    row_seconds.append(time.perf_counter() - t0)
+t0 = time.perf_counter()
+model.predict_proba(X[:BATCH])
+batch_seconds = time.perf_counter() - t0
+row_seconds.sort()
+print(json.dumps({
+    'load_ms': load_seconds * 1000,
+    'sklearn_imported': 'sklearn' in sys.modules,
+    'peak_rss_mb': peak_rss_mb(),
+    'p50_row_us': row_seconds[len(row_seconds) // 2] * 1e6,
+    'p99_row_us': row_seconds[int(len(row_seconds) * 0.99)] * 1e6,
+    'batch_rows_per_s': BATCH / batch_seconds
+}))
+'''
+
+
+def probe(engine, model_dir, rows, batch):
+    code = (f'BACKEND_DIR = {BACKEND_DIR!r}\nMODEL_DIR = {model_dir!r}\nENGINE = {engine!r}\n'
+            f'ROWS = {rows}\nBATCH = {batch}\n' + PROBE)
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def exported_format(npz_path):
+    """format_version of an exported .npz, or None when there is none"""
+    import numpy as np
+
+    if not os.path.exists(npz_path):
+        return None
+    with np.load(npz_path, allow_pickle=False) as data:
+        return int(data['format_version']) if 'format_version' in data.files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='Single-row predictions timed per engine')
+    parser.add_argument('--batch', type=int, default=1000, help='Rows in the throughput batch')
+    parser.add_argument('--model-dir', help='Directory with cbc_disease_model.joblib (default: backend/)')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    import joblib
+
+    from compiled_model import FORMAT_VERSION, export_model
+
+    model_dir = ensure_model_dir(args.model_dir)
+    npz_path = os.path.join(model_dir, 'cbc_disease_model.npz')
+    # A file from an older format would fail to load in the probe, so export again
+    if exported_format(npz_path) != FORMAT_VERSION:
+        export_model(joblib.load(os.path.join(model_dir, 'cbc_disease_model.joblib')),
+                     joblib.load(os.path.join(model_dir, 'disease_label_encoder.joblib')), npz_path)
+
+    print(f"model at {model_dir}, {args.rows} single-row calls, batch of {args.batch}")
+    print(f"  {'engine':8s} {'import+load':>12s} {'peak RSS':>10s} {'p50/row':>9s} {'p99/row':>9s} {'batch':>14s}")
+    for engine in ('sklearn', 'numpy'):
+        stats = probe(engine, model_dir, args.rows, args.batch)
+        print(f"  {engine:8s} {stats['load_ms']:9.0f} ms {stats['peak_rss_mb']:7.1f} MB "
+              f"{stats['p50_row_us']:6.0f} us {stats['p99_row_us']:6.0f} us "
+              f"{stats['batch_rows_per_s']:9,.0f} rows/s"
+              + ('' if engine == 'sklearn' or not stats['sklearn_imported'] else '  (sklearn was imported!)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Prediction log: request-path cost, writer throughput and /api/history lookups.
+
+1. record() cost per panel on the request thread (queue only)
+2. background writer throughput, batched transactions until flush()
+3. history lookups for random patients once the log holds --rows rows,
+   with the query plan, to show they stay index range scans as it grows
+
+The bulk of the rows is inserted directly in large transactions, so
+filling tens of millions of rows only takes minutes.
+
+Usage: python backend/benchmarks/bench_history.py [--rows 5000000] [--panels-per-patient 20] [--db PATH]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import standin  # noqa: F401 - puts backend/ on sys.path
+
+from api import FEATURES
+from prediction_store import INSERT, PredictionStore, _connect
+
+TOP = [{'disease': 'Anemia', 'probability': 0.61, 'percentage': 61.0, 'confidence_level': 'Medium'},
+       {'disease': 'None', 'probability': 0.22, 'percentage': 22.0, 'confidence_level': 'Low'}]
+QUALITY = {'completeness_percentage': 100.0, 'missing_parameters': [], 'invalid_parameters': [],
+           'out_of_range_parameters': [], 'warnings': [], 'total_parameters': 22, 'provided_parameters': 22,
+           'critical_missing': []}
+
+
+def synthetic_rows(count, patients, start_time, rng):
+    features = rng.uniform(0, 100, size=(count, len(FEATURES)))
+    patient_ids = rng.integers(patients, size=count)
+    for i in range(count):
+        yield (start_time + i * 0.01, f'P{patient_ids[i]:08d}', f'L{i:010d}', '2.1.0', 'primary', 'Anemia',
+               features[i], TOP, QUALITY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5_000_000, help='Rows in the log for the lookup test')
+    parser.add_argument('--panels-per-patient', type=int, default=20)
+    parser.add_argument('--writer-rows', type=int, default=100_000, help='Rows sent through the background writer')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--db', help='Database file (default: a temporary file, removed afterwards)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'predictions.db')
+    patients = max(1, args.rows // args.panels_per_patient)
+    rng = np.random.default_rng(0)
+    # Queue sized for the burst below, so writer throughput is measured without drops
+    store = PredictionStore(path, FEATURES, max_queue=args.writer_rows)
+
+    rows = list(synthetic_rows(args.writer_rows, patients, time.time() - 86400 * 365, rng))
+    started = time.perf_counter()
+    for row in rows:
+        store.record([row])
+    enqueued = time.perf_counter()
+    store.flush()
+    written = time.perf_counter()
+    stats = store.stats()
+    print(f"record():        {(enqueued - started) / len(rows) * 1e6:8.2f} us per panel on the request thread")
+    print(f"writer:          {stats['written'] / (written - started):8.0f} rows/s in {stats['batches']} transactions "
+          f"({stats['dropped']} dropped)")
+
+    connection = _connect(path)
+    existing = connection.execute('SELECT count(*) FROM predictions').fetchone()[0]
+    remaining = max(0, args.rows - existing)
+    started = time.perf_counter()
+    chunk = 200_000
+    for offset in range(0, remaining, chunk):
+        with connection:
+            connection.executemany(INSERT, [
+                (created_at, patient_id, panel_id, version, variant, prediction,
+                 features.astype('<f8').tobytes(), '[]', '{"missing_parameters":[]}')
+                for created_at, patient_id, panel_id, version, variant, prediction, features, _, _
+                in synthetic_rows(min(chunk, remaining - offset), patients, time.time() - 86400 * 300 + offset, rng)])
+    total = connection.execute('SELECT count(*) FROM predictions').fetchone()[0]
+    print(f"bulk fill:       {remaining} rows in {time.perf_counter() - started:.1f}s, "
+          f"{total} rows, {os.path.getsize(path) / 2 ** 20:.0f} MB")
+
+    plan = connection.execute('EXPLAIN QUERY PLAN SELECT * FROM predictions WHERE patient_id = ? '
+                              'ORDER BY created_at DESC LIMIT 50', ('P00000001',)).fetchall()
+    print(f"query plan:      {'; '.join(step[-1] for step in plan)}")
+
+    latencies, returned = [], 0
+    for _ in range(args.lookups):
+        patient = f'P{random.randrange(patients):08d}'
+        started = time.perf_counter()
+        returned += len(store.history(patient_id=patient, limit=50))
+        latencies.append(time.perf_counter() - started)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"history lookup:  p50 {p50:.3f} ms  p99 {p99:.3f} ms  ({returned / args.lookups:.1f} rows per patient)")
+
+    if not args.db:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
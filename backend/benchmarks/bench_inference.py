@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Per-request inference latency: legacy double pass vs single predict_proba pass.
+
+Legacy:  model.predict + model.predict_proba + argsort + inverse_transform per top class
+Current: one predict_proba, argmax label, argpartition top-k over class_names
+
+Usage: python backend/benchmarks/bench_inference.py [--model-dir DIR] [--requests N]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from standin import load_benchmark_model
+
+from inference import build_class_names, predict_probabilities, top_k_indices
+
+
+def legacy_request(model, label_encoder, row):
+    prediction_encoded = model.predict(row)[0]
+    prediction = label_encoder.inverse_transform([prediction_encoded])[0]
+    probabilities = model.predict_proba(row)[0]
+    top = [label_encoder.inverse_transform([idx])[0] for idx in np.argsort(probabilities)[::-1][:5]
+           if probabilities[idx] >= 0.01]
+    return prediction, top
+
+
+def current_request(model, class_names, row):
+    probabilities, predicted = predict_probabilities(model, row)
+    top = [class_names[idx] for idx in top_k_indices(probabilities[0], 5) if probabilities[0][idx] >= 0.01]
+    return class_names[predicted[0]], top
+
+
+def time_requests(fn, rows):
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-dir', help='Directory with cbc_disease_model.joblib (default: backend/)')
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    model, label_encoder, source = load_benchmark_model(args.model_dir)
+    class_names = build_class_names(model, label_encoder)
+    rng = np.random.default_rng(0)
+    rows = [rng.uniform(0, 100, size=(1, model.n_features_in_)) for _ in range(args.requests)]
+
+    # Both paths must agree before timing them (tied classes may come back in either order)
+    for row in rows[:20]:
+        legacy_label, legacy_top = legacy_request(model, label_encoder, row)
+        current_label, current_top = current_request(model, class_names, row)
+        assert legacy_label == current_label and sorted(legacy_top) == sorted(current_top)
+
+    print(f"Model: {source} ({type(model).__name__}), {args.requests} single-row requests")
+    results = {
+        'legacy (predict + predict_proba)': time_requests(lambda r: legacy_request(model, label_encoder, r), rows),
+        'current (single predict_proba)': time_requests(lambda r: current_request(model, class_names, r), rows),
+    }
+    for name, latencies in results.items():
+        print(f"  {name:34s} mean {latencies.mean():7.3f} ms   p50 {np.percentile(latencies, 50):7.3f} ms   "
+              f"p99 {np.percentile(latencies, 99):7.3f} ms")
+    legacy, current = (r.mean() for r in results.values())
+    print(f"  speedup: {legacy / current:.2f}x ({legacy - current:.3f} ms saved per request)")
+
+
+if __name__ == '__main__':
+    main()
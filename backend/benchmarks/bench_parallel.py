@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk scoring throughput from 1 to N worker processes.
+
+Writes a synthetic CSV of CBC panels, scores it with bulk_score.run() using
+1, 2, 4, ... up to --max-workers processes and reports rows/second and the
+scaling efficiency relative to one worker.
+
+Usage: python backend/benchmarks/bench_parallel.py [--rows 200000] [--max-workers 8] [--chunk-size 5000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from standin import ensure_model_dir
+
+import api
+import bulk_score
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    lower = np.array([api.PARAMETER_RANGES[f][0] for f in api.FEATURES])
+    upper = np.array([api.PARAMETER_RANGES[f][1] for f in api.FEATURES])
+    frame = pd.DataFrame(rng.uniform(lower, upper, size=(rows, len(api.FEATURES))), columns=api.FEATURES)
+    frame['Gender'] = rng.integers(0, 2, rows)
+    frame.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--model-dir', help='Directory with cbc_disease_model.joblib (default: backend/)')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    model_dir = ensure_model_dir(args.model_dir)
+    worker_counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        worker_counts.append(workers)
+        workers *= 2
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        input_path = os.path.join(scratch, 'panels.csv')
+        output_path = os.path.join(scratch, 'predictions.csv')
+        write_synthetic_csv(input_path, args.rows)
+        print(f"{args.rows} rows, chunk size {args.chunk_size}, model at {model_dir}, {os.cpu_count()} CPUs")
+
+        baseline = None
+        for workers in worker_counts:
+            scorer = bulk_score.parallel_chunk_scorer(workers, model_dir=model_dir)
+            rows, seconds = bulk_score.run(input_path, output_path, args.chunk_size, score_chunks=scorer)
+            throughput = rows / seconds
+            baseline = baseline or throughput
+            print(f"  {workers:3d} worker(s): {throughput:10,.0f} rows/s   speedup {throughput / baseline:5.2f}x   "
+                  f"efficiency {throughput / baseline / workers:6.1%}")
+
+
+if __name__ == '__main__':
+    main()
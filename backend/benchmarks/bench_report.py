@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Plain-text report parsing: reports/second for the parser alone and end to
+end through /api/predict/report.
+
+Reports are generated from synthetic panels and written the way analyzers
+export them: a title line, mixed alias spellings ("Hemoglobin", "HGB",
+"Hb"), units on some lines (including SI units that need converting) and
+H/L flags. Several reports share one body, as in a multi-report export.
+
+1. iter_reports over an in-memory file of --reports reports
+2. the same file parsed from disk, read lazily line by line, with the peak
+   memory of the parse (tracemalloc) to show it does not grow with the file
+3. /api/predict/report through the Flask test client, --per-request reports
+   per POST (parse, validate, score and serialize)
+
+Usage: python backend/benchmarks/bench_report.py [--reports 20000] [--per-request 50] [--requests 200]
+"""
+import argparse
+import io
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from standin import standin_model_dir, synthetic_panels
+
+# (feature, spellings, units to write the value in with its factor from the default unit)
+LAYOUT = [
+    ('Age', ['Age'], [('years', 1.0), (None, 1.0)]),
+    ('Gender', ['Gender', 'Sex'], [(None, 1.0)]),
+    ('WBC', ['WBC', 'White Blood Cells', 'Leukocytes'], [('10³/μL', 1.0), ('10⁹/L', 1.0), (None, 1.0)]),
+    ('RBC', ['RBC', 'Red Blood Cells'], [('10⁶/μL', 1.0), ('10¹²/L', 1.0)]),
+    ('HGB', ['HGB', 'Hemoglobin', 'Hb'], [('g/dL', 1.0), ('g/L', 10.0)]),
+    ('HCT', ['HCT', 'Hematocrit', 'PCV'], [('%', 1.0), ('L/L', 0.01)]),
+    ('MCV', ['MCV'], [('fL', 1.0)]),
+    ('MCH', ['MCH'], [('pg', 1.0)]),
+    ('MCHC', ['MCHC'], [('g/dL', 1.0), ('g/L', 10.0)]),
+    ('RDW', ['RDW', 'RDW-CV'], [('%', 1.0)]),
+    ('PLT', ['PLT', 'Platelets', 'Platelet Count'], [('10³/μL', 1.0), ('10⁹/L', 1.0)]),
+    ('MPV', ['MPV'], [('fL', 1.0)]),
+    ('NE%', ['NE%', 'Neutrophils %', 'NEUT%'], [('%', 1.0)]),
+    ('LY%', ['LY%', 'Lymphocytes %', 'LYMPH%'], [('%', 1.0)]),
+    ('MO%', ['MO%', 'Monocytes %'], [('%', 1.0)]),
+    ('EO%', ['EO%', 'Eosinophils %'], [('%', 1.0)]),
+    ('BA%', ['BA%', 'Basophils %'], [('%', 1.0)]),
+    ('NE#', ['NE#', 'Absolute Neutrophils'], [('10³/μL', 1.0)]),
+    ('LY#', ['LY#', 'Absolute Lymphocytes'], [('10³/μL', 1.0)]),
+    ('MO#', ['MO#'], [('10³/μL', 1.0)]),
+    ('EO#', ['EO#'], [('10³/μL', 1.0)]),
+    ('BA#', ['BA#'], [('10³/μL', 1.0)]),
+]
+
+
+def report_text(panels, seed=0):
+    """Panels as one multi-report text export"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for number, panel in enumerate(panels):
+        lines.append('Complete Blood Count Report')
+        lines.append(f'Sample ID: S{number:08d}')
+        for feature, spellings, units in LAYOUT:
+            value = panel.get(feature)
+            if value is None or value == '':
+                continue
+            name = spellings[rng.integers(len(spellings))]
+            unit, factor = units[rng.integers(len(units))]
+            try:
+                number = float(value)
+            except ValueError:
+                text = str(value)  # invalid values go through as written
+            else:
+                if feature == 'Gender':
+                    text = 'Male' if number == 1 else 'Female'
+                else:
+                    text = f'{number * factor:.4g}'
+            flag = ' H' if rng.random() < 0.05 else ''
+            lines.append(f'{name}: {text}{flag}' + (f' {unit}' if unit else ''))
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def rate(count, seconds):
+    return f'{count / seconds:10.0f} reports/s'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, default=20_000, help='Reports in the parse-only file')
+    parser.add_argument('--per-request', type=int, default=50, help='Reports per /api/predict/report POST')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MODEL_DIR', standin_model_dir())
+    os.environ.setdefault('MICROBATCH_ENABLED', 'false')
+    logging.disable(logging.WARNING)
+    import api
+    from report_parser import iter_reports
+
+    text = report_text(synthetic_panels(args.reports, seed=1))
+    print(f"input:        {args.reports} reports, {len(text.encode()) / 2 ** 20:.1f} MB, "
+          f"{text.count(chr(10))} lines")
+
+    started = time.perf_counter()
+    parsed = sum(1 for _ in iter_reports(io.StringIO(text)))
+    print(f"parse:        {rate(parsed, time.perf_counter() - started)}  ({parsed} reports)")
+
+    path = os.path.join(tempfile.mkdtemp(), 'reports.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    del text
+    tracemalloc.start()
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        parsed = sum(1 for _ in iter_reports(f))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.remove(path)
+    print(f"parse (file): {rate(parsed, elapsed)}  (peak {peak / 1024:.0f} KB while parsing, "
+          f"under tracemalloc)")
+
+    if not api.load_models():
+        raise SystemExit(f"Model load failed: {api.model_registry.status}")
+    client = api.app.test_client()
+    bodies = [report_text(synthetic_panels(args.per_request, seed=100 + i), seed=i).encode()
+              for i in range(min(args.requests, 20))]
+    client.post('/api/predict/report', data=bodies[0], content_type='text/plain')  # warm up
+    started = time.perf_counter()
+    for i in range(args.requests):
+        response = client.post('/api/predict/report', data=bodies[i % len(bodies)], content_type='text/plain')
+        if response.status_code != 200:
+            raise SystemExit(f"/api/predict/report returned {response.status_code}: {response.get_data(as_text=True)}")
+    elapsed = time.perf_counter() - started
+    print(f"end to end:   {rate(args.requests * args.per_request, elapsed)}  "
+          f"({args.per_request} reports per request, {elapsed / args.requests * 1000:.1f} ms per request)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Serving modes under load: gunicorn sync worker (main:application) vs the
+ASGI entry point (asgi:application under uvicorn).
+
+Each mode is started as a real server on a local port with the same model,
+then driven by 1, 10 and 100 concurrent keep-alive clients posting single
+panels to /api/predict. Reports throughput and p50/p99 latency per level.
+With --slow-clients N, N extra clients trickle their request bodies in
+slowly during each run, the case where a sync worker is held by one client.
+
+Every requested mode must have its server installed (both are in
+requirements.txt); the run stops before starting anything if one is missing.
+Use --modes to benchmark a subset.
+
+Usage: python backend/benchmarks/bench_serving.py [--concurrency 1 10 100] [--requests 2000]
+                                                  [--slow-clients 0] [--modes wsgi asgi]
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from standin import BACKEND_DIR, ensure_model_dir
+
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+
+MODES = {
+    'wsgi': ('gunicorn', ['-m', 'gunicorn', 'main:application', '--preload', '--workers', '1',
+                          '--timeout', '60', '--bind', '127.0.0.1:{port}']),
+    'asgi': ('uvicorn', ['-m', 'uvicorn', 'asgi:application', '--workers', '1', '--no-access-log',
+                         '--host', '127.0.0.1', '--port', '{port}']),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, env):
+    _, args = MODES[mode]
+    process = subprocess.Popen([sys.executable] + [arg.format(port=port) for arg in args], cwd=ROOT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{mode} server exited with status {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start within 60s')
+
+
+def request_bytes(body, port):
+    return (f'POST /api/predict HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if headers.get('transfer-encoding') == 'chunked':
+        while (size := int((await reader.readline()).strip(), 16)):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection') != 'close'
+
+
+async def client(port, bodies, latencies, errors, stop_at):
+    reader = writer = None
+    for body in bodies:
+        if time.perf_counter() > stop_at:
+            break
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request_bytes(body, port))
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            errors.append('connection')
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, body, stop, byte_delay):
+    """Sends requests a few bytes at a time until ``stop`` is set"""
+    while not stop.is_set():
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            payload = request_bytes(body, port)
+            for offset in range(0, len(payload), 16):
+                if stop.is_set():
+                    break
+                writer.write(payload[offset:offset + 16])
+                await writer.drain()
+                await asyncio.sleep(byte_delay)
+            else:
+                await read_response(reader)
+            writer.close()
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            await asyncio.sleep(0.1)
+
+
+async def run_level(port, bodies, concurrency, slow_clients, byte_delay, time_limit):
+    latencies, errors = [], []
+    stop = asyncio.Event()
+    slow = [asyncio.create_task(slow_client(port, bodies[0], stop, byte_delay)) for _ in range(slow_clients)]
+    if slow:
+        await asyncio.sleep(0.5)  # let the slow clients occupy whatever they can
+    per_client = [bodies[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, share, latencies, errors, started + time_limit) for share in per_client))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return latencies, errors, elapsed
+
+
+def synthetic_bodies(count, features, ranges, seed=0):
+    rng = np.random.default_rng(seed)
+    lower = np.array([ranges[f][0] for f in features])
+    upper = np.array([ranges[f][1] for f in features])
+    values = rng.uniform(lower, upper, size=(count, len(features))).round(2)
+    bodies = []
+    for row in values:
+        panel = {feature: float(value) for feature, value in zip(features, row)}
+        panel['Gender'] = int(rng.integers(0, 2))
+        bodies.append(json.dumps(panel).encode())
+    return bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per concurrency level')
+    parser.add_argument('--slow-clients', type=int, default=0, help='Clients trickling bodies in during each run')
+    parser.add_argument('--byte-delay', type=float, default=0.05, help='Seconds between a slow client\'s 16B writes')
+    parser.add_argument('--time-limit', type=float, default=60, help='Seconds per level before clients give up')
+    parser.add_argument('--asgi-threads', type=int, default=4, help='ASGI_WORKER_THREADS for the ASGI server')
+    parser.add_argument('--model-dir', help='Directory with cbc_disease_model.joblib (default: backend/)')
+    args = parser.parse_args()
+
+    missing = [MODES[mode][0] for mode in args.modes if importlib.util.find_spec(MODES[mode][0]) is None]
+    if missing:
+        raise SystemExit(f"Cannot benchmark {', '.join(missing)}: not installed (pip install {' '.join(missing)}), "
+                         f"or pass --modes to run only the installed servers")
+
+    import api
+
+    # Distinct panels so the result cache doesn't turn the run into a cache benchmark
+    bodies = synthetic_bodies(args.requests, api.FEATURES, api.PARAMETER_RANGES)
+    env = {**os.environ, 'MODEL_DIR': ensure_model_dir(args.model_dir),
+           'ASGI_WORKER_THREADS': str(args.asgi_threads), 'PYTHONUNBUFFERED': '1'}
+
+    print(f"{args.requests} requests per level, {args.slow_clients} slow clients")
+    print(f"{'mode':6s} {'clients':>7s} {'req/s':>9s} {'p50 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, port, env)
+        try:
+            asyncio.run(run_level(port, bodies[:20], 1, 0, args.byte_delay, args.time_limit))  # warm-up
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = asyncio.run(
+                    run_level(port, bodies, concurrency, args.slow_clients, args.byte_delay, args.time_limit))
+                if not latencies:
+                    print(f"{mode:6s} {concurrency:7d} {'-':>9s} {'-':>9s} {'-':>9s} {len(errors):7d}")
+                    continue
+                p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+                print(f"{mode:6s} {concurrency:7d} {len(latencies) / elapsed:9.1f} {p50:9.2f} {p99:9.2f} "
+                      f"{len(errors):7d}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Panel validation: legacy per-feature loop vs the precompiled CBCSchema.
+
+Legacy:  float() + try/except, a range-check call and list-membership tests
+         for each of the 22 features
+Scalar:  single panels walk the schema's precompiled column tuples
+Batch:   one float cast per feature column (only the non-numeric cells of a
+         column are coerced one by one) and array range/missing masks
+
+Batches are timed on mixed input (numeric strings, empty and missing values
+in every column) and on clean numeric input, against the scalar path called
+in a loop. All paths are checked to produce identical data_quality output first.
+
+Usage: python backend/benchmarks/bench_validation.py [--panels 2000] [--batch 1000] [--repeat 5]
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+import standin  # noqa: F401 - puts backend/ on sys.path
+
+import api
+
+
+def legacy_range_ok(param, value):
+    if param in api.PARAMETER_RANGES:
+        min_val, max_val = api.PARAMETER_RANGES[param]
+        if value < min_val or value > max_val:
+            return False
+    return True
+
+
+def legacy_validate(data):
+    """The per-feature loop that validate_and_process_input used before CBCSchema"""
+    features = api.FEATURES
+    critical_params = api.CRITICAL_PARAMS
+    defaults = api.CRITICAL_DEFAULTS
+    input_data, missing_params, invalid_params, warnings, out_of_range_params = [], [], [], [], []
+    for feature in features:
+        if feature not in data or data[feature] is None or data[feature] == '':
+            input_data.append(defaults[feature] if feature in critical_params else 0)
+            missing_params.append(feature)
+            continue
+        try:
+            value = float(data[feature])
+            if not legacy_range_ok(feature, value):
+                out_of_range_params.append(f"{feature}={value}")
+                warnings.append(f"WARNING: {feature}={value} is outside normal range")
+            input_data.append(value)
+        except (ValueError, TypeError):
+            input_data.append(defaults[feature] if feature in critical_params else 0)
+            missing_params.append(feature)
+            invalid_params.append(f"{feature}={data[feature]}")
+    critical_missing = [p for p in missing_params if p in critical_params]
+    if len(critical_missing) > 3:
+        return {'error': f'Too many critical parameters missing: {", ".join(critical_missing)}. '
+                         f'Please provide at least basic CBC values.', 'success': False}
+    completeness = ((len(features) - len(missing_params)) / len(features)) * 100
+    return {
+        'input_data': input_data,
+        'data_quality': {
+            'completeness_percentage': round(completeness, 1),
+            'missing_parameters': missing_params,
+            'invalid_parameters': invalid_params,
+            'out_of_range_parameters': out_of_range_params,
+            'warnings': warnings,
+            'total_parameters': len(features),
+            'provided_parameters': len(features) - len(missing_params),
+            'critical_missing': critical_missing
+        },
+        'success': True
+    }
+
+
+def synthetic_panels(count, seed=0):
+    """In-range panels with some values as strings, missing or out of range"""
+    rng = np.random.default_rng(seed)
+    lower = np.array([api.PARAMETER_RANGES[f][0] for f in api.FEATURES])
+    upper = np.array([api.PARAMETER_RANGES[f][1] for f in api.FEATURES])
+    values = rng.uniform(lower, upper * 1.1, size=(count, len(api.FEATURES))).round(2)
+    panels = []
+    for row in values:
+        panel = {feature: float(value) for feature, value in zip(api.FEATURES, row)}
+        panel['Gender'] = int(rng.integers(0, 2))
+        for feature in rng.choice(api.FEATURES[:20], size=3, replace=False):
+            panel[feature] = rng.choice([None, '', str(panel[feature])])
+        panels.append(panel)
+    return panels
+
+
+def per_panel_us(fn, panels, repeat):
+    """Best of ``repeat`` passes of fn(panels), in microseconds per panel"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(panels)
+        best = min(best, time.perf_counter() - started)
+    return best / len(panels) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--panels', type=int, default=2000, help='Single panels validated per path')
+    parser.add_argument('--batch', type=int, default=1000, help='Panels per batch validation')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes per measurement; the best is reported')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    panels = synthetic_panels(max(args.panels, args.batch))
+    for panel in panels:
+        legacy, current = legacy_validate(panel), api.validate_and_process_input(panel)
+        assert legacy.get('data_quality') == current.get('data_quality'), panel
+        assert legacy.get('error') == current.get('error'), panel
+    batch_output = api.validate_and_process_batch(panels)
+    assert batch_output['data_quality'] == [api.validate_and_process_input(panels[i])['data_quality']
+                                            for i in batch_output['row_indices']]
+
+    single = panels[:args.panels]
+    legacy_us = per_panel_us(lambda batch: [legacy_validate(panel) for panel in batch], single, args.repeat)
+    schema_us = per_panel_us(lambda batch: [api.validate_and_process_input(panel) for panel in batch],
+                             single, args.repeat)
+    print(f"{args.panels} single panels, batches of {args.batch}; outputs identical")
+    print(f"  single panel   legacy {legacy_us:7.1f} us   schema {schema_us:7.1f} us   "
+          f"speedup {legacy_us / schema_us:5.2f}x")
+
+    clean = [{feature: float(value) for feature, value in panel.items() if value not in (None, '')}
+             for panel in panels[:args.batch]]
+    for label, batch in (('mixed', panels[:args.batch]), ('clean', clean)):
+        legacy_batch_us = per_panel_us(lambda batch: [legacy_validate(panel) for panel in batch], batch,
+                                       args.repeat)
+        scalar_batch_us = per_panel_us(lambda batch: [api.validate_and_process_input(panel) for panel in batch],
+                                       batch, args.repeat)
+        schema_batch_us = per_panel_us(api.validate_and_process_batch, batch, args.repeat)
+        print(f"  batch ({label}) legacy {legacy_batch_us:7.1f} us   scalar loop {scalar_batch_us:7.1f} us   "
+              f"batch {schema_batch_us:7.1f} us   vs legacy {legacy_batch_us / schema_batch_us:5.2f}x   "
+              f"vs scalar {scalar_batch_us / schema_batch_us:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
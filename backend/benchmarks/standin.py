@@ -0,0 +1,179 @@
+"""
+Model loading helpers shared by the benchmark scripts.
+
+The real model files are Git LFS objects and are often not checked out, so the
+benchmarks fall back to a small stand-in RandomForest with the same 22-feature
+interface when the real model cannot be loaded.
+"""
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+STANDIN_DISEASES = [
+    'Allergy', 'Anemia', 'Aplastic Anemia', 'Bacterial Infection', 'Bone Marrow Activation',
+    'Bone Marrow Disorders', 'Bone Marrow Suppression', 'Chronic Hypoxia', 'Chronic Inflammation',
+    'Chronic Myeloid Leukemia', 'Dehydration', 'Hypothyroidism', 'Iron Deficiency Anemia',
+    'Lymphocytic Leukemia', 'None'
+]
+
+
+def load_real_model(model_dir=None):
+    """Load the real model/encoder pair, or return (None, None) if unavailable"""
+    import joblib
+
+    model_dir = model_dir or BACKEND_DIR
+    try:
+        model = joblib.load(os.path.join(model_dir, 'cbc_disease_model.joblib'))
+        label_encoder = joblib.load(os.path.join(model_dir, 'disease_label_encoder.joblib'))
+    except Exception:
+        return None, None
+    return model, label_encoder
+
+
+def train_standin_model(n_samples=5000, n_estimators=100, random_state=0):
+    """Train a stand-in RandomForest with the production feature interface"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder
+
+    from api import FEATURES, PARAMETER_RANGES
+
+    rng = np.random.default_rng(random_state)
+    lower = np.array([PARAMETER_RANGES[f][0] for f in FEATURES], dtype=float)
+    upper = np.array([PARAMETER_RANGES[f][1] for f in FEATURES], dtype=float)
+    X = rng.uniform(lower, upper, size=(n_samples, len(FEATURES)))
+    X[:, FEATURES.index('Gender')] = rng.integers(0, 2, n_samples)
+
+    # Labels depend on a few features so the trees have real structure
+    score = X[:, FEATURES.index('WBC')] / 20 + X[:, FEATURES.index('HGB')] / 3 + X[:, FEATURES.index('PLT')] / 300
+    labels = np.asarray(STANDIN_DISEASES)[score.astype(int) % len(STANDIN_DISEASES)]
+
+    label_encoder = LabelEncoder().fit(labels)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    model.fit(X, label_encoder.transform(labels))
+    return model, label_encoder
+
+
+def load_benchmark_model(model_dir=None):
+    """Real model when available, otherwise the stand-in; returns (model, encoder, source)"""
+    model, label_encoder = load_real_model(model_dir)
+    if model is not None:
+        return model, label_encoder, 'real'
+    model, label_encoder = train_standin_model()
+    return model, label_encoder, 'stand-in'
+
+
+def standin_model_dir():
+    """Directory holding the dumped stand-in model, created on first use
+
+    The files are written uncompressed so they can be memory-mapped. The
+    stand-in is deterministic, so timings taken against it are comparable
+    between runs and machines.
+    """
+    import tempfile
+
+    import joblib
+
+    standin_dir = os.path.join(tempfile.gettempdir(), 'checkwise_standin_model')
+    model_path = os.path.join(standin_dir, 'cbc_disease_model.joblib')
+    if not os.path.exists(model_path):
+        os.makedirs(standin_dir, exist_ok=True)
+        model, label_encoder = train_standin_model()
+        joblib.dump(label_encoder, os.path.join(standin_dir, 'disease_label_encoder.joblib'))
+        joblib.dump(model, model_path)
+    return standin_dir
+
+
+def ensure_model_dir(model_dir=None):
+    """Directory with loadable model files for benchmarks that load by path
+
+    Returns the real model directory when its files load, otherwise the
+    stand-in model's directory (see standin_model_dir).
+    """
+    model, _ = load_real_model(model_dir)
+    if model is not None:
+        return model_dir or BACKEND_DIR
+    return standin_model_dir()
+
+
+# Adult reference (mean, sd) for the independently drawn parameters
+REFERENCE_VALUES = {
+    'WBC': (7.5, 2.0), 'LY%': (30.0, 7.0), 'MO%': (7.0, 2.0), 'EO%': (2.5, 1.5), 'BA%': (0.6, 0.3),
+    'RBC': (4.8, 0.5), 'MCV': (90.0, 5.0), 'MCHC': (33.5, 1.2), 'RDW': (13.0, 1.2),
+    'PLT': (260.0, 60.0), 'MPV': (10.0, 1.0)
+}
+# Shifts applied to a share of panels so the data isn't all healthy: (parameter, factor)
+ABNORMAL_PATTERNS = [
+    (('RBC', 0.7), ('MCV', 0.8)),   # microcytic anemia
+    (('WBC', 2.5), ('LY%', 0.5)),   # neutrophilia / infection
+    (('PLT', 0.3),),                # thrombocytopenia
+    (('WBC', 0.4), ('PLT', 0.5), ('RBC', 0.75)),  # pancytopenia
+    (('EO%', 4.0),),                # eosinophilia
+]
+INVALID_VALUES = ['n/a', 'pending', '12,5', '>100', 'see note']
+
+
+def synthetic_panels(count, seed=0, abnormal_rate=0.3, missing_rate=0.05, invalid_rate=0.01,
+                     out_of_range_rate=0.01, string_rate=0.1):
+    """Realistic CBC panels as API request dicts
+
+    Values are drawn around adult reference intervals, with a share of
+    panels shifted into common abnormal patterns, and the derived values
+    (NE%, absolute counts, HGB, HCT, MCH) computed from the drawn ones so each
+    panel is internally consistent. Then, per value: ``missing_rate`` are
+    dropped (absent, None or ''), ``invalid_rate`` replaced by non-numeric
+    text, ``out_of_range_rate`` pushed past PARAMETER_RANGES and
+    ``string_rate`` sent as numeric strings. Everything else stays within
+    the PARAMETER_RANGES bounds.
+    """
+    from api import FEATURES, PARAMETER_RANGES
+
+    rng = np.random.default_rng(seed)
+    draw = {name: rng.normal(mean, sd, count) for name, (mean, sd) in REFERENCE_VALUES.items()}
+    pattern = rng.integers(len(ABNORMAL_PATTERNS), size=count)
+    for row in np.flatnonzero(rng.random(count) < abnormal_rate):
+        for name, factor in ABNORMAL_PATTERNS[pattern[row]]:
+            draw[name][row] *= factor
+
+    values = {name: np.abs(column) for name, column in draw.items()}
+    values['NE%'] = np.clip(100 - values['LY%'] - values['MO%'] - values['EO%'] - values['BA%'], 0, 100)
+    for name in ('LY', 'MO', 'NE', 'EO', 'BA'):
+        values[f'{name}#'] = values['WBC'] * values[f'{name}%'] / 100
+    values['HCT'] = values['RBC'] * values['MCV'] / 10
+    values['HGB'] = values['HCT'] * values['MCHC'] / 100
+    values['MCH'] = values['HGB'] / values['RBC'] * 10
+    values['Age'] = rng.integers(1, 95, count).astype(float)
+    values['Gender'] = rng.integers(0, 2, count).astype(float)
+
+    lower = np.array([PARAMETER_RANGES[f][0] for f in FEATURES])
+    upper = np.array([PARAMETER_RANGES[f][1] for f in FEATURES])
+    matrix = np.clip(np.column_stack([values[f] for f in FEATURES]), lower, upper).round(2)
+
+    roll = rng.random(matrix.shape)
+    panels = []
+    for i, row in enumerate(matrix.tolist()):
+        panel = {}
+        for j, (feature, value) in enumerate(zip(FEATURES, row)):
+            if feature in ('Age', 'Gender'):
+                value = int(value)
+            chance = roll[i, j]
+            if chance < missing_rate:
+                kind = rng.integers(3)
+                if kind:
+                    panel[feature] = None if kind == 1 else ''
+                continue
+            chance -= missing_rate
+            if chance < invalid_rate:
+                panel[feature] = INVALID_VALUES[rng.integers(len(INVALID_VALUES))]
+            elif chance < invalid_rate + out_of_range_rate:
+                panel[feature] = round(float(upper[j]) * 1.5 + 1, 2)
+            elif chance < invalid_rate + out_of_range_rate + string_rate:
+                panel[feature] = str(value)
+            else:
+                panel[feature] = value
+        panels.append(panel)
+    return panels
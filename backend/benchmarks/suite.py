@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite with stored baselines.
+
+Runs offline against the deterministic stand-in model (same 22-feature
+interface as the real one) and synthetic, realistic CBC panels that include
+missing, invalid and out-of-range values (standin.synthetic_panels).
+
+Microbenchmarks:  validation (single and batch), predict_proba (single row
+                  and batch), top-k, analysis, JSON serialization
+End to end:       POST /api/predict through Flask's test client, uncached and
+                  cached (p50/p99 latency and throughput), and
+                  /api/predict/batch per panel
+
+Timings are compared with baselines.json after dividing both by a fixed
+calibration workload timed in the same run, so a faster or slower machine
+does not look like a change in the code. --check exits with status 1 when a
+benchmark is slower than its baseline by more than --tolerance, on the
+first run and again when re-measured.
+
+Usage: python backend/benchmarks/suite.py [--check] [--update-baselines --rounds 3] [--quick]
+                                          [--only validate predict_e2e ...] [--tolerance 1.5]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from standin import standin_model_dir, synthetic_panels
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Tail latencies are noisier than medians: they get this much more slack than --tolerance
+TAIL_SLACK = 1.5
+
+BENCHMARKS = []
+
+
+def benchmark(name, group):
+    """Register ``setup(ctx) -> (fn, ops)``; fn performs ``ops`` operations per call"""
+    def register(setup):
+        BENCHMARKS.append((name, group, setup))
+        return setup
+    return register
+
+
+def best_us_per_op(fn, ops, repeat, min_seconds=0.1):
+    """Best of ``repeat`` timed runs, each looping fn for at least ``min_seconds``"""
+    fn()  # warm-up
+    best = float('inf')
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_seconds:
+                break
+        best = min(best, elapsed / (calls * ops))
+    return best * 1e6
+
+
+def calibration():
+    """Fixed mixed Python/NumPy workload used to normalize timings across machines"""
+    total = 0
+    for i in range(5000):
+        total += i * i % 7
+    matrix = np.arange(4096, dtype=float).reshape(64, 64)
+    return total + float((matrix @ matrix).sum()) + len(json.dumps({str(i): i for i in range(200)}))
+
+
+class Context:
+    """Inputs shared by the benchmarks, built once"""
+
+    def __init__(self, api, panel_count):
+        self.api = api
+        self.bundle = api.get_model_bundle()
+        self.client = api.app.test_client()
+        self.panels = synthetic_panels(panel_count)
+        validated = api.validate_and_process_batch(self.panels)
+        self.matrix = validated['input_matrix']
+        self.data_quality = [validated['data_quality'][row] for row in validated['row_indices']]
+        self.probabilities = self.bundle.model.predict_proba(self.matrix)
+        self.responses = [{
+            'prediction': scored['prediction'],
+            'top_predictions': scored['top_predictions'],
+            'data_quality': data_quality,
+            'analysis': scored['analysis'],
+            'success': True,
+            'timestamp': '2024-01-01T00:00:00',
+            'model_version': self.bundle.version,
+            'model_variant': self.bundle.name
+        } for scored, data_quality in zip(api.score_panels(self.bundle, self.matrix[:200], self.data_quality[:200]),
+                                          self.data_quality[:200])]
+        self._unique = 0
+
+    def unique_panels(self, count):
+        """Panels not seen before in this run, so they miss the result cache"""
+        start = len(self.panels) + self._unique * count
+        self._unique += 1
+        return synthetic_panels(count, seed=start)
+
+
+@benchmark('validate_panel', 'micro')
+def bench_validate_panel(ctx):
+    panels, validate = ctx.panels[:500], ctx.api.validate_and_process_input
+    return (lambda: [validate(panel) for panel in panels]), len(panels)
+
+
+@benchmark('validate_batch_per_panel', 'micro')
+def bench_validate_batch(ctx):
+    panels = ctx.panels[:1000]
+    return (lambda: ctx.api.validate_and_process_batch(panels)), len(panels)
+
+
+@benchmark('predict_proba_row', 'micro')
+def bench_predict_row(ctx):
+    from inference import predict_probabilities
+
+    rows = [ctx.matrix[i:i + 1] for i in range(20)]
+    model = ctx.bundle.model
+    return (lambda: [predict_probabilities(model, row) for row in rows]), len(rows)
+
+
+@benchmark('predict_proba_batch_per_row', 'micro')
+def bench_predict_batch(ctx):
+    from inference import predict_probabilities
+
+    matrix, model = ctx.matrix[:1000], ctx.bundle.model
+    return (lambda: predict_probabilities(model, matrix)), len(matrix)
+
+
+@benchmark('top_predictions', 'micro')
+def bench_top_k(ctx):
+    rows, class_names = list(ctx.probabilities[:500]), ctx.bundle.class_names
+    top = ctx.api.get_top_predictions
+    return (lambda: [top(row, class_names) for row in rows]), len(rows)
+
+
+@benchmark('analysis', 'micro')
+def bench_analysis(ctx):
+    pairs = [(quality, float(row.max())) for quality, row in zip(ctx.data_quality[:500], ctx.probabilities)]
+    analyse = ctx.api.generate_comprehensive_analysis
+    return (lambda: [analyse(quality, confidence) for quality, confidence in pairs]), len(pairs)
+
+
+@benchmark('serialize_response', 'micro')
+def bench_serialize(ctx):
+    responses, dumps = ctx.responses, ctx.api.app.json.dumps
+    return (lambda: [dumps(response) for response in responses]), len(responses)
+
+
+@benchmark('predict_batch_e2e_per_panel', 'e2e')
+def bench_batch_e2e(ctx):
+    # Pre-generated so panel generation isn't timed; enough batches that they rarely repeat
+    batches = itertools.cycle([ctx.unique_panels(100) for _ in range(40)])
+
+    def run():
+        response = ctx.client.post('/api/predict/batch', json=next(batches))
+        assert response.status_code == 200, response.status_code
+    return run, 100
+
+
+def predict_latencies(ctx, panels):
+    latencies = []
+    for panel in panels:
+        started = time.perf_counter()
+        response = ctx.client.post('/api/predict', json=panel)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code in (200, 400), response.status_code
+    return latencies
+
+
+def latency_results(name, latencies):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+    return {f'{name}_p50': p50, f'{name}_p99': p99}, len(latencies) / sum(latencies)
+
+
+def run_e2e_latency(ctx, requests):
+    """Per-request latency of /api/predict: unique panels, then one panel repeated"""
+    predict_latencies(ctx, ctx.unique_panels(20))  # warm-up
+    uncached, uncached_rps = latency_results('predict_e2e', predict_latencies(ctx, ctx.unique_panels(requests)))
+    repeated = ctx.panels[:1] * requests
+    cached, cached_rps = latency_results('predict_e2e_cached', predict_latencies(ctx, repeated))
+    return {**uncached, **cached}, {'predict_e2e': uncached_rps, 'predict_e2e_cached': cached_rps}
+
+
+def run_suite(ctx, selected, repeat, requests):
+    """Run the benchmarks for which selected(name, group) is true; returns (results, throughput)"""
+    # Calibrated before every benchmark; the fastest run is the machine's speed, like the best-of timings
+    calibrations, results, throughput = [], {}, {}
+    for name, group, setup in BENCHMARKS:
+        if selected(name, group):
+            calibrations.append(best_us_per_op(calibration, 1, 3, min_seconds=0.02))
+            fn, ops = setup(ctx)
+            results[name] = best_us_per_op(fn, ops, repeat)
+    if selected('predict_e2e', 'e2e'):
+        calibrations.append(best_us_per_op(calibration, 1, 3, min_seconds=0.02))
+        latencies, throughput = run_e2e_latency(ctx, requests)
+        results.update(latencies)
+    results['calibration'] = min(calibrations)
+    return results, throughput
+
+
+def load_baselines(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(results, baselines, tolerance):
+    """Rows of (name, value, baseline, normalized ratio, status); ratio > 1 means slower"""
+    calibration_now = results['calibration']
+    calibration_then = baselines['results']['calibration']
+    rows = []
+    for name, value in results.items():
+        baseline = baselines['results'].get(name)
+        if name == 'calibration' or baseline is None:
+            rows.append((name, value, baseline, None, 'new' if baseline is None else ''))
+            continue
+        ratio = (value / calibration_now) / (baseline / calibration_then)
+        limit = tolerance * TAIL_SLACK if name.endswith('_p99') else tolerance
+        rows.append((name, value, baseline, ratio, 'REGRESSION' if ratio > limit else 'ok'))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check', action='store_true', help='Exit 1 on a regression against the baselines')
+    parser.add_argument('--update-baselines', action='store_true', help=f'Write results to {BASELINES_PATH}')
+    parser.add_argument('--baselines', default=BASELINES_PATH, help='Baselines file to compare with or write')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed slowdown ratio after calibration (default: 1.5)')
+    parser.add_argument('--only', nargs='+', help='Run benchmarks in these groups (micro, e2e) or whose name '
+                                                  'starts with one of these')
+    parser.add_argument('--quick', action='store_true', help='Fewer repeats and requests (noisier)')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests for the /api/predict latency runs')
+    parser.add_argument('--rounds', type=int, default=1,
+                        help='Run the suite this many times and keep the best of each (use 3+ for baselines)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    # Always the stand-in: baselines taken against one model mean nothing for another
+    os.environ['MODEL_DIR'] = standin_model_dir()
+    os.environ.setdefault('MICROBATCH_ENABLED', 'false')
+    logging.disable(logging.WARNING)
+    import api
+
+    if not api.load_models():
+        sys.exit(f"Model load failed: {api.model_registry.status}")
+    repeat = 3 if args.quick else 7
+    requests = max(100, args.requests // 4) if args.quick else args.requests
+    ctx = Context(api, panel_count=1000)
+
+    def selected(name, group):
+        return not args.only or any(name.startswith(prefix) or group == prefix for prefix in args.only)
+
+    results, throughput = run_suite(ctx, selected, repeat, requests)
+    for _ in range(args.rounds - 1):
+        again, _ = run_suite(ctx, selected, repeat, requests)
+        results = {name: min(value, again[name]) for name, value in results.items()}
+
+    config = {'engine': api.MODEL_ENGINE, 'json_provider': api.app.json.name, 'model': 'stand-in'}
+    baselines = load_baselines(args.baselines)
+    rows = compare(results, baselines, args.tolerance) if baselines and not args.update_baselines else None
+    if rows is not None and baselines.get('config') != config:
+        print(f"warning: baselines were taken with {baselines.get('config')}, this run uses {config}",
+              file=sys.stderr)
+    suspects = {row[0] for row in rows or [] if row[4] == 'REGRESSION'}
+    if suspects:
+        # Re-measure before reporting: on a shared machine one slow run is more often noise than code
+        retry, _ = run_suite(ctx, lambda name, group: name in suspects or (
+            group == 'e2e' and any(suspect.startswith(name) for suspect in suspects)), repeat, requests)
+        for name, value in retry.items():
+            results[name] = min(results[name], value) if name != 'calibration' else results[name]
+        rows = compare(results, baselines, args.tolerance)
+
+    if args.json:
+        print(json.dumps({'config': config, 'results': results, 'throughput_rps': throughput}, indent=2))
+    else:
+        print(f"stand-in model, engine={config['engine']}, json={config['json_provider']}, "
+              f"python {platform.python_version()}, numpy {np.__version__}")
+        print(f"{'benchmark':30s} {'us':>10s} {'baseline':>10s} {'ratio':>7s}")
+        for name, value, baseline, ratio, status in rows or [(n, v, None, None, '') for n, v in results.items()]:
+            baseline_text = f"{baseline:10.2f}" if baseline is not None else f"{'-':>10s}"
+            ratio_text = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7s}"
+            print(f"{name:30s} {value:10.2f} {baseline_text} {ratio_text}  {status}")
+        for name, rps in throughput.items():
+            print(f"{name} throughput: {rps:.0f} req/s (single client)")
+
+    if args.update_baselines:
+        with open(args.baselines, 'w') as f:
+            json.dump({
+                'config': config,
+                'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                            'platform': platform.platform()},
+                'results': {name: round(value, 3) for name, value in sorted(results.items())}
+            }, f, indent=2)
+            f.write('\n')
+        print(f"baselines written to {args.baselines}")
+
+    regressions = [row[0] for row in rows or [] if row[4] == 'REGRESSION']
+    if args.check and regressions:
+        print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    if args.check and rows is None:
+        print(f"no baselines at {args.baselines}; run with --update-baselines first", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Compact binary request and response formats for machine-to-machine clients.
+
+Requests:
+- ``application/x-cbc-float32``: the raw body is little-endian float32
+  values, 22 per panel in the ``required`` feature order of
+  /api/parameters, with NaN for a missing value.
+- MessagePack (``application/msgpack``, when the msgpack package is
+  installed): a map whose ``features`` entry holds the same float32 bytes
+  as a bin, with optional ``patient_ids`` / ``panel_ids`` arrays.
+
+Either way the body is decoded with ``np.frombuffer``: the matrix is a
+view of the request bytes, not a copy.
+
+Responses hold one fixed-size little-endian record per panel
+(RESULT_DTYPE): a status byte, the top five class indices (into the
+``classes`` list) with their probabilities, and bitmasks of the missing
+and out-of-range features (bit ``j`` = feature ``j``).
+``application/x-cbc-result`` is the bare record array, with the class
+names and model version in response headers. The MessagePack response is
+a map with the same records as a bin next to that metadata.
+"""
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+FLOAT32_MIMETYPE = 'application/x-cbc-float32'
+RESULT_MIMETYPE = 'application/x-cbc-result'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+TOP_K = 5
+# Unused top-class slot (fewer than TOP_K classes above the probability floor)
+NO_CLASS = 0xFFFF
+STATUS_REJECTED = 0
+STATUS_OK = 1
+RESULT_DTYPE = np.dtype([
+    ('status', 'u1'),
+    ('top_classes', '<u2', (TOP_K,)),
+    ('top_probabilities', '<f4', (TOP_K,)),
+    ('missing', '<u4'),
+    ('out_of_range', '<u4'),
+])
+
+
+class BinaryFormatError(ValueError):
+    """Raised for a binary body that does not decode to a feature matrix"""
+
+
+def msgpack_available():
+    return msgpack is not None
+
+
+def decode_float32(body, n_features):
+    """Read-only (panels, n_features) float32 view of a raw request body"""
+    row_bytes = 4 * n_features
+    if not body or len(body) % row_bytes:
+        raise BinaryFormatError(f'Body must hold a whole number of panels of {n_features} little-endian '
+                                f'float32 values ({row_bytes} bytes each); got {len(body)} bytes.')
+    matrix = np.frombuffer(body, dtype='<f4').reshape(-1, n_features)
+    if np.isinf(matrix).any():
+        raise BinaryFormatError('Values must be finite; send NaN for a missing value.')
+    return matrix
+
+
+def decode_msgpack(body, n_features):
+    """(matrix, patient_ids or None, panel_ids or None) from a MessagePack request body"""
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception:
+        raise BinaryFormatError('Body is not valid MessagePack.') from None
+    if not isinstance(payload, dict) or not isinstance(payload.get('features'), bytes):
+        raise BinaryFormatError('MessagePack body must be a map with the float32 feature bytes under "features".')
+    matrix = decode_float32(payload['features'], n_features)
+    identifiers = []
+    for field in ('patient_ids', 'panel_ids'):
+        values = payload.get(field)
+        if values is not None and (not isinstance(values, list) or len(values) != len(matrix)):
+            raise BinaryFormatError(f'"{field}" must be an array with one entry per panel.')
+        identifiers.append(values)
+    return matrix, identifiers[0], identifiers[1]
+
+
+def encode_results(total_panels, row_indices, scored_rows, data_qualities, class_names, features):
+    """RESULT_DTYPE records for a batch; panels not in ``row_indices`` were rejected"""
+    class_index = {str(name): index for index, name in enumerate(class_names)}
+    feature_bit = {feature: 1 << bit for bit, feature in enumerate(features)}
+    records = np.zeros(total_panels, dtype=RESULT_DTYPE)
+    records['top_classes'] = NO_CLASS
+    if not row_indices:
+        return records.tobytes()
+
+    top_classes = np.full((len(row_indices), TOP_K), NO_CLASS, dtype='<u2')
+    top_probabilities = np.zeros((len(row_indices), TOP_K), dtype='<f4')
+    missing = np.zeros(len(row_indices), dtype='<u4')
+    out_of_range = np.zeros(len(row_indices), dtype='<u4')
+    for row, (scored, data_quality) in enumerate(zip(scored_rows, data_qualities)):
+        for slot, entry in enumerate(scored['top_predictions'][:TOP_K]):
+            top_classes[row, slot] = class_index[entry['disease']]
+            top_probabilities[row, slot] = entry['probability']
+        missing[row] = sum(feature_bit[feature] for feature in data_quality['missing_parameters'])
+        # Entries read "FEATURE=value"
+        out_of_range[row] = sum(feature_bit[entry.split('=', 1)[0]]
+                                for entry in data_quality['out_of_range_parameters'])
+    records['status'][row_indices] = STATUS_OK
+    records['top_classes'][row_indices] = top_classes
+    records['top_probabilities'][row_indices] = top_probabilities
+    records['missing'][row_indices] = missing
+    records['out_of_range'][row_indices] = out_of_range
+    return records.tobytes()
+
+
+def encode_msgpack(records, metadata):
+    return msgpack.packb({**metadata, 'results': records}, use_bin_type=True)
+
+
+def describe(features):
+    """Layout of the binary formats, for /api/parameters"""
+    return {
+        'request': {
+            'mimetype': FLOAT32_MIMETYPE,
+            'layout': f'{len(features)} little-endian float32 values per panel in "required" order; NaN = missing',
+            'msgpack': 'map with the same bytes as a bin under "features", optional "patient_ids"/"panel_ids" '
+                       f'arrays; Content-Type one of {", ".join(MSGPACK_MIMETYPES)}',
+            'msgpack_available': msgpack_available()
+        },
+        'response': {
+            'mimetype': RESULT_MIMETYPE,
+            'record_size': RESULT_DTYPE.itemsize,
+            'record_fields': [
+                {'name': name, 'dtype': RESULT_DTYPE.fields[name][0].base.str,
+                 'shape': list(RESULT_DTYPE.fields[name][0].shape), 'offset': RESULT_DTYPE.fields[name][1]}
+                for name in RESULT_DTYPE.names
+            ],
+            'status': {'rejected': STATUS_REJECTED, 'ok': STATUS_OK},
+            'no_class': NO_CLASS,
+            'headers': ['X-Class-Names (JSON array)', 'X-Model-Version', 'X-Model-Variant'],
+            'msgpack': 'map of classes, model_version, model_variant, errors and the records bin under "results"'
+        }
+    }
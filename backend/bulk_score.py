@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+CheckwiseAI - Bulk CBC scoring
+
+Scores CSV or Parquet files of CBC panels (one panel per row, columns named
+like the API fields: WBC, LY%, ..., Age, Gender) in fixed-size chunks and
+streams the results to a CSV or NDJSON file. Memory use depends on the chunk
+size only, never on the input size.
+
+With --workers N the chunks are scored by a pool of N processes. Each worker
+loads its own copy of the model once (memory-mapped, though scikit-learn's
+trees still copy their node arrays into each worker) and results are written
+in input order.
+
+Usage:
+    python backend/bulk_score.py panels.csv predictions.csv --chunk-size 20000
+    python backend/bulk_score.py panels.parquet predictions.ndjson --id-column patient_id
+    python backend/bulk_score.py panels.csv predictions.csv --workers 8 --chunk-size 5000
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger('bulk_score')
+
+OUTPUT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+def iter_input_chunks(path, chunk_size):
+    """Yield pandas DataFrames of at most chunk_size rows from a CSV or Parquet file"""
+    import pandas as pd
+
+    if path.lower().endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('Reading Parquet input requires pyarrow (pip install pyarrow)') from None
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield record_batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=True)
+
+
+def frame_to_panels(frame):
+    """DataFrame rows -> panel dicts with missing cells as None (what validation expects)"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def score_panels_chunk(panels, top_k=5):
+    """Score one chunk of panels with a single predict_proba call
+
+    Returns one flat result dict per input panel, in input order.
+    """
+    import api
+
+    bundle = api.model_registry.current
+    batch = api.validate_and_process_batch(panels)
+    results = [None] * len(panels)
+    for row_error in batch['errors']:
+        results[row_error['index']] = {'prediction': None, 'error': row_error['error']}
+
+    if batch['row_indices']:
+        probabilities, predicted_indices = api.predict_probabilities(bundle.model, batch['input_matrix'])
+        for row, index in enumerate(batch['row_indices']):
+            data_quality = batch['data_quality'][row]
+            top_predictions = api.get_top_predictions(probabilities[row], bundle.class_names,
+                                                      min_probability=0.01, max_predictions=top_k)
+            primary_confidence = top_predictions[0]['probability'] if top_predictions else 0
+            analysis = api.generate_comprehensive_analysis(data_quality, primary_confidence)
+            results[index] = {
+                'prediction': str(bundle.class_names[predicted_indices[row]]),
+                'confidence': round(float(primary_confidence), 6),
+                'reliability': analysis['reliability'],
+                'completeness_percentage': data_quality['completeness_percentage'],
+                'missing_parameters': ';'.join(data_quality['missing_parameters']),
+                'top_predictions': top_predictions,
+                'error': None
+            }
+    return results
+
+
+def _init_worker(backend_dir, model_dir, mmap_mode):
+    """Process pool initializer: load the model once per worker"""
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    import api
+
+    if model_dir:
+        api.MODEL_DIR = model_dir
+    if not api.load_models(mmap_mode=mmap_mode):
+        raise RuntimeError(f"Worker could not load model: {api.model_registry.status.get('message')}")
+
+
+def parallel_chunk_scorer(workers, top_k=5, model_dir=None, mmap_mode='r', max_pending=None):
+    """Build a score_chunks callable for run() that fans chunks out to a process pool
+
+    At most ``max_pending`` chunks (default 2 per worker) are in flight, so
+    memory stays bounded, and results are yielded in submission order.
+    """
+    max_pending = max_pending or workers * 2
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def score_chunks(chunks):
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(backend_dir, model_dir, mmap_mode)) as executor:
+            pending = deque()
+            for panels in chunks:
+                pending.append(executor.submit(score_panels_chunk, panels, top_k))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    return score_chunks
+
+
+class ResultWriter:
+    """Streams scored rows to CSV (flattened top-k columns) or NDJSON"""
+
+    def __init__(self, path, id_columns, top_k):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in OUTPUT_FORMATS:
+            raise ValueError(f'Unsupported output format {extension!r}; use one of {", ".join(OUTPUT_FORMATS)}')
+        self.format = OUTPUT_FORMATS[extension]
+        self.id_columns = id_columns
+        self.top_k = top_k
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._csv = None
+        if self.format == 'csv':
+            fieldnames = list(id_columns) + ['prediction', 'confidence', 'reliability',
+                                             'completeness_percentage', 'missing_parameters']
+            for rank in range(1, top_k + 1):
+                fieldnames += [f'disease_{rank}', f'probability_{rank}']
+            fieldnames.append('error')
+            self._csv = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, id_rows, results):
+        for ids, result in zip(id_rows, results):
+            if self.format == 'ndjson':
+                self._file.write(json.dumps({**ids, **result}) + '\n')
+                continue
+            row = {**ids, **result}
+            for rank, top in enumerate(result.get('top_predictions') or [], start=1):
+                row[f'disease_{rank}'] = top['disease']
+                row[f'probability_{rank}'] = round(top['probability'], 6)
+            self._csv.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+def run(input_path, output_path, chunk_size=10000, id_columns=(), top_k=5, score_chunks=None):
+    """Score input_path into output_path chunk by chunk; returns (rows, seconds)
+
+    ``score_chunks`` maps an iterator of panel lists to an iterator of result
+    lists in the same order; by default chunks are scored in this process.
+    """
+    if score_chunks is None:
+        def score_chunks(chunks):
+            for panels in chunks:
+                yield score_panels_chunk(panels, top_k)
+
+    id_buffer = []
+
+    def panel_chunks():
+        for frame in iter_input_chunks(input_path, chunk_size):
+            missing_ids = [column for column in id_columns if column not in frame.columns]
+            if missing_ids:
+                raise ValueError(f'ID column(s) not found in input: {", ".join(missing_ids)}')
+            id_buffer.append(frame_to_panels(frame[list(id_columns)]) if id_columns else [{}] * len(frame))
+            yield frame_to_panels(frame)
+
+    writer = ResultWriter(output_path, id_columns, top_k)
+    started = time.perf_counter()
+    total_rows = 0
+    try:
+        for results in score_chunks(panel_chunks()):
+            writer.write(id_buffer.pop(0), results)
+            total_rows += len(results)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Scored {total_rows} rows ({total_rows / elapsed:,.0f} rows/s)")
+    finally:
+        writer.close()
+    return total_rows, time.perf_counter() - started
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Score CSV/Parquet CBC datasets with the CheckWise model')
+    parser.add_argument('input', help='Input .csv or .parquet file, one CBC panel per row')
+    parser.add_argument('output', help='Output .csv or .ndjson file')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows scored per model call (default: 10000)')
+    parser.add_argument('--id-column', action='append', default=[], dest='id_columns',
+                        help='Input column copied to the output (repeatable)')
+    parser.add_argument('--top-k', type=int, default=5, help='Top predictions per row (default: 5)')
+    parser.add_argument('--model-dir', help='Directory containing the model files')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Scoring processes; 1 scores in this process (default: 1)')
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    args = build_parser().parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    import api
+
+    if args.model_dir:
+        api.MODEL_DIR = args.model_dir
+
+    score_chunks = None
+    if args.workers > 1:
+        # Workers load their own copy; just fail fast if it is missing
+        if api.resolve_model_location() is None:
+            logger.error("Could not load model: model files not found")
+            return 1
+        score_chunks = parallel_chunk_scorer(args.workers, args.top_k, args.model_dir, api.MODEL_MMAP_MODE)
+    elif not api.load_models():
+        logger.error(f"Could not load model: {api.model_registry.status.get('message')}")
+        return 1
+
+    rows, seconds = run(args.input, args.output, args.chunk_size, args.id_columns, args.top_k, score_chunks)
+    logger.info(f"Done: {rows} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+CheckwiseAI - NumPy-only model engine
+
+Exports a fitted scikit-learn classifier to a plain .npz file of arrays and
+evaluates it with NumPy alone, so serving processes never import sklearn or
+joblib. Supported estimators:
+
+- tree ensembles (RandomForestClassifier, ExtraTreesClassifier) and single
+  DecisionTreeClassifiers: all trees are flattened into shared node arrays
+  (feature, threshold, left/right child, side for missing values, per-leaf
+  class distribution) and every row walks every tree at once, one tree level
+  per NumPy step;
+- multiclass LogisticRegression: coefficient matrix, intercepts and softmax.
+
+The evaluator repeats sklearn's arithmetic exactly (float32 features for the
+tree comparisons, NaN sent to each node's ``missing_go_to_left`` side,
+tree-order accumulation, the same softmax steps), and every export is checked
+against the source estimator, on rows with and without missing values: it is
+refused unless the probabilities match bit for bit.
+
+Usage:
+    python backend/compiled_model.py                      # model in backend/
+    python backend/compiled_model.py --model-dir /models/v3
+"""
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+
+logger = logging.getLogger('compiled_model')
+
+# 2 added the per-node side for missing values; version 1 files must be exported again
+FORMAT_VERSION = 2
+# Rows evaluated per step by the tree engine
+BLOCK_ROWS = 1024
+
+
+class CompiledLabelEncoder:
+    """The part of LabelEncoder the API uses, rebuilt from exported classes"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, indices):
+        return self.classes_[np.asarray(indices)]
+
+
+class CompiledTreeEnsemble:
+    """Averaged class distributions of flattened decision trees"""
+
+    kind = 'trees'
+
+    def __init__(self, arrays):
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = int(arrays['n_features'])
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing_left = arrays['missing_left']
+        self.leaf_value = arrays['leaf_value']
+        self.roots = arrays['roots']
+        self.average = bool(arrays['average'])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf node index (into the shared arrays) of every row in every tree"""
+        # sklearn evaluates trees on float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        # One flat (row, tree) walker per entry; settled walkers drop out of each step
+        nodes = np.tile(self.roots, n_rows)
+        offsets = np.repeat(np.arange(n_rows) * n_features, self.n_trees)
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+        active = np.flatnonzero(self.left[nodes] != nodes)
+        while active.size:
+            current = nodes[active]
+            values = flat_X[offsets[active] + self.feature[current]]
+            go_left = values <= self.threshold[current]
+            if has_missing:
+                # NaN compares False; sklearn routes it to the side recorded at fit time
+                go_left = np.where(np.isnan(values), self.missing_left[current], go_left)
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.left[current] != current]  # leaves point to themselves
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if X.shape[0] <= BLOCK_ROWS:
+            return self._predict_block(X)
+        # Bounds the (rows, trees, classes) intermediate for large batches
+        return np.vstack([self._predict_block(X[start:start + BLOCK_ROWS])
+                          for start in range(0, X.shape[0], BLOCK_ROWS)])
+
+    def _predict_block(self, X):
+        leaf_values = self.leaf_value[self.apply(X)]  # (rows, trees, classes)
+        if not self.average:
+            return leaf_values[:, 0]
+        # cumsum adds in tree order, like the forest's running sum
+        probabilities = np.cumsum(leaf_values, axis=1)[:, -1]
+        probabilities /= self.n_trees
+        return probabilities
+
+
+class CompiledLinearModel:
+    """Multiclass logistic regression: softmax(X @ coef.T + intercept)"""
+
+    kind = 'linear'
+
+    def __init__(self, arrays):
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = int(arrays['n_features'])
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        # sklearn's check_array rejects these; a NaN would otherwise come back as a NaN row
+        if not np.isfinite(X).all():
+            raise ValueError('Input X contains NaN or infinity.')
+        scores = X @ self.coef.T + self.intercept
+        # Same steps as sklearn.utils.extmath.softmax
+        scores -= np.max(scores, axis=1).reshape((-1, 1))
+        np.exp(scores, scores)
+        scores /= np.sum(scores, axis=1).reshape((-1, 1))
+        return scores
+
+
+ENGINES = {engine.kind: engine for engine in (CompiledTreeEnsemble, CompiledLinearModel)}
+
+
+def _tree_arrays(estimators, n_classes):
+    """Concatenate the node arrays of fitted trees, re-basing child indices"""
+    features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError('Only single-output trees can be compiled')
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        # Absent before sklearn 1.3, whose trees do not accept NaN at all
+        missing_go_to_left = getattr(tree, 'missing_go_to_left', None)
+        missing_lefts.append(np.zeros(tree.node_count, dtype=bool) if missing_go_to_left is None
+                             else np.asarray(missing_go_to_left, dtype=bool) & ~is_leaf)
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        if not np.allclose(value.sum(axis=1), 1.0):
+            # Before sklearn 1.4 trees stored weighted counts and predict_proba normalized them
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+    return {
+        'feature': np.concatenate(features).astype(np.intp),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.intp),
+        'right': np.concatenate(rights).astype(np.intp),
+        'missing_left': np.concatenate(missing_lefts),
+        'leaf_value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.intp)
+    }
+
+
+def _plain_array(values):
+    # Object arrays would need pickle to load; class labels are plain strings or numbers
+    values = np.asarray(values)
+    return values.astype(str) if values.dtype == object else values
+
+
+def compile_estimator(model):
+    """Fitted sklearn classifier -> dict of arrays for the matching engine"""
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    classes = _plain_array(model.classes_)
+    base = {'format_version': np.asarray(FORMAT_VERSION), 'classes': classes,
+            'n_features': np.asarray(model.n_features_in_)}
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+        return {**base, 'kind': np.asarray('trees'), 'average': np.asarray(True),
+                **_tree_arrays(model.estimators_, len(classes))}
+    if isinstance(model, DecisionTreeClassifier):
+        return {**base, 'kind': np.asarray('trees'), 'average': np.asarray(False),
+                **_tree_arrays([model], len(classes))}
+    if isinstance(model, LogisticRegression) and len(classes) > 2:
+        return {**base, 'kind': np.asarray('linear'), 'coef': np.asarray(model.coef_, dtype=np.float64),
+                'intercept': np.asarray(model.intercept_, dtype=np.float64)}
+    raise ValueError(f'Cannot compile {type(model).__name__}; supported: random forest, extra trees, '
+                     f'decision tree and multiclass logistic regression classifiers')
+
+
+def engine_from_arrays(arrays):
+    if int(arrays['format_version']) != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format {int(arrays['format_version'])}")
+    kind = str(arrays['kind'])
+    if kind not in ENGINES:
+        raise ValueError(f'Unknown compiled model kind {kind!r}')
+    return ENGINES[kind](arrays)
+
+
+def load_compiled_model(path):
+    """Load an exported .npz; returns (engine, CompiledLabelEncoder)"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    return engine_from_arrays(arrays), CompiledLabelEncoder(arrays['encoder_classes'])
+
+
+def verify_engine(model, engine, X):
+    """Raise unless the engine reproduces model.predict_proba bit for bit on X"""
+    try:
+        expected = model.predict_proba(X)
+    except ValueError:
+        # Estimators without missing-value support (forests before sklearn 1.4) refuse NaN; check the rest
+        X = X[~np.isnan(X).any(axis=1)]
+        expected = model.predict_proba(X)
+    actual = engine.predict_proba(X)
+    if expected.shape != actual.shape or not np.array_equal(expected, actual):
+        max_error = np.max(np.abs(expected - actual)) if expected.shape == actual.shape else 'shape mismatch'
+        raise ValueError(f'Compiled model does not reproduce predict_proba exactly (max error {max_error})')
+
+
+def verification_matrix(n_features, n_rows=2000, random_state=0):
+    """Random panels spanning the validated parameter ranges, plus the warm-up defaults
+
+    Copies of a tenth of the panels follow with missing (NaN) values, as JSON
+    "NaN" inputs reach the model: one per feature, then random cells.
+    """
+    from api import CRITICAL_DEFAULTS, FEATURES, PARAMETER_RANGES
+
+    rng = np.random.default_rng(random_state)
+    if n_features != len(FEATURES):
+        X = rng.normal(0, 100, size=(n_rows, n_features))
+    else:
+        lower = np.array([PARAMETER_RANGES[feature][0] for feature in FEATURES], dtype=float)
+        upper = np.array([PARAMETER_RANGES[feature][1] for feature in FEATURES], dtype=float)
+        X = rng.uniform(lower, upper, size=(n_rows, n_features))
+        X[:, FEATURES.index('Gender')] = rng.integers(0, 2, n_rows)
+        defaults = np.array([[CRITICAL_DEFAULTS.get(feature, 0) for feature in FEATURES]], dtype=float)
+        X = np.vstack([defaults, X])
+    with_missing = X[:max(n_features, n_rows // 10)].copy()
+    with_missing[np.arange(n_features), np.arange(n_features)] = np.nan
+    with_missing[n_features:][rng.random(with_missing[n_features:].shape) < 0.2] = np.nan
+    return np.vstack([X, with_missing])
+
+
+def export_model(model, label_encoder, path, verify_X=None):
+    """Compile ``model``, check it against predict_proba and write it to ``path``"""
+    arrays = compile_estimator(model)
+    arrays['encoder_classes'] = _plain_array(label_encoder.classes_)
+    engine = engine_from_arrays(arrays)
+    if verify_X is None:
+        verify_X = verification_matrix(engine.n_features_in_)
+    verify_engine(model, engine, verify_X)
+    # Uncompressed, so loading is a straight read of the arrays
+    with open(path, 'wb') as output:
+        np.savez(output, **arrays)
+    return engine
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    parser = argparse.ArgumentParser(description='Compile the CheckWise model into a NumPy-only .npz engine')
+    parser.add_argument('--model-dir', help='Directory containing the joblib model files (default: backend/)')
+    parser.add_argument('--output', help='Output path (default: <model-dir>/cbc_disease_model.npz)')
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    import joblib
+
+    from api import COMPILED_MODEL_FILENAME, ENCODER_FILENAME, MODEL_FILENAME
+
+    model_dir = args.model_dir or backend_dir
+    output = args.output or os.path.join(model_dir, COMPILED_MODEL_FILENAME)
+    model = joblib.load(os.path.join(model_dir, MODEL_FILENAME))
+    label_encoder = joblib.load(os.path.join(model_dir, ENCODER_FILENAME))
+    try:
+        engine = export_model(model, label_encoder, output)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    logger.info(f"Wrote {engine.kind} engine ({os.path.getsize(output) / 2 ** 20:.1f} MB) to {output}; "
+                f"probabilities verified bit for bit against {type(model).__name__}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
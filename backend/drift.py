@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Streaming input-distribution and prediction statistics, with drift scores.
+
+DriftMonitor keeps, in constant memory, for every served panel: per-feature
+running mean/variance (merged batch by batch with the parallel form of
+Welford's update), fixed-bin histograms over each feature's PARAMETER_RANGES
+interval (plus under/overflow bins), missing-value counts, predicted-class
+counts and a histogram of the top class probability. Updates are computed with NumPy outside any lock and
+merged into one of a few lock-striped shards chosen per thread, so
+concurrent requests rarely wait on each other; shards are combined only
+when a snapshot is taken.
+
+With ``window_rows`` set, the statistics describe recent traffic rather
+than everything since start-up: shards are swapped for fresh ones every
+``window_rows`` panels and only the previous generation is kept, so a
+snapshot covers the last ``window_rows`` to ``2 * window_rows`` panels and a
+shift shows up within one window. ``reset`` starts over, e.g. when the
+current statistics have just become the baseline.
+
+A snapshot is plain JSON and doubles as a baseline. ``drift_scores``
+compares a snapshot with a baseline using the population stability index
+(PSI) per feature histogram, for class frequencies and for confidence.
+
+Build a baseline from reference panels (e.g. the training set):
+    python backend/drift.py reference.csv drift_baseline.json
+"""
+import argparse
+import itertools
+import json
+import math
+import threading
+from collections import Counter
+
+import numpy as np
+
+# PSI below 0.1: no meaningful shift; 0.1-0.25: moderate; above 0.25: significant
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+# Proportion floor for empty bins, so PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def psi(expected, actual):
+    """Population stability index between two histograms of counts over the same bins"""
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    expected = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    actual = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_level(score):
+    if score is None:
+        return None
+    return 'drift' if score >= PSI_DRIFT else 'warning' if score >= PSI_WARNING else 'stable'
+
+
+class _Shard:
+    __slots__ = ('lock', 'rows', 'count', 'mean', 'm2', 'missing', 'histogram', 'classes', 'confidence',
+                 'pending', 'pending_rows')
+
+    def __init__(self, n_features, bins, confidence_bins):
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.count = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.missing = np.zeros(n_features, dtype=np.int64)
+        self.histogram = np.zeros((n_features, bins + 2), dtype=np.int64)
+        self.classes = Counter()
+        self.confidence = np.zeros(confidence_bins, dtype=np.int64)
+        self.pending = []
+        self.pending_rows = 0
+
+
+def _merge_moments(count, mean, m2, other_count, other_mean, other_m2):
+    """Chan et al. pairwise merge of per-feature (count, mean, M2); returns the combined arrays"""
+    total = count + other_count
+    delta = other_mean - mean
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = np.where(total > 0, other_count / total, 0.0)
+    return total, mean + delta * share, m2 + other_m2 + delta * delta * count * share
+
+
+class DriftMonitor:
+    """Thread-safe streaming statistics over served feature rows and predictions
+
+    Observations smaller than ``fold_rows`` are only appended to their
+    shard's pending list; NumPy per-call overhead dominates at one row, so
+    pending rows are folded into the statistics ``fold_rows`` at a time
+    (and before every snapshot). ``window_rows=None`` keeps every row, as
+    when building a baseline from a reference set.
+    """
+
+    def __init__(self, features, ranges, bins=20, confidence_bins=10, shards=8, fold_rows=64, window_rows=None):
+        self.features = tuple(features)
+        self.lower = np.array([ranges[feature][0] for feature in self.features], dtype=float)
+        self.upper = np.array([ranges[feature][1] for feature in self.features], dtype=float)
+        self.bins = bins
+        self.confidence_bins = confidence_bins
+        self.fold_rows = fold_rows
+        self._feature_index = {feature: index for index, feature in enumerate(self.features)}
+        self._scale = bins / (self.upper - self.lower)
+        self._offsets = np.arange(len(self.features)) * (bins + 2)
+        self.window_rows = window_rows
+        self.rows_total = 0
+        self._shard_count = shards
+        self._shards = self._new_shards()
+        self._previous = []
+        self._generation = 0
+        self._window_filled = 0
+        self._window_lock = threading.Lock()
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def _new_shards(self):
+        return [_Shard(len(self.features), self.bins, self.confidence_bins) for _ in range(self._shard_count)]
+
+    def reset(self):
+        """Drop all statistics gathered so far (rows_total keeps counting)"""
+        with self._window_lock:
+            self._shards, self._previous = self._new_shards(), []
+            self._generation += 1
+            self._window_filled = 0
+
+    def _advance_window(self, rows):
+        # A full generation becomes the previous one and fresh shards take the incoming rows
+        with self._window_lock:
+            if self.window_rows is not None and self._window_filled >= self.window_rows:
+                self._shards, self._previous = self._new_shards(), self._shards
+                self._generation += 1
+                self._window_filled = 0
+            self.rows_total += rows
+            self._window_filled += rows
+
+    def missing_mask(self, missing_parameters):
+        """Boolean (rows, features) mask from each row's data_quality['missing_parameters']"""
+        mask = np.zeros((len(missing_parameters), len(self.features)), dtype=bool)
+        index = self._feature_index
+        for row, names in enumerate(missing_parameters):
+            for name in names:
+                mask[row, index[name]] = True
+        return mask
+
+    def _shard(self):
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            shards = self._shards
+            local.shard = shards[next(self._next_shard) % len(shards)]
+            local.generation = self._generation
+        return local.shard
+
+    def observe(self, matrix, missing, labels, confidences):
+        """Add scored rows: feature matrix, missing mask, predicted labels and top-class probabilities"""
+        self._advance_window(len(matrix))
+        shard = self._shard()
+        if len(matrix) < self.fold_rows:
+            with shard.lock:
+                shard.pending.append((matrix, missing, labels, confidences))
+                shard.pending_rows += len(matrix)
+                if shard.pending_rows < self.fold_rows:
+                    return
+                pending, shard.pending, shard.pending_rows = shard.pending, [], 0
+            self._fold_pending(shard, pending)
+        else:
+            self._fold(shard, matrix, missing, labels, confidences)
+
+    def _fold_pending(self, shard, pending):
+        self._fold(shard, np.concatenate([item[0] for item in pending]),
+                   np.concatenate([item[1] for item in pending]),
+                   [label for item in pending for label in item[2]],
+                   np.concatenate([item[3] for item in pending]))
+
+    def _fold(self, shard, matrix, missing, labels, confidences):
+        # Batch statistics are computed without the lock; only the merge holds it
+        matrix = np.asarray(matrix, dtype=float)
+        # A non-finite value (e.g. the string "NaN" in JSON) counts as not observed
+        observed = ~missing & np.isfinite(matrix)
+        count = observed.sum(axis=0).astype(float)
+        values = np.where(observed, matrix, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, values.sum(axis=0) / count, 0.0)
+        m2 = (np.where(observed, matrix - mean, 0.0) ** 2).sum(axis=0)
+        # Bin 0 is underflow, 1..bins the fixed-width bins, bins + 1 overflow
+        # Clipped before the cast so extreme values cannot overflow int64
+        positions = np.clip(np.floor((values - self.lower) * self._scale) + 1, 0, self.bins + 1).astype(np.int64)
+        histogram = np.bincount((positions + self._offsets)[observed],
+                                minlength=len(self.features) * (self.bins + 2)).reshape(len(self.features), -1)
+        confidence = np.bincount(
+            np.clip((np.asarray(confidences, dtype=float) * self.confidence_bins).astype(np.int64),
+                    0, self.confidence_bins - 1), minlength=self.confidence_bins)
+        classes = Counter(labels)
+
+        with shard.lock:
+            shard.count, shard.mean, shard.m2 = _merge_moments(shard.count, shard.mean, shard.m2, count, mean, m2)
+            shard.rows += len(matrix)
+            shard.missing += len(matrix) - count.astype(np.int64)
+            shard.histogram += histogram
+            shard.classes.update(classes)
+            shard.confidence += confidence
+
+    def snapshot(self):
+        """All shards of the current window combined, as a JSON-ready dict (also the baseline format)"""
+        with self._window_lock:
+            shards = self._previous + self._shards
+        rows = 0
+        count = np.zeros(len(self.features))
+        mean = np.zeros(len(self.features))
+        m2 = np.zeros(len(self.features))
+        missing = np.zeros(len(self.features), dtype=np.int64)
+        histogram = np.zeros((len(self.features), self.bins + 2), dtype=np.int64)
+        classes = Counter()
+        confidence = np.zeros(self.confidence_bins, dtype=np.int64)
+        for shard in shards:
+            with shard.lock:
+                pending, shard.pending, shard.pending_rows = shard.pending, [], 0
+            if pending:
+                self._fold_pending(shard, pending)
+            with shard.lock:
+                count, mean, m2 = _merge_moments(count, mean, m2, shard.count, shard.mean, shard.m2)
+                rows += shard.rows
+                missing += shard.missing
+                histogram += shard.histogram
+                classes.update(shard.classes)
+                confidence += shard.confidence
+
+        features = {}
+        for index, feature in enumerate(self.features):
+            observed = int(count[index])
+            features[feature] = {
+                'count': observed,
+                'mean': float(mean[index]) if observed else None,
+                'std': math.sqrt(m2[index] / (observed - 1)) if observed > 1 else None,
+                'missing': int(missing[index]),
+                'missing_rate': round(int(missing[index]) / rows, 6) if rows else None,
+                'range': [float(self.lower[index]), float(self.upper[index])],
+                'histogram': histogram[index].tolist()
+            }
+        return {
+            'rows': rows,
+            'bins': self.bins,
+            'features': features,
+            'classes': dict(classes.most_common()),
+            'confidence_histogram': confidence.tolist()
+        }
+
+
+def drift_scores(snapshot, baseline):
+    """PSI of ``snapshot`` against ``baseline`` per feature, for classes and for confidence
+
+    Features whose bins differ from the baseline's (other range or bin count)
+    are left out. ``overall`` is the worst level found.
+    """
+    features = {}
+    for feature, current in snapshot['features'].items():
+        reference = baseline.get('features', {}).get(feature)
+        if reference is None or reference.get('range') != current['range'] \
+                or len(reference.get('histogram', ())) != len(current['histogram']):
+            continue
+        score = psi(reference['histogram'], current['histogram'])
+        features[feature] = {
+            'psi': None if score is None else round(score, 6),
+            'level': drift_level(score),
+            'mean_shift': (current['mean'] - reference['mean']) / reference['std']
+            if current['mean'] is not None and reference.get('mean') is not None and reference.get('std') else None,
+            'missing_rate_change': current['missing_rate'] - reference['missing_rate']
+            if current['missing_rate'] is not None and reference.get('missing_rate') is not None else None
+        }
+
+    labels = sorted(set(snapshot['classes']) | set(baseline.get('classes', {})))
+    class_psi = psi([baseline.get('classes', {}).get(label, 0) for label in labels],
+                    [snapshot['classes'].get(label, 0) for label in labels]) if labels else None
+    confidence_psi = None
+    if len(baseline.get('confidence_histogram', ())) == len(snapshot['confidence_histogram']):
+        confidence_psi = psi(baseline['confidence_histogram'], snapshot['confidence_histogram'])
+
+    levels = [entry['level'] for entry in features.values()] + [drift_level(class_psi), drift_level(confidence_psi)]
+    overall = next((level for level in ('drift', 'warning', 'stable') if level in levels), None)
+    return {
+        'overall': overall,
+        'features': features,
+        'classes': {'psi': None if class_psi is None else round(class_psi, 6), 'level': drift_level(class_psi)},
+        'confidence': {'psi': None if confidence_psi is None else round(confidence_psi, 6),
+                       'level': drift_level(confidence_psi)},
+        'baseline_rows': baseline.get('rows'),
+        'thresholds': {'warning': PSI_WARNING, 'drift': PSI_DRIFT}
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(snapshot, path):
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=1)
+
+
+def main():
+    """Build a baseline file by validating and scoring reference panels with the current model"""
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV or Parquet file of reference panels (API field names as columns)')
+    parser.add_argument('output', help='Baseline JSON to write (serve it with DRIFT_BASELINE_PATH)')
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import api
+    from bulk_score import frame_to_panels, iter_input_chunks
+    from inference import predict_probabilities
+
+    if not api.load_models():
+        sys.exit(f"Model load failed: {api.model_registry.status}")
+    bundle = api.get_model_bundle()
+    monitor = DriftMonitor(api.FEATURES, api.PARAMETER_RANGES)
+    for frame in iter_input_chunks(args.input, args.chunk_size):
+        batch = api.validate_and_process_batch(frame_to_panels(frame))
+        if not batch['row_indices']:
+            continue
+        probabilities, predicted = predict_probabilities(bundle.model, batch['input_matrix'])
+        monitor.observe(batch['input_matrix'],
+                        monitor.missing_mask([quality['missing_parameters'] for quality in batch['data_quality']]),
+                        [str(bundle.class_names[index]) for index in predicted], probabilities.max(axis=1))
+    snapshot = monitor.snapshot()
+    save_baseline(snapshot, args.output)
+    print(f"Wrote baseline of {snapshot['rows']} panels to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Request deduplication: single-flight scoring and an Idempotency-Key store.
+
+SingleFlight lets concurrent callers with the same key share one
+computation: the first caller runs it, the others wait for its result.
+IdempotencyStore keeps finished responses by client-supplied key so a
+retried request is answered from the store. It is bounded by entry count
+and total response bytes, expires entries after a TTL and drops its oldest
+half when the process is short of memory.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+StoredResponse = namedtuple('StoredResponse', ['fingerprint', 'status', 'mimetype', 'headers', 'body'])
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs ``fn`` once per key at a time; concurrent callers get the same result"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn, timeout=None):
+        """Return ``(result, shared)``; ``shared`` is True when another caller computed it
+
+        An exception raised by the leader's ``fn`` is raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError('Timed out waiting for an identical in-flight request')
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'shared': self.shared
+            }
+
+
+def available_memory_bytes():
+    """Memory still available to this process: cgroup headroom if limited, else MemAvailable; None if unknown"""
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            with open('/sys/fs/cgroup/memory.current') as f:
+                return int(limit) - int(f.read())
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class IdempotencyStore:
+    """Thread-safe LRU of responses by Idempotency-Key
+
+    Bounded by ``max_entries`` and ``max_bytes`` of stored bodies. On
+    ``put``, at most once per ``pressure_check_interval`` seconds, the
+    available memory is checked; below ``min_available_bytes`` the oldest
+    half of the entries is dropped.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=32 * 2 ** 20, ttl_seconds=3600.0,
+                 min_available_bytes=0, pressure_check_interval=1.0, memory_probe=available_memory_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_available_bytes = min_available_bytes
+        self.pressure_check_interval = pressure_check_interval
+        self.memory_probe = memory_probe
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pressure_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+        self.evictions = 0
+        self.pressure_evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, fingerprint):
+        """The stored response for ``key`` or None
+
+        A stored response whose fingerprint differs from ``fingerprint`` is
+        still returned (the caller rejects the reuse) but counted as a mismatch.
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, stored = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if stored.fingerprint == fingerprint:
+                self.hits += 1
+            else:
+                self.mismatches += 1
+            return stored
+
+    def put(self, key, stored):
+        if not self.enabled or len(stored.body) > self.max_bytes:
+            return
+        under_pressure = self._memory_low()
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, stored)
+            self._bytes += len(stored.body)
+            if under_pressure:
+                for _ in range(len(self._entries) // 2):
+                    self._remove(next(iter(self._entries)))
+                    self.pressure_evictions += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, stored = self._entries.pop(key)
+        self._bytes -= len(stored.body)
+
+    def _memory_low(self):
+        if not self.min_available_bytes:
+            return False
+        now = time.monotonic()
+        if now - self._pressure_checked_at < self.pressure_check_interval:
+            return False
+        self._pressure_checked_at = now
+        available = self.memory_probe()
+        return available is not None and available < self.min_available_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'mismatches': self.mismatches,
+                'evictions': self.evictions,
+                'pressure_evictions': self.pressure_evictions,
+                'expirations': self.expirations
+            }
@@ -0,0 +1,46 @@
+"""
+Inference core for the CBC disease model.
+
+Every request is scored with a single predict_proba pass: the predicted label
+is the argmax of the probability row, and the top-k labels are looked up in an
+index -> disease name array that is built once per model load.
+"""
+import numpy as np
+
+
+def build_class_names(model, label_encoder):
+    """Map each predict_proba column to its disease name (computed once per model load)"""
+    model_classes = np.asarray(model.classes_)
+    if np.issubdtype(model_classes.dtype, np.integer):
+        return np.asarray(label_encoder.inverse_transform(model_classes))
+    # Model was trained on the disease names directly
+    return model_classes
+
+
+def predict_probabilities(model, input_matrix):
+    """Score a 2-D feature matrix once; returns (probabilities, predicted column indices)"""
+    probabilities = model.predict_proba(input_matrix)
+    return probabilities, np.argmax(probabilities, axis=1)
+
+
+def top_k_indices(probabilities, k):
+    """Column indices of the k largest probabilities, highest first, along the last axis
+
+    Works on a single probability row or a (rows, classes) matrix. Ties are
+    ordered by ascending column index so results are deterministic.
+    """
+    probabilities = np.asarray(probabilities)
+    n_classes = probabilities.shape[-1]
+    k = min(k, n_classes)
+    if k <= 0:
+        return np.empty(probabilities.shape[:-1] + (0,), dtype=np.intp)
+
+    if k < n_classes:
+        candidates = np.argpartition(probabilities, n_classes - k, axis=-1)[..., n_classes - k:]
+        candidates = np.sort(candidates, axis=-1)
+    else:
+        candidates = np.broadcast_to(np.arange(n_classes), probabilities.shape)
+
+    candidate_probabilities = np.take_along_axis(probabilities, candidates, axis=-1)
+    order = np.argsort(-candidate_probabilities, axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
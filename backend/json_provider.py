@@ -0,0 +1,88 @@
+"""
+Pluggable JSON provider for the Flask app.
+
+Uses orjson when it is installed: responses are encoded straight to bytes
+(sorted keys, like Flask's default provider) and NumPy arrays and scalars are
+serialized natively. Without orjson the stdlib provider is used, extended to
+convert NumPy values. Select with JSON_PROVIDER=auto|orjson|stdlib.
+"""
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _numpy_default(obj):
+    """NumPy values -> plain Python, for encoders without native NumPy support"""
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    raise TypeError
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, also accepting NumPy scalars and arrays"""
+
+    name = 'stdlib'
+
+    @staticmethod
+    def default(obj):
+        try:
+            return _numpy_default(obj)
+        except TypeError:
+            return DefaultJSONProvider.default(obj)
+
+    def dumps_line(self, obj):
+        """One compact NDJSON line as bytes"""
+        return json.dumps(obj, default=self.default, separators=(',', ':'), sort_keys=self.sort_keys).encode() + b'\n'
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson-backed provider; output matches the default provider's sorted, compact JSON"""
+
+    name = 'orjson'
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # The stdlib also accepts NaN/Infinity literals; keep accepting what it accepts
+            return json.loads(s, **kwargs)
+
+    def dumps_line(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.options | orjson.OPT_APPEND_NEWLINE)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self._app.debug:
+            # Keep the pretty-printed debug output of the default provider
+            return super().response(obj)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self.options),
+                                        mimetype=self.mimetype)
+
+
+def select_provider(preference='auto'):
+    """The provider class for JSON_PROVIDER: 'orjson', 'stdlib' or 'auto' (orjson if installed)"""
+    preference = (preference or 'auto').lower()
+    if preference not in ('auto', 'orjson', 'stdlib'):
+        raise ValueError(f'Unknown JSON_PROVIDER {preference!r}; use auto, orjson or stdlib')
+    if preference == 'orjson' and orjson is None:
+        raise ImportError('JSON_PROVIDER=orjson requires the orjson package (pip install orjson)')
+    if preference == 'stdlib' or orjson is None:
+        return StdlibJSONProvider
+    return OrjsonProvider
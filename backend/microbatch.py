@@ -0,0 +1,150 @@
+"""
+Micro-batching queue for online inference.
+
+Concurrent requests submit single feature rows; a background thread collects
+them for up to ``max_wait_ms`` (or until ``max_batch_size`` rows are queued),
+scores them in one call and hands every caller its own probability row.
+Only useful when the server handles requests concurrently (threaded or async
+workers) - with one sync worker every batch has size 1.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds of the batch size and queue wait (ms) histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+def _bucket_counts(buckets):
+    return {bucket: 0 for bucket in buckets + (float('inf'),)}
+
+
+def _observe(histogram, value):
+    for bucket in histogram:
+        if value <= bucket:
+            histogram[bucket] += 1
+            return
+
+
+class MicroBatcher:
+    """Coalesces single-row scoring requests into batched ``score_fn`` calls
+
+    ``score_fn(context, matrix)`` takes a (rows, features) matrix and returns
+    one result row per input row (e.g. predict_proba output). Rows are only
+    batched with rows submitted under the same ``context`` (e.g. the model
+    bundle the request started with). ``on_batch(size, waits)``, if given,
+    is called after each batch with its row count and each row's queue wait
+    in seconds, e.g. to feed metrics histograms.
+    """
+
+    def __init__(self, score_fn, max_batch_size=32, max_wait_ms=3.0, on_batch=None):
+        self.score_fn = score_fn
+        self.on_batch = on_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self.batches = 0
+        self.rows = 0
+        self.failed_batches = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.batch_size_histogram = _bucket_counts(BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = _bucket_counts(QUEUE_WAIT_BUCKETS_MS)
+
+    def _ensure_worker(self):
+        # Started lazily, and again in each forked process (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='microbatcher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, row, context=None):
+        """Queue one feature row; returns a Future resolving to its result row"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=float), future, time.perf_counter(), context))
+        return future
+
+    def score_rows(self, matrix, context=None, timeout=None):
+        """Score each row of ``matrix`` through the queue and stack the results"""
+        futures = [self.submit(row, context) for row in matrix]
+        return np.vstack([future.result(timeout=timeout) for future in futures])
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            groups = {}
+            for item in collected:
+                groups.setdefault(id(item[3]), []).append(item)
+            for batch in groups.values():
+                self._score_batch(batch)
+
+    def _score_batch(self, batch):
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued, _ in batch]
+        try:
+            results = self.score_fn(batch[0][3], np.vstack([row for row, _, _, _ in batch]))
+        except Exception as e:
+            self._record(batch, waits, failed=True)
+            for _, future, _, _ in batch:
+                future.set_exception(e)
+            return
+        self._record(batch, waits)
+        for (_, future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record(self, batch, waits, failed=False):
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.failed_batches += int(failed)
+            _observe(self.batch_size_histogram, len(batch))
+            for wait in waits:
+                _observe(self.queue_wait_histogram, wait * 1000)
+            self.queue_wait_total += sum(waits)
+            self.queue_wait_max = max(self.queue_wait_max, max(waits))
+        if self.on_batch is not None:
+            self.on_batch(len(batch), waits)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'batches': self.batches,
+                'rows': self.rows,
+                'failed_batches': self.failed_batches,
+                'mean_batch_size': round(self.rows / self.batches, 3) if self.batches else 0.0,
+                'mean_queue_wait_ms': round(self.queue_wait_total / self.rows * 1000, 3) if self.rows else 0.0,
+                'max_queue_wait_ms': round(self.queue_wait_max * 1000, 3),
+                'batch_size_histogram': {str(bucket): count for bucket, count in self.batch_size_histogram.items()},
+                'queue_wait_ms_histogram': {str(bucket): count for bucket, count in self.queue_wait_histogram.items()}
+            }
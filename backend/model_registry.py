@@ -0,0 +1,291 @@
+"""
+Model registry with atomic, zero-downtime swaps.
+
+Everything a request needs from a model - estimator, label encoder, class
+names, version and derived artifacts - lives in one immutable ModelBundle.
+Requests read ``registry.current`` once and use that bundle throughout, so an
+in-flight request can never see a new model paired with an old encoder.
+Reloads build and warm the next bundle on a background thread and then
+publish it with a single reference assignment; readers never wait on a lock.
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ModelBundle = namedtuple('ModelBundle', [
+    'name',           # registry name, e.g. 'primary' or an A/B candidate
+    'model',          # estimator exposing predict_proba
+    'label_encoder',  # fitted LabelEncoder
+    'class_names',    # predict_proba column index -> disease name
+    'version',        # model version reported to clients
+    'generation',     # registry-assigned, increases with every publish
+    'metadata',       # JSON-serializable load details
+    'artifacts'       # derived per-model objects (e.g. pre-serialized payloads)
+])
+
+
+class ModelRegistry:
+    """Holds the current ModelBundle and replaces it without blocking readers
+
+    ``build_bundle(mmap_mode)`` must return a fully loaded and warmed-up
+    ModelBundle (generation is filled in on publish) or raise.
+    ``fingerprint()`` returns a cheap value that changes when the model files
+    change, or None when they are missing; it drives the directory watcher.
+    ``on_publish(bundle)`` callbacks run right after a new bundle is live.
+    """
+
+    def __init__(self, build_bundle, fingerprint=None, name='primary'):
+        self.name = name
+        self._build_bundle = build_bundle
+        self._fingerprint = fingerprint
+        self._bundle = None
+        self._generation = 0
+        self._reload_lock = threading.Lock()  # serializes loads, never taken by readers
+        self._watcher_lock = threading.Lock()
+        self._publish_callbacks = []
+        self._watcher_pid = None
+        self._loaded_fingerprint = None
+        self.status = {'status': 'not_loaded', 'message': 'Model not loaded yet'}
+        self.reload_in_progress = False
+        self.reloads_succeeded = 0
+        self.reloads_failed = 0
+
+    @property
+    def current(self):
+        """The live bundle (or None); read it once per request"""
+        return self._bundle
+
+    def on_publish(self, callback):
+        self._publish_callbacks.append(callback)
+        return callback
+
+    def load(self, mmap_mode=None):
+        """Build a bundle on the calling thread and publish it; returns True on success"""
+        with self._reload_lock:
+            return self._load_locked(mmap_mode)
+
+    def ensure_loaded(self, mmap_mode=None):
+        """Load once if nothing is live yet; concurrent first callers share that load"""
+        if self._bundle is not None:
+            return True
+        with self._reload_lock:
+            if self._bundle is not None:
+                return True
+            return self._load_locked(mmap_mode)
+
+    def _load_locked(self, mmap_mode):
+        self.reload_in_progress = True
+        try:
+            fingerprint = self._fingerprint() if self._fingerprint else None
+            bundle = self._build_bundle(mmap_mode)
+        except Exception as e:
+            self.reloads_failed += 1
+            self.status = {
+                'status': 'error' if self._bundle is None else 'reload_failed',
+                'message': f'Error loading models: {str(e)}',
+                'failed_at': datetime.now().isoformat()
+            }
+            logger.error(self.status['message'])
+            return False
+        finally:
+            self.reload_in_progress = False
+
+        self._generation += 1
+        bundle = bundle._replace(name=self.name, generation=self._generation)
+        self._bundle = bundle  # the atomic swap
+        self._loaded_fingerprint = fingerprint
+        self.reloads_succeeded += 1
+        self.status = {'status': 'success', **bundle.metadata, 'version': bundle.version,
+                       'generation': bundle.generation, 'loaded_at': datetime.now().isoformat()}
+        for callback in self._publish_callbacks:
+            try:
+                callback(bundle)
+            except Exception as e:
+                logger.error(f"Model publish callback failed: {str(e)}")
+        logger.info(f"Model {self.name} {bundle.version} (generation {bundle.generation}) is live")
+        return True
+
+    def unload(self):
+        """Drop the live bundle; requests still holding it finish normally"""
+        with self._reload_lock:
+            self._bundle = None
+            self._loaded_fingerprint = None
+            self.status = {'status': 'unloaded', 'message': 'Model unloaded', 'unloaded_at': datetime.now().isoformat()}
+
+    def request_reload(self, mmap_mode=None):
+        """Start a background reload; returns False if one is already running"""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def reload_in_background():
+            try:
+                self._load_locked(mmap_mode)
+            finally:
+                self._reload_lock.release()
+
+        self.reload_in_progress = True
+        threading.Thread(target=reload_in_background, name='model-reload', daemon=True).start()
+        return True
+
+    def ensure_watcher(self, interval_seconds, mmap_mode=None):
+        """Poll the model files every interval and reload when they change
+
+        Safe to call on every request: the thread is started once per process
+        (threads do not survive a fork).
+        """
+        if interval_seconds <= 0 or self._fingerprint is None or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+
+        def watch():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    fingerprint = self._fingerprint()
+                except Exception as e:
+                    logger.error(f"Model watcher could not read model files: {str(e)}")
+                    continue
+                if fingerprint is not None and fingerprint != self._loaded_fingerprint:
+                    logger.info("Model files changed on disk - reloading")
+                    if self.load(mmap_mode) is False:
+                        # Don't retry the same broken files on every poll
+                        self._loaded_fingerprint = fingerprint
+
+        threading.Thread(target=watch, name='model-watcher', daemon=True).start()
+
+    def stats(self):
+        return {
+            'reload_in_progress': self.reload_in_progress,
+            'reloads_succeeded': self.reloads_succeeded,
+            'reloads_failed': self.reloads_failed,
+            'watching': self._watcher_pid == os.getpid()
+        }
+
+
+class ModelPool:
+    """Several named registries resident side by side under a memory budget
+
+    Non-pinned models are loaded on first use. Before a load, least recently
+    used non-pinned models are unloaded until the estimated footprint of the
+    resident models plus the new one fits ``memory_budget_bytes``. A model
+    whose load failed is not tried again (and evicts nothing) for
+    ``retry_after_seconds``.
+    """
+
+    def __init__(self, memory_budget_bytes=None, retry_after_seconds=30.0):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.retry_after_seconds = retry_after_seconds
+        self._entries = {}  # name -> {'registry', 'size_estimate', 'pinned', 'last_used', 'failures', 'failed_at'}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.rejected_loads = 0
+
+    def add(self, registry, size_estimate, pinned=False):
+        """Register a ModelRegistry; ``size_estimate()`` returns its expected bytes in memory"""
+        self._entries[registry.name] = {
+            'registry': registry, 'size_estimate': size_estimate, 'pinned': pinned, 'last_used': 0.0,
+            'failures': registry.reloads_failed, 'failed_at': None
+        }
+        return registry
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def registry(self, name):
+        return self._entries[name]['registry']
+
+    def get(self, name, mmap_mode=None, wait=True):
+        """The live bundle for ``name``, loading it (within the budget) if needed
+
+        Returns None when the model is unknown, fails to load or does not fit
+        the budget. With ``wait=False`` a missing model is loaded on a
+        background thread and None is returned right away.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        entry['last_used'] = time.monotonic()
+        registry = entry['registry']
+        bundle = registry.current
+        if bundle is not None:
+            return bundle
+
+        failed_at = self._note_failures(entry)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_after_seconds:
+            return None
+        if registry.reload_in_progress:
+            # Room was already made for this load; evicting again would only unload other models
+            if not wait:
+                return None
+            registry.ensure_loaded(mmap_mode)
+            self._note_failures(entry)
+            return registry.current
+
+        with self._lock:
+            if registry.current is None and not self._make_room(name):
+                self.rejected_loads += 1
+                logger.error(f"Model {name} does not fit the memory budget")
+                return None
+        if not wait:
+            registry.request_reload(mmap_mode)
+            return None
+        registry.ensure_loaded(mmap_mode)
+        self._note_failures(entry)
+        return registry.current
+
+    def _note_failures(self, entry):
+        """Start the retry window if a load failed since the last look (also on the background thread)"""
+        failures = entry['registry'].reloads_failed
+        if failures != entry['failures']:
+            entry['failures'], entry['failed_at'] = failures, time.monotonic()
+        return entry['failed_at']
+
+    def _resident_bytes(self, exclude=None):
+        return sum(entry['size_estimate']() for name, entry in self._entries.items()
+                   if name != exclude and entry['registry'].current is not None)
+
+    def _make_room(self, name):
+        if self.memory_budget_bytes is None:
+            return True
+        needed = self._entries[name]['size_estimate']()
+        pinned_bytes = sum(entry['size_estimate']() for other, entry in self._entries.items()
+                           if other != name and entry['pinned'] and entry['registry'].current is not None)
+        if pinned_bytes + needed > self.memory_budget_bytes:
+            return False  # would not fit even with every unpinned model unloaded
+        while self._resident_bytes(exclude=name) + needed > self.memory_budget_bytes:
+            candidates = [(entry['last_used'], other) for other, entry in self._entries.items()
+                          if other != name and not entry['pinned'] and entry['registry'].current is not None]
+            if not candidates:
+                return False
+            _, victim = min(candidates)
+            logger.info(f"Unloading model {victim} to stay within the memory budget")
+            self._entries[victim]['registry'].unload()
+            self.evictions += 1
+        return True
+
+    def stats(self):
+        models = {}
+        for name, entry in self._entries.items():
+            bundle = entry['registry'].current
+            models[name] = {
+                'loaded': bundle is not None,
+                'version': bundle.version if bundle is not None else None,
+                'pinned': entry['pinned'],
+                'estimated_mb': round(entry['size_estimate']() / 2 ** 20, 1),
+                'status': entry['registry'].status.get('status')
+            }
+        return {
+            'models': models,
+            'memory_budget_mb': round(self.memory_budget_bytes / 2 ** 20, 1) if self.memory_budget_bytes else None,
+            'resident_estimated_mb': round(self._resident_bytes() / 2 ** 20, 1),
+            'evictions': self.evictions,
+            'rejected_loads': self.rejected_loads
+        }
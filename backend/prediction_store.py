@@ -0,0 +1,234 @@
+"""
+Append-only prediction log in SQLite (WAL mode).
+
+Requests hand their scored panels to ``PredictionStore.record``, which only
+enqueues them; a background thread writes queued rows in batches, one
+transaction (and so one fsync) per batch. Each row keeps the feature vector
+(22 little-endian float64 values in feature order), the top predictions,
+the data-quality report and the model version/variant. Rows are indexed by
+(patient_id, created_at) and (panel_id), so a patient's history is an index
+range scan however large the table grows. WAL mode lets /api/history read
+while the writer appends, and several worker processes can share one file.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Longest patient/panel ID stored; longer IDs are rejected by the API
+MAX_ID_LENGTH = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id              INTEGER PRIMARY KEY,
+    created_at      REAL NOT NULL,
+    patient_id      TEXT,
+    panel_id        TEXT,
+    model_version   TEXT NOT NULL,
+    model_variant   TEXT NOT NULL,
+    prediction      TEXT NOT NULL,
+    features        BLOB NOT NULL,
+    top_predictions TEXT NOT NULL,
+    data_quality    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_patient ON predictions (patient_id, created_at)
+    WHERE patient_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS predictions_panel ON predictions (panel_id, created_at)
+    WHERE panel_id IS NOT NULL;
+"""
+
+INSERT = """
+INSERT INTO predictions (created_at, patient_id, panel_id, model_version, model_variant, prediction, features,
+                         top_predictions, data_quality)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_FLUSH = object()
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # FULL: every commit (one per batch) is fsynced
+    connection.execute('PRAGMA synchronous=FULL')
+    return connection
+
+
+class PredictionStore:
+    """Batched background writer and indexed reader for the prediction log"""
+
+    def __init__(self, path, features, batch_size=256, flush_interval=0.5, max_queue=10000):
+        self.path = path
+        self.features = tuple(features)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = _connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._queue = None
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        atexit.register(self.flush, 5.0)
+
+    def _ensure_worker(self):
+        # Started lazily, and again in each forked process (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                threading.Thread(target=self._run, name='prediction-store', daemon=True).start()
+                self._pid = os.getpid()
+
+    def record(self, rows):
+        """Queue rows for writing; never blocks. Returns False if the queue was full
+
+        Each row is ``(created_at, patient_id, panel_id, model_version,
+        model_variant, prediction, feature_vector, top_predictions,
+        data_quality)``.
+        """
+        if not rows:
+            return True
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(list(rows))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(rows)
+            return False
+        with self._lock:
+            self.submitted += len(rows)
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed; False on timeout"""
+        if self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self):
+        connection = _connect(self.path)
+        while True:
+            pending, flushes = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item[0] is _FLUSH:
+                    flushes.append(item[1])
+                    break  # commit now: someone is waiting
+                pending.extend(item)
+                if len(pending) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if pending:
+                self._write(connection, pending)
+            for done in flushes:
+                done.set()
+
+    def _write(self, connection, pending):
+        try:
+            with connection:
+                connection.executemany(INSERT, [
+                    (round(created_at, 6), patient_id, panel_id, model_version, model_variant, prediction,
+                     np.asarray(features, dtype='<f8').tobytes(),
+                     json.dumps(top_predictions, separators=(',', ':')),
+                     json.dumps(data_quality, separators=(',', ':')))
+                    for (created_at, patient_id, panel_id, model_version, model_variant, prediction,
+                         features, top_predictions, data_quality) in pending
+                ])
+        except sqlite3.Error as e:
+            with self._lock:
+                self.failures += 1
+            logger.error(f"Prediction store write of {len(pending)} rows failed: {str(e)}")
+            return
+        with self._lock:
+            self.written += len(pending)
+            self.batches += 1
+
+    def _reader(self):
+        # One read connection per thread; WAL readers never block the writer
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def history(self, patient_id=None, panel_id=None, before=None, limit=50):
+        """Newest first: predictions for a patient and/or panel ID, older than ``before`` (epoch seconds)"""
+        conditions, params = [], []
+        if patient_id is not None:
+            conditions.append('patient_id = ?')
+            params.append(patient_id)
+        if panel_id is not None:
+            conditions.append('panel_id = ?')
+            params.append(panel_id)
+        if not conditions:
+            raise ValueError('patient_id or panel_id is required')
+        if before is not None:
+            # Timestamps are stored to the microsecond; the half-microsecond margin keeps a
+            # cursor taken from an ISO ``timestamp`` (which round-trips inexactly) exclusive
+            conditions.append('created_at < ?')
+            params.append(before - 5e-7)
+        rows = self._reader().execute(
+            'SELECT created_at, patient_id, panel_id, model_version, model_variant, prediction, features, '
+            f'top_predictions, data_quality FROM predictions WHERE {" AND ".join(conditions)} '
+            'ORDER BY created_at DESC LIMIT ?', params + [limit]).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def _entry(self, row):
+        (created_at, patient_id, panel_id, model_version, model_variant, prediction, features,
+         top_predictions, data_quality) = row
+        data_quality = json.loads(data_quality)
+        missing = set(data_quality.get('missing_parameters', ()))
+        values = np.frombuffer(features, dtype='<f8').tolist()
+        return {
+            'timestamp': datetime.fromtimestamp(created_at).isoformat(),
+            'patient_id': patient_id,
+            'panel_id': panel_id,
+            'model_version': model_version,
+            'model_variant': model_variant,
+            'prediction': prediction,
+            'values': {feature: None if feature in missing else value
+                       for feature, value in zip(self.features, values)},
+            'top_predictions': json.loads(top_predictions),
+            'data_quality': data_quality
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'path': self.path,
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'submitted': self.submitted,
+                'written': self.written,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'failures': self.failures
+            }
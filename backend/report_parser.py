@@ -0,0 +1,181 @@
+"""
+Single-pass parser for plain-text CBC lab reports.
+
+Reports look like ``backend/test_data.txt``: one ``Name: value [unit]`` line
+per result ("WBC: 6.5", "Hemoglobin 14.2 g/dL (13.5-17.5)", "Gender: Male").
+Every line is matched against one precompiled pattern whose alternation
+holds every known parameter alias (longest first) and report separators.
+Aliases map onto the API feature names, units are converted to the default
+units of ``units.py``, and "Male"/"Female" become 1/0.
+
+Files may hold many reports. A report ends at a separator or title line, or
+when a parameter it already has shows up again. ``iter_reports`` reads lines
+lazily and yields one report at a time, so memory stays bounded by a single
+report whatever the file size.
+"""
+import re
+from collections import namedtuple
+
+from units import UnitConversionError, conversion_factor
+
+ParsedReport = namedtuple('ParsedReport', [
+    'panel',  # {feature: value in default units, 'patient_id'/'panel_id'} for validate_and_process_input
+    'line',   # 1-based line number where the report's first result appeared
+    'notes'   # parse notes, e.g. values whose unit could not be converted
+])
+
+# Aliases per feature, matched case-insensitively; spaces match any run of whitespace
+FEATURE_ALIASES = {
+    'WBC': ['wbc', 'white blood cells', 'white blood cell count', 'white cell count', 'wbc count',
+            'leukocytes', 'leucocytes', 'total leukocyte count', 'tlc'],
+    'RBC': ['rbc', 'red blood cells', 'red blood cell count', 'red cell count', 'rbc count', 'erythrocytes'],
+    'HGB': ['hgb', 'hb', 'hemoglobin', 'haemoglobin'],
+    'HCT': ['hct', 'hematocrit', 'haematocrit', 'pcv', 'packed cell volume'],
+    'MCV': ['mcv', 'mean corpuscular volume', 'mean cell volume'],
+    'MCH': ['mch', 'mean corpuscular hemoglobin', 'mean corpuscular haemoglobin', 'mean cell hemoglobin'],
+    'MCHC': ['mchc', 'mean corpuscular hemoglobin concentration', 'mean corpuscular haemoglobin concentration',
+             'mean cell hemoglobin concentration'],
+    'RDW': ['rdw', 'rdw-cv', 'rdw cv', 'red cell distribution width'],
+    'PLT': ['plt', 'platelets', 'platelet count', 'thrombocytes'],
+    'MPV': ['mpv', 'mean platelet volume'],
+    'Age': ['age'],
+    'Gender': ['gender', 'sex'],
+}
+# Differential cells: "<alias>%" is a percentage, "<alias>#" / "absolute <alias>" a count; a bare
+# alias is decided by its unit (count units -> absolute count, otherwise percentage)
+DIFFERENTIAL_ALIASES = {
+    'LY': ['ly', 'lym', 'lymph', 'lymphs', 'lymphocytes'],
+    'MO': ['mo', 'mon', 'mono', 'monos', 'monocytes'],
+    'NE': ['ne', 'neu', 'neut', 'neuts', 'neutrophils', 'gra', 'granulocytes'],
+    'EO': ['eo', 'eos', 'eosinophils'],
+    'BA': ['ba', 'bas', 'baso', 'basos', 'basophils'],
+}
+IDENTIFIER_ALIASES = {
+    'patient_id': ['patient id', 'patient_id', 'patient no', 'patient number', 'mrn', 'medical record number'],
+    'panel_id': ['panel id', 'panel_id', 'sample id', 'specimen id', 'accession', 'accession number',
+                 'report id', 'lab no', 'lab number'],
+}
+GENDER_VALUES = {'male': 1, 'm': 1, '1': 1, 'female': 0, 'f': 0, '0': 0}
+COUNT_UNIT_MARKERS = ('/μl', '/µl', '/ul', '/l', 'cells')
+
+
+def _alias_table():
+    aliases = {}
+    for feature, names in FEATURE_ALIASES.items():
+        aliases.update((name, feature) for name in names)
+    for cell, names in DIFFERENTIAL_ALIASES.items():
+        for name in names:
+            aliases[name] = cell
+            for suffix in ('%', ' %', ' percent', ' (%)'):
+                aliases[name + suffix] = f'{cell}%'
+            for spelling in (f'{name}#', f'{name} #', f'{name} abs', f'{name} (abs)', f'{name} absolute',
+                             f'absolute {name}', f'abs {name}', f'{name} count'):
+                aliases[spelling] = f'{cell}#'
+    for field, names in IDENTIFIER_ALIASES.items():
+        aliases.update((name, field) for name in names)
+    return aliases
+
+
+ALIASES = _alias_table()
+
+
+def _compile_pattern(aliases):
+    names = '|'.join(re.escape(alias).replace(r'\ ', r'\s+') for alias in sorted(aliases, key=len, reverse=True))
+    return re.compile(
+        r'[ \t]*(?:'
+        # A result line: alias, separator, value, optional H/L flag, optional unit
+        rf'(?P<name>{names})(?![\w%#])[ \t]*[:=]?[ \t]*'
+        r'(?P<value>[^\s(\[]+)'
+        r'(?:[ \t]+(?:[HL]{1,2}|\*)(?=[ \t]|$))?'
+        r'(?:[ \t]+(?P<unit>[^\s(\[]+))?'
+        # ... or a line that separates reports
+        r'|(?P<boundary>-{3,}|={3,}|_{3,}|\f|end\s+of\s+report\b'
+        r'|(?:complete\s+blood\s+count|cbc|full\s+blood\s+count|hemogram|haemogram)\b[^:\n]*$)'
+        r')', re.IGNORECASE)
+
+
+REPORT_LINE = _compile_pattern(ALIASES)
+
+_factors = {}
+
+
+def _unit_factor(feature, unit):
+    """Factor to the default unit, memoized per (feature, unit); None if not convertible"""
+    key = (feature, unit)
+    if key not in _factors:
+        try:
+            _factors[key] = conversion_factor(feature, unit)
+        except UnitConversionError:
+            _factors[key] = None
+    return _factors[key]
+
+
+def _resolve(name, unit):
+    """Feature or identifier field for a matched alias"""
+    target = ALIASES[' '.join(name.lower().split())]
+    if target in DIFFERENTIAL_ALIASES:
+        is_count = unit is not None and any(marker in unit.lower() for marker in COUNT_UNIT_MARKERS)
+        return f'{target}#' if is_count else f'{target}%'
+    return target
+
+
+def _number(text):
+    try:
+        return float(text.replace(',', ''))  # thousands separators: "1,250"
+    except ValueError:
+        return None
+
+
+def _parse_value(feature, raw, unit, notes):
+    if feature == 'Gender':
+        return GENDER_VALUES.get(raw.lower(), raw)
+    value = _number(raw)
+    if value is None:
+        return raw  # kept as reported; validation lists it as invalid
+    if unit is None or unit == '%' or unit.lower() in ('years', 'yrs', 'y'):
+        return value
+    factor = _unit_factor(feature, unit)
+    if factor is None:
+        notes.append(f'{feature}: unit {unit!r} not recognized, value used as reported')
+        return value
+    return value * factor
+
+
+def iter_reports(lines):
+    """Yield a ParsedReport per report in an iterable of text (or UTF-8 bytes) lines"""
+    panel, notes, first_line = {}, [], None
+    match = REPORT_LINE.match
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        found = match(line)
+        if found is None:
+            continue
+        if found.group('boundary') is not None:
+            if panel:
+                yield ParsedReport(panel, first_line, notes)
+                panel, notes, first_line = {}, [], None
+            continue
+
+        unit = found.group('unit')
+        feature = _resolve(found.group('name'), unit)
+        if feature in panel:
+            # Same parameter again without a separator: the next report has started
+            yield ParsedReport(panel, first_line, notes)
+            panel, notes, first_line = {}, [], None
+        if first_line is None:
+            first_line = line_number
+        raw = found.group('value')
+        if feature in IDENTIFIER_ALIASES:
+            panel[feature] = raw
+        else:
+            panel[feature] = _parse_value(feature, raw, unit, notes)
+    if panel:
+        yield ParsedReport(panel, first_line, notes)
+
+
+def parse_report(text):
+    """Parse one report (the first, if the text holds several) into a panel dict; None if it has no results"""
+    for report in iter_reports(text.splitlines()):
+        return report.panel
+    return None
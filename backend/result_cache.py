@@ -0,0 +1,94 @@
+"""
+Bounded in-process LRU cache for prediction results.
+
+Entries are keyed on a digest of the normalized 22-feature vector produced by
+validation, the set of missing parameters (which drives the data-quality
+analysis) and the model version, so a re-submitted panel skips inference.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a size bound and a per-entry TTL"""
+
+    def __init__(self, max_entries=2048, ttl_seconds=600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(feature_vector, missing_parameters, model_version):
+        """Digest of the normalized feature vector, missing parameters and model version"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(feature_vector, dtype=np.float64).tobytes())
+        digest.update('|'.join(missing_parameters).encode())
+        digest.update(str(model_version).encode())
+        return digest.digest()
+
+    def get(self, key):
+        """Return the cached value or None, counting hits, misses and expirations"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry, e.g. after a new model has been loaded"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,101 @@
+"""
+Shadow scoring of a second model off the request path.
+
+After a request has been answered by the serving model, its feature rows and
+predicted labels are queued for a background thread that scores them with the
+shadow model and logs every row where the two models disagree. The queue is
+bounded and ``submit`` never blocks: when the shadow model falls behind, new
+work is dropped (and counted) instead of slowing requests down.
+"""
+import logging
+import os
+import queue
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Compares the serving model's labels with a shadow model on a worker thread
+
+    ``get_bundle()`` returns the shadow ModelBundle (loading it if needed) or
+    None when it is unavailable; it is only ever called on the worker thread.
+    """
+
+    def __init__(self, get_bundle, max_queue=1000):
+        self.get_bundle = get_bundle
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self.submitted = 0
+        self.dropped = 0
+        self.rows = 0
+        self.disagreements = 0
+        self.failures = 0
+
+    def _ensure_worker(self):
+        # Started lazily, and again in each forked process (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                threading.Thread(target=self._run, name='shadow-scorer', daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, input_matrix, labels, serving_version):
+        """Queue scored rows for comparison; returns False if the queue is full"""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((np.array(input_matrix, dtype=float), list(labels), serving_version))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _run(self):
+        while True:
+            input_matrix, labels, serving_version = self._queue.get()
+            try:
+                self._compare(input_matrix, labels, serving_version)
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                logger.error(f"Shadow scoring failed: {str(e)}")
+
+    def _compare(self, input_matrix, labels, serving_version):
+        bundle = self.get_bundle()
+        if bundle is None:
+            raise RuntimeError('shadow model not available')
+        probabilities = bundle.model.predict_proba(input_matrix)
+        shadow_indices = np.argmax(probabilities, axis=1)
+        disagreements = 0
+        for row, label in enumerate(labels):
+            shadow_label = str(bundle.class_names[shadow_indices[row]])
+            if shadow_label != label:
+                disagreements += 1
+                logger.info(f"Shadow disagreement: serving {serving_version} predicted {label!r}, "
+                            f"shadow {bundle.name} {bundle.version} predicted {shadow_label!r} "
+                            f"(p={probabilities[row, shadow_indices[row]]:.3f})")
+        with self._lock:
+            self.rows += len(labels)
+            self.disagreements += disagreements
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'rows': self.rows,
+                'disagreements': self.disagreements,
+                'disagreement_rate': round(self.disagreements / self.rows, 4) if self.rows else 0.0,
+                'failures': self.failures
+            }
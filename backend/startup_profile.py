@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+CheckwiseAI - Startup profile
+
+Starts the production entry point (main.py) in a fresh interpreter under
+``python -X importtime`` and reports where cold-start time goes: import time
+per top-level package, the time until the app object exists, and the time
+until the first successful /api/predict response. The JSON report is meant
+to be tracked across commits; --budget-ms turns it into a pass/fail check.
+
+Usage:
+    python main.py --profile-startup
+    python backend/startup_profile.py --json --budget-ms 3000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the profiled interpreter; timestamps are wall-clock so the parent can relate them
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, ROOT_DIR)
+import main
+app_ready = time.time()
+import api
+bundle = api.model_registry.current
+model_load_seconds = bundle.metadata['load_seconds'] if bundle is not None else None
+panel = dict(api.CRITICAL_DEFAULTS)
+response = main.application.test_client().post('/api/predict', json=panel)
+first_prediction = time.time()
+body = response.get_json(silent=True) or {}
+print(json.dumps({
+    'app_ready': app_ready,
+    'first_prediction': first_prediction,
+    'status_code': response.status_code,
+    'success': bool(body.get('success')),
+    'model_version': body.get('model_version'),
+    'model_load_seconds': model_load_seconds,
+    'modules_loaded': len(sys.modules),
+    'heavy_modules': sorted(name for name in ('pandas', 'joblib', 'sklearn', 'scipy') if name in sys.modules)
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Microseconds spent importing each top-level package, from ``-X importtime`` output
+
+    Sums the self time of every module of the package wherever it was
+    imported from, so nested imports are charged to their own package.
+    """
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(self_time)
+    return totals
+
+
+def profile_startup(env=None):
+    """Profile one cold start; returns the report dict"""
+    code = f'ROOT_DIR = {ROOT_DIR!r}\n' + PROBE
+    started = time.time()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            env={**os.environ, **(env or {})}, cwd=ROOT_DIR)
+    exited = time.time()
+    if result.returncode != 0:
+        raise RuntimeError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+    return {
+        'time_to_app_ms': round((probe['app_ready'] - started) * 1000, 1),
+        'time_to_first_prediction_ms': round((probe['first_prediction'] - started) * 1000, 1),
+        'first_prediction_status': probe['status_code'],
+        'first_prediction_success': probe['success'],
+        'model_version': probe['model_version'],
+        'model_load_ms': round(probe['model_load_seconds'] * 1000, 1) if probe['model_load_seconds'] else None,
+        'process_total_ms': round((exited - started) * 1000, 1),
+        'import_total_ms': round(sum(imports.values()) / 1000, 1),
+        'imports_ms': {package: round(micros / 1000, 1)
+                       for package, micros in sorted(imports.items(), key=lambda item: -item[1])},
+        'modules_loaded': probe['modules_loaded'],
+        'heavy_modules_loaded': probe['heavy_modules']
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile CheckWise API cold start')
+    parser.add_argument('--profile-startup', action='store_true', help=argparse.SUPPRESS)  # main.py passthrough
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    parser.add_argument('--top', type=int, default=12, help='Top-level imports listed (default: 12)')
+    parser.add_argument('--budget-ms', type=float,
+                        help='Exit with status 1 when time to first prediction exceeds this')
+    args = parser.parse_args(argv)
+
+    report = profile_startup()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"time to app object:       {report['time_to_app_ms']:8.1f} ms")
+        print(f"time to first prediction: {report['time_to_first_prediction_ms']:8.1f} ms "
+              f"(HTTP {report['first_prediction_status']}, model {report['model_version']})")
+        if report['model_load_ms'] is not None:
+            print(f"model load (preload):     {report['model_load_ms']:8.1f} ms")
+        print(f"imports:                  {report['import_total_ms']:8.1f} ms, "
+              f"{report['modules_loaded']} modules, heavy: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+        for package, milliseconds in list(report['imports_ms'].items())[:args.top]:
+            print(f"  {package:24s} {milliseconds:8.1f} ms")
+
+    if not report['first_prediction_success']:
+        print('first prediction failed', file=sys.stderr)
+        return 1
+    if args.budget_ms is not None and report['time_to_first_prediction_ms'] > args.budget_ms:
+        print(f"time to first prediction {report['time_to_first_prediction_ms']:.1f} ms exceeds "
+              f"budget {args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
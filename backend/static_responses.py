@@ -0,0 +1,52 @@
+"""
+Pre-serialized JSON payloads for endpoints whose content only changes when the
+model (or the code) changes, e.g. /api/parameters and /api/diseases.
+
+Each payload is encoded once, fingerprinted with a strong ETag and compressed
+ahead of time, so serving it is a header comparison and a bytes copy. Every
+content encoding is its own representation and gets its own ETag (the base
+tag with an ``-gzip``/``-br`` suffix); revalidation accepts any of them, since
+they all decode to the same body.
+"""
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+class StaticPayload:
+    """Immutable JSON body with its ETag and pre-compressed variants"""
+
+    def __init__(self, data):
+        # Same encoding as Flask's jsonify in production mode
+        self.body = (json.dumps(data, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body, quality=11)
+        self.etags = [self.etag] + [self.etag_for(encoding) for encoding in self.encoded]
+
+    def etag_for(self, encoding):
+        """ETag of the representation sent with ``encoding`` (None for identity)"""
+        return f'{self.etag}-{encoding}' if encoding else self.etag
+
+    def matches(self, if_none_match):
+        """Whether werkzeug's parsed If-None-Match names any representation of this payload"""
+        return any(if_none_match.contains_weak(etag) for etag in self.etags)
+
+    def select_encoding(self, accept_encodings):
+        """Pick the smallest pre-compressed variant the client accepts
+
+        ``accept_encodings`` is werkzeug's parsed Accept-Encoding header.
+        Returns (content encoding or None, body bytes).
+        """
+        candidates = [(len(body), encoding, body) for encoding, body in self.encoded.items()
+                      if accept_encodings[encoding] > 0]
+        if not candidates:
+            return None, self.body
+        _, encoding, body = min(candidates)
+        return encoding, body
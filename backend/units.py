@@ -0,0 +1,213 @@
+"""
+Unit conversion registry for CBC parameters.
+
+The conversion table is compiled once at import time into per-parameter
+"factor to default unit" maps, so converting between any two supported units
+is two dictionary lookups and a multiplication. Whole panels (or lists of
+panels) are converted column by column with NumPy, or with plain Python when
+NumPy is not installed.
+"""
+try:
+    import numpy as np
+except ImportError:  # optional: unit conversion still works without the ML stack
+    np = None
+
+# Default unit and accepted alternatives per parameter (served by /api/parameters)
+PARAMETER_UNITS = {
+    'WBC': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'RBC': {'default': '10⁶/μL', 'alternatives': ['M/μL', 'cells/μL', '10¹²/L']},
+    'HGB': {'default': 'g/dL', 'alternatives': ['g/L', 'mmol/L']},
+    'HCT': {'default': '%', 'alternatives': ['L/L', 'fraction']},
+    'MCV': {'default': 'fL', 'alternatives': ['μm³']},
+    'MCH': {'default': 'pg', 'alternatives': ['fmol']},
+    'MCHC': {'default': 'g/dL', 'alternatives': ['g/L', 'mmol/L']},
+    'RDW': {'default': '%', 'alternatives': ['CV%']},
+    'PLT': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'MPV': {'default': 'fL', 'alternatives': ['μm³']},
+    'Age': {'default': 'years', 'alternatives': ['months', 'days']},
+    'LY%': {'default': '%', 'alternatives': ['fraction']},
+    'MO%': {'default': '%', 'alternatives': ['fraction']},
+    'NE%': {'default': '%', 'alternatives': ['fraction']},
+    'EO%': {'default': '%', 'alternatives': ['fraction']},
+    'BA%': {'default': '%', 'alternatives': ['fraction']},
+    'LY#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'MO#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'NE#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'EO#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']},
+    'BA#': {'default': '10³/μL', 'alternatives': ['K/μL', 'cells/μL', '10⁹/L']}
+}
+
+_COUNT_FACTORS = {
+    'K/μL': 1.0,  # K/μL is same as 10³/μL
+    'cells/μL': 0.001,  # cells/μL to 10³/μL
+    '10⁹/L': 1.0  # 10⁹/L is same as 10³/μL
+}
+_FRACTION_FACTORS = {'fraction': 100.0}
+
+# Multiply a value in the given unit by the factor to get the default unit
+_FACTORS_TO_DEFAULT = {
+    'HGB': {
+        'g/L': 0.1,  # g/L to g/dL
+        'mmol/L': 1.61  # mmol/L to g/dL (approximate)
+    },
+    'MCHC': {
+        'g/L': 0.1,  # g/L to g/dL
+        'mmol/L': 1.61  # mmol/L to g/dL (approximate)
+    },
+    'WBC': _COUNT_FACTORS,
+    'RBC': {
+        'M/μL': 1.0,  # M/μL is same as 10⁶/μL
+        'cells/μL': 0.000001,  # cells/μL to 10⁶/μL
+        '10¹²/L': 1.0  # 10¹²/L is same as 10⁶/μL
+    },
+    'PLT': _COUNT_FACTORS,
+    'LY#': _COUNT_FACTORS,
+    'MO#': _COUNT_FACTORS,
+    'NE#': _COUNT_FACTORS,
+    'EO#': _COUNT_FACTORS,
+    'BA#': _COUNT_FACTORS,
+    'HCT': {
+        'L/L': 100.0,  # L/L to %
+        'fraction': 100.0  # fraction to %
+    },
+    'MCV': {'μm³': 1.0},  # 1 μm³ is exactly 1 fL
+    'MCH': {'fmol': 16.1145},  # fmol to pg (hemoglobin monomer, 16114.5 g/mol)
+    'MPV': {'μm³': 1.0},
+    'RDW': {'CV%': 1.0},
+    'Age': {
+        'months': 1/12,  # months to years
+        'days': 1/365.25  # days to years
+    },
+    # Percentage conversions
+    'LY%': _FRACTION_FACTORS,
+    'MO%': _FRACTION_FACTORS,
+    'NE%': _FRACTION_FACTORS,
+    'EO%': _FRACTION_FACTORS,
+    'BA%': _FRACTION_FACTORS
+}
+
+# Common spellings from lab systems mapped onto the canonical unit names
+_UNIT_ALIASES = {
+    'µ': 'μ',  # micro sign -> Greek mu
+    '/uL': '/μL',
+    'um3': 'μm³',
+    'um³': 'μm³',
+    'μm3': 'μm³',
+    '10^3/': '10³/',
+    '10^6/': '10⁶/',
+    '10^9/': '10⁹/',
+    '10^12/': '10¹²/',
+    'x10': '10',
+    '×10': '10',
+}
+
+
+class UnitConversionError(ValueError):
+    """Raised for a parameter or unit the registry does not know"""
+
+
+def normalize_unit(unit):
+    """Canonical spelling of a unit string ('x10^9/L' -> '10⁹/L', 'K/uL' -> 'K/μL')"""
+    unit = str(unit).strip()
+    for alias, canonical in _UNIT_ALIASES.items():
+        unit = unit.replace(alias, canonical)
+    return unit
+
+
+def _compile_registry():
+    """Build {parameter: {unit: factor to default}} including the default unit itself"""
+    registry = {}
+    for parameter, units in PARAMETER_UNITS.items():
+        factors = {'default': 1.0, units['default']: 1.0}
+        factors.update(_FACTORS_TO_DEFAULT.get(parameter, {}))
+        # /api/parameters advertises the alternatives, so each one must be convertible
+        unconvertible = [unit for unit in units['alternatives'] if unit not in factors]
+        if unconvertible:
+            raise UnitConversionError(f"No conversion factor for {parameter} in {', '.join(unconvertible)}")
+        registry[parameter] = factors
+    return registry
+
+
+UNIT_REGISTRY = _compile_registry()
+
+
+def conversion_factor(parameter, from_unit, to_unit='default'):
+    """Multiplicative factor converting ``parameter`` from ``from_unit`` to ``to_unit``"""
+    factors = UNIT_REGISTRY.get(parameter)
+    if factors is None:
+        raise UnitConversionError(f'No unit conversions defined for {parameter}')
+    try:
+        from_factor = factors[normalize_unit(from_unit)]
+    except KeyError:
+        raise UnitConversionError(f'Unsupported unit for {parameter}: {from_unit}') from None
+    try:
+        to_factor = factors[normalize_unit(to_unit)]
+    except KeyError:
+        raise UnitConversionError(f'Unsupported unit for {parameter}: {to_unit}') from None
+    return from_factor / to_factor
+
+
+def convert_value(parameter, value, from_unit, to_unit='default'):
+    """Convert one value; raises UnitConversionError for unknown parameters or units"""
+    return value * conversion_factor(parameter, from_unit, to_unit)
+
+
+def convert_to_default_unit(parameter, value, from_unit):
+    """Convert parameter value from given unit to default unit
+
+    Unknown parameters or units leave the value unchanged.
+    """
+    try:
+        return convert_value(parameter, value, from_unit)
+    except UnitConversionError:
+        return value
+
+
+def check_unit_map(units, name='units'):
+    """Raise UnitConversionError unless ``units`` is empty or a parameter -> unit string mapping"""
+    if not units:
+        return
+    if not isinstance(units, dict) or not all(isinstance(key, str) and isinstance(unit, str)
+                                              for key, unit in units.items()):
+        raise UnitConversionError(f'{name} must be an object mapping parameter names to unit strings')
+
+
+def convert_panels(panels, units, to_units=None):
+    """Convert the unit-bearing fields of many panels in one vectorized pass per field
+
+    ``units`` maps parameter -> unit the values are reported in (default unit
+    otherwise) and ``to_units`` optionally maps parameter -> target unit
+    (default unit otherwise). Values that are missing or not numeric are
+    passed through untouched so that validation reports them as usual.
+    Returns new panel dicts.
+    """
+    units = units or {}
+    to_units = to_units or {}
+    converted = [dict(panel) for panel in panels]
+    for parameter in {**dict.fromkeys(units), **dict.fromkeys(to_units)}:
+        factor = conversion_factor(parameter, units.get(parameter, 'default'), to_units.get(parameter, 'default'))
+        if factor == 1.0:
+            continue
+
+        rows = []
+        column = []
+        for row, panel in enumerate(converted):
+            raw = panel.get(parameter)
+            if raw is None or raw == '' or isinstance(raw, bool):
+                continue
+            try:
+                column.append(float(raw))
+            except (ValueError, TypeError):
+                continue
+            rows.append(row)
+
+        if rows:
+            scaled = (np.asarray(column) * factor).tolist() if np is not None else [value * factor for value in column]
+            for row, value in zip(rows, scaled):
+                converted[row][parameter] = value
+    return converted
+
+
+def convert_panel(panel, units, to_units=None):
+    """Convert a single panel; see convert_panels()"""
+    return convert_panels([panel], units, to_units)[0]
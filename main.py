@@ -18,6 +18,11 @@ sys.path.insert(0, backend_path)
 # Set working directory to backend for model file access
 os.chdir(backend_path)
 
+if __name__ == "__main__" and '--profile-startup' in sys.argv:
+    # Cold-start report (import breakdown, time to first prediction); see backend/startup_profile.py
+    from startup_profile import main as profile_startup
+    sys.exit(profile_startup(sys.argv[1:]))
+
 try:
     # Import the Flask application
     from api import app
@@ -28,6 +33,13 @@ except ImportError as e:
     logger.error(f"Python path: {sys.path}")
     raise
 
+# Load and warm up the model at import time. Under `gunicorn --preload` this
+# runs once in the master, and the forked workers share its pages copy-on-write.
+if os.environ.get('PRELOAD_MODELS', 'true').lower() == 'true':
+    from api import preload_models
+    if not preload_models():
+        logger.error("Model preload failed - workers will retry lazily on first request")
+
 # WSGI entry point for deployment platforms
 application = app
 